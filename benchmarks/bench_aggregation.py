@@ -0,0 +1,73 @@
+"""Benchmark of DataProcessor.get_aggregated_data against the former per-group python lambda.
+
+Usage:
+    python ./benchmarks/bench_aggregation.py --orders 1000000 --barcodes_per_order 3
+"""
+import argparse
+import os
+import sys
+import time
+
+import polars as pl
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "src"))
+
+from processors import DataProcessor  # noqa: E402
+
+
+def make_merged_df(orders: int, barcodes_per_order: int) -> pl.DataFrame:
+    """Builds a merged (orders x barcodes) dataframe shaped like the real input."""
+    rows = orders * barcodes_per_order
+    return pl.DataFrame({"row": pl.int_range(0, rows, eager=True)}).select(
+        (pl.col("row") // barcodes_per_order).alias("order_id"),
+        (pl.col("row") // barcodes_per_order % max(orders // 3, 1)).alias("customer_id"),
+        (pl.col("row") + 11111111111).alias("barcode"),
+    )
+
+
+def legacy_aggregation(merged_df: pl.DataFrame) -> pl.DataFrame:
+    """The former implementation, stringifying every group with a python callback."""
+    return merged_df.group_by(["customer_id", "order_id"]).agg(
+        pl.col("barcode").alias("barcodes").map_elements(lambda col: str(col.to_list()))
+    )
+
+
+def native_aggregation(merged_df: pl.DataFrame) -> pl.DataFrame:
+    processor = DataProcessor()
+    processor.merged_df = merged_df
+    return processor.get_aggregated_data()["data"]
+
+
+def best_of(func, merged_df: pl.DataFrame, repeat: int) -> tuple[float, pl.DataFrame]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(merged_df)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=1_000_000, help="Number of orders.")
+    parser.add_argument("--barcodes_per_order", type=int, default=3, help="Number of barcodes of each order.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs, the best one is reported.")
+    args = parser.parse_args()
+
+    merged_df = make_merged_df(args.orders, args.barcodes_per_order)
+    legacy_time, legacy_df = best_of(legacy_aggregation, merged_df, args.repeat)
+    native_time, native_df = best_of(native_aggregation, merged_df, args.repeat)
+
+    # The csv output must stay byte-identical, the group order is not deterministic so compare sorted rows
+    sort_by = ["customer_id", "order_id"]
+    is_identical = legacy_df.sort(sort_by).write_csv() == native_df.sort(sort_by).write_csv()
+
+    print(f"Rows: {merged_df.height}, orders: {args.orders}")
+    print(f"Legacy python lambda: {legacy_time:.3f}s")
+    print(f"Native aggregation  : {native_time:.3f}s")
+    print(f"Speedup             : {legacy_time / native_time:.1f}x")
+    print(f"Identical csv output: {is_identical}")
+
+
+if __name__ == "__main__":
+    main()
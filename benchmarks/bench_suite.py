@@ -0,0 +1,154 @@
+"""Benchmark suite of the reader, the validator, the processor and the end-to-end application flow.
+
+The inputs are generated with a fixed profile at the given scale, and kept under out/bench for later runs. Every
+benchmark reports its best time of a few runs, compared with the baseline saved for the same scale. A benchmark
+slower than its baseline by more than the threshold is a regression, and the suite then exits with status 1.
+
+Usage:
+    python ./benchmarks/bench_suite.py --rows 1000000
+    python ./benchmarks/bench_suite.py --rows 1000000 --save_baseline
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, "src"))
+
+from generate_data import DataProfile, generate  # noqa: E402
+
+from app_arguments import AppArguments  # noqa: E402
+from main import create_app, run_app  # noqa: E402
+from models.schemas import BARCODES_SCHEMA, ORDERS_SCHEMA  # noqa: E402
+from processors import DataProcessor  # noqa: E402
+from readers import CSVReader  # noqa: E402
+from validators import DataValidator  # noqa: E402
+
+BASELINES_PATH = Path(__file__).resolve().parent / "baselines.json"
+DATA_PATH = Path(__file__).resolve().parent.parent / "out" / "bench"
+# Slower benchmarks than their baseline by this factor are regressions
+DEFAULT_THRESHOLD = 1.3
+# Differences below these seconds are noise, whatever their ratio
+NOISE_SECONDS = 0.01
+
+
+def get_profile(rows: int) -> DataProfile:
+    """Returns the profile of the benchmark inputs, with some of every kind of invalid rows."""
+    return DataProfile(
+        rows=rows,
+        customers=max(rows // 30, 10),
+        duplicate_rate=0.01,
+        orphan_rate=0.02,
+        unused_ratio=0.05,
+        zipf_exponent=1.1,
+    )
+
+
+def get_inputs(rows: int) -> tuple[Path, Path]:
+    """Returns the benchmark input files of the scale, generating them on the first run."""
+    data_path = DATA_PATH / str(rows)
+    barcodes_path, orders_path = data_path / "barcodes.csv", data_path / "orders.csv"
+    if not barcodes_path.exists() or not orders_path.exists():
+        generate(get_profile(rows), barcodes_path, orders_path)
+    return barcodes_path, orders_path
+
+
+def get_benchmarks(barcodes_path: Path, orders_path: Path, output_path: Path) -> dict[str, Callable[[], Any]]:
+    """Returns the benchmarks by name, the shared inputs of the benchmarks are prepared beforehand."""
+    reader, validator = CSVReader(), DataValidator()
+    untyped_barcodes_df = reader.read(barcodes_path)
+    barcodes_df = reader.read(barcodes_path, BARCODES_SCHEMA)
+    orders_df = reader.read(orders_path, ORDERS_SCHEMA)
+    order_ids = orders_df["order_id"].unique()
+    processor = DataProcessor()
+    processor.set_dataframes(barcodes_df, orders_df)
+
+    def end_to_end() -> None:
+        args = AppArguments(str(barcodes_path), str(orders_path), no_cache=True, output_folder_path=str(output_path))
+        logger = logging.getLogger("bench")
+        logger.addHandler(logging.NullHandler())
+        logger.propagate = False
+        assert run_app(create_app(args, logger), logger)
+
+    return {
+        "read.barcodes": lambda: reader.read(barcodes_path, BARCODES_SCHEMA),
+        "read.orders": lambda: reader.read(orders_path, ORDERS_SCHEMA),
+        "validate.schema": lambda: validator.validate_schema(untyped_barcodes_df, BARCODES_SCHEMA),
+        "validate.barcodes": lambda: validator.validate_barcodes(barcodes_df, "barcode", order_ids),
+        "validate.order_ids": lambda: validator.validate_order_ids(orders_df, "order_id"),
+        "validate.orders": lambda: validator.validate_orders(processor.merged_df, "barcode"),
+        "process.set_dataframes": lambda: DataProcessor().set_dataframes(barcodes_df, orders_df),
+        "process.aggregated_data": lambda: processor.get_aggregated_data(),
+        "process.customer_totals": lambda: processor.get_customer_totals(),
+        "process.top_n_customers": lambda: processor.get_top_n_customers(),
+        "process.unused_barcodes_count": lambda: processor.get_unused_barcodes_count(),
+        "process.results": lambda: processor.get_results(),
+        "app.end_to_end": end_to_end,
+    }
+
+
+def best_of(benchmark: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        benchmark()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def compare(timings: dict[str, float], baselines: dict[str, float], threshold: float) -> list[str]:
+    """Prints the timings next to their baselines, returns the names of the regressed benchmarks."""
+    regressions = []
+    print(f"{'Benchmark': <30} {'Seconds': >9} {'Baseline': >9} {'Ratio': >7}")
+    for name, seconds in timings.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            print(f"{name: <30} {seconds: >9.4f} {'-': >9} {'-': >7}")
+            continue
+        is_regression = seconds > baseline * threshold and seconds - baseline > NOISE_SECONDS
+        if is_regression:
+            regressions.append(name)
+        print(
+            f"{name: <30} {seconds: >9.4f} {baseline: >9.4f} {seconds / baseline: >6.2f}x"
+            f"{'  REGRESSION' if is_regression else ''}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Number of barcode rows of the inputs.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs, the best one is reported.")
+    parser.add_argument("--filter", type=str, default="", help="Only runs the benchmarks whose name contains it.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Slowdown factor of a regression.")
+    parser.add_argument("--save_baseline", action="store_true", help="Saves the timings as the baselines of the scale.")
+    args = parser.parse_args()
+
+    barcodes_path, orders_path = get_inputs(args.rows)
+    with tempfile.TemporaryDirectory() as output_path:
+        benchmarks = get_benchmarks(barcodes_path, orders_path, Path(output_path))
+        timings = {
+            name: best_of(benchmark, args.repeat) for name, benchmark in benchmarks.items() if args.filter in name
+        }
+
+    all_baselines = json.loads(BASELINES_PATH.read_text()) if BASELINES_PATH.exists() else {}
+    baselines = all_baselines.setdefault(str(args.rows), {})
+    print(f"Rows: {args.rows}, best of {args.repeat} runs")
+    regressions = compare(timings, baselines, args.threshold)
+
+    if args.save_baseline:
+        baselines.update({name: round(seconds, 4) for name, seconds in timings.items()})
+        BASELINES_PATH.write_text(json.dumps(all_baselines, indent=2, sort_keys=True) + "\n")
+        print(f"Baselines of {args.rows} rows saved to {BASELINES_PATH.name}")
+    elif regressions:
+        print(f"{len(regressions)} benchmarks regressed by more than {args.threshold}x: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
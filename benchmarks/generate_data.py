@@ -0,0 +1,171 @@
+"""Generator of synthetic barcodes and orders csv files, shaped like the real inputs at any scale.
+
+Usage:
+    python ./benchmarks/generate_data.py out/bench --rows 1000000 --duplicate_rate 0.01 --zipf_exponent 1.1
+
+The files are generated chunk by chunk, so 10^8 rows are written within a bounded memory. The same arguments and
+seed always generate the same files.
+"""
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+
+import polars as pl
+
+# First generated barcode, the barcodes of the sample files are 11 digits long
+FIRST_BARCODE = 11111111111
+# Rates are compared to hashes reduced to this resolution
+RATE_RESOLUTION = 1_000_000
+# Maximum number of entries of the pool the customers of the orders are sampled from
+CUSTOMER_POOL_SIZE = 1_000_000
+
+
+@dataclass
+class DataProfile:
+    """Shape of the generated data.
+
+    - rows: The number of barcode rows, duplicates and unused barcodes included.
+    - barcodes_per_order: The average number of barcodes of an order with barcodes, orders have from 1 to twice
+      as many barcodes minus one.
+    - customers: The number of distinct customers.
+    - duplicate_rate: The fraction of barcode rows repeating the barcode of another row, for another order.
+    - orphan_rate: The fraction of orders without any barcode.
+    - unused_ratio: The fraction of barcode rows without an order.
+    - zipf_exponent: The skew of the orders per customer, the k-th customer has orders in proportion to 1 / k^s.
+      0 spreads the orders uniformly.
+    - seed: The seed of all random choices.
+    - chunk_rows: The number of barcode rows generated at once.
+    """
+
+    rows: int = 1_000_000
+    barcodes_per_order: int = 3
+    customers: int = 100_000
+    duplicate_rate: float = 0.0
+    orphan_rate: float = 0.0
+    unused_ratio: float = 0.0
+    zipf_exponent: float = 1.0
+    seed: int = 42
+    chunk_rows: int = 5_000_000
+
+
+def _is_sampled(values: pl.Expr, rate: float, seed: int) -> pl.Expr:
+    """Pseudo-randomly selects the given fraction of the rows, from the hashes of their values."""
+    return values.hash(seed) % RATE_RESOLUTION < int(rate * RATE_RESOLUTION)
+
+
+def customer_pool(profile: DataProfile) -> pl.Series:
+    """Returns customer ids repeated in proportion to their Zipf weight, so a uniform sample follows the weights.
+
+    Every customer is in the pool at least once, which slightly flattens the tail of large customer counts.
+    """
+    weights = pl.int_range(1, profile.customers + 1, eager=True).cast(pl.Float64).pow(-profile.zipf_exponent)
+    counts = (weights / weights.sum() * max(CUSTOMER_POOL_SIZE, profile.customers)).round(0).cast(pl.Int64).clip(1)
+    return pl.DataFrame({"customer_id": pl.int_range(1, profile.customers + 1, eager=True), "count": counts}).select(
+        pl.col("customer_id").repeat_by("count").explode()
+    )["customer_id"]
+
+
+def generate_chunk(
+    profile: DataProfile, pool: pl.Series, first_order_id: int, orders: int, first_barcode: int, chunk: int
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """Generates the orders of a chunk and their barcodes, with the unused and duplicate barcodes of the chunk."""
+    orders_df = pl.DataFrame(
+        {
+            "order_id": pl.int_range(first_order_id, first_order_id + orders, eager=True),
+            "customer_id": pool.sample(orders, with_replacement=True, seed=profile.seed + chunk),
+        }
+    )
+
+    spread = 2 * profile.barcodes_per_order - 1
+    used_df = (
+        orders_df.filter(~_is_sampled(pl.col("order_id"), profile.orphan_rate, profile.seed))
+        .select("order_id", count=pl.col("order_id").hash(profile.seed + 1) % spread + 1)
+        .select("order_id", position=pl.int_ranges(0, pl.col("count")))
+        .explode("position")
+        .select(barcode=pl.int_range(0, pl.count()) + first_barcode, order_id="order_id")
+    )
+
+    # The unused and the duplicate barcodes make up their fractions of all rows of the chunk
+    duplicate_unused_rate = profile.duplicate_rate + profile.unused_ratio
+    extra_rows = round(used_df.height * duplicate_unused_rate / (1 - duplicate_unused_rate))
+    unused_rows = round(extra_rows * profile.unused_ratio / duplicate_unused_rate) if extra_rows else 0
+    unused_df = pl.DataFrame(
+        {"barcode": pl.int_range(0, unused_rows, eager=True) + first_barcode + used_df.height},
+        schema={"barcode": pl.Int64},
+    ).with_columns(order_id=pl.lit(None, dtype=pl.Int64))
+    # Duplicates sell a barcode again to another order with barcodes
+    duplicate_rows = extra_rows - unused_rows
+    duplicates_df = (
+        pl.concat([used_df, unused_df])
+        .sample(duplicate_rows, with_replacement=True, seed=profile.seed + chunk)
+        .with_columns(
+            order_id=used_df["order_id"].sample(duplicate_rows, with_replacement=True, seed=profile.seed + chunk + 1)
+        )
+    )
+    # Duplicates and unused barcodes are spread over the file like in the real inputs
+    barcodes_df = pl.concat([used_df, unused_df, duplicates_df])
+    return orders_df, barcodes_df.sample(fraction=1, shuffle=True, seed=profile.seed + chunk)
+
+
+def generate(profile: DataProfile, barcodes_path: Path, orders_path: Path) -> tuple[int, int]:
+    """Writes the barcodes and orders files of the profile, returns their numbers of rows."""
+    pool = customer_pool(profile)
+    # Orders are sized so the barcodes of the orders with barcodes and the extra barcodes add up to the rows
+    orders_per_chunk = max(
+        1,
+        round(
+            profile.chunk_rows
+            * (1 - profile.duplicate_rate - profile.unused_ratio)
+            / profile.barcodes_per_order
+            / (1 - profile.orphan_rate)
+        ),
+    )
+    barcode_rows = order_rows = chunk = 0
+    barcodes_path.parent.mkdir(parents=True, exist_ok=True)
+    orders_path.parent.mkdir(parents=True, exist_ok=True)
+    with barcodes_path.open("wb") as barcodes_file, orders_path.open("wb") as orders_file:
+        while barcode_rows < profile.rows:
+            chunk_orders = max(
+                1, round(orders_per_chunk * min(1.0, (profile.rows - barcode_rows) / profile.chunk_rows))
+            )
+            orders_df, barcodes_df = generate_chunk(
+                profile, pool, order_rows + 1, chunk_orders, FIRST_BARCODE + barcode_rows, chunk
+            )
+            barcodes_df = barcodes_df.head(profile.rows - barcode_rows)
+            barcodes_df.write_csv(barcodes_file, include_header=chunk == 0)
+            orders_df.write_csv(orders_file, include_header=chunk == 0)
+            barcode_rows += barcodes_df.height
+            order_rows += orders_df.height
+            chunk += 1
+    return barcode_rows, order_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output_path", type=Path, help="Directory of the generated barcodes.csv and orders.csv.")
+    parser.add_argument("--rows", type=int, default=DataProfile.rows, help="Number of barcode rows, 10^4 to 10^8.")
+    parser.add_argument(
+        "--barcodes_per_order", type=int, default=DataProfile.barcodes_per_order, help="Average barcodes per order."
+    )
+    parser.add_argument("--customers", type=int, default=DataProfile.customers, help="Number of customers.")
+    parser.add_argument(
+        "--duplicate_rate", type=float, default=0.0, help="Fraction of barcode rows repeating another barcode."
+    )
+    parser.add_argument("--orphan_rate", type=float, default=0.0, help="Fraction of orders without barcodes.")
+    parser.add_argument("--unused_ratio", type=float, default=0.0, help="Fraction of barcode rows without an order.")
+    parser.add_argument(
+        "--zipf_exponent", type=float, default=DataProfile.zipf_exponent, help="Skew of the orders per customer."
+    )
+    parser.add_argument("--seed", type=int, default=DataProfile.seed, help="Seed of the random choices.")
+    args = vars(parser.parse_args())
+    output_path = args.pop("output_path")
+    profile = DataProfile(**args)
+    if not 0 <= profile.duplicate_rate + profile.unused_ratio < 1 or not 0 <= profile.orphan_rate < 1:
+        parser.error("The rates must be between 0 and 1, the duplicate rate and unused ratio together below 1.")
+
+    barcode_rows, order_rows = generate(profile, output_path / "barcodes.csv", output_path / "orders.csv")
+    print(f"Generated {barcode_rows} barcodes and {order_rows} orders in {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,180 @@
+import glob
 import os
 import pathlib
+import re
 from dataclasses import dataclass, field, fields
 from datetime import datetime
 from typing import Optional
 
+from compression import COMPRESSED_SUFFIXES, CSV_PATTERNS
 from models.errors import AppConfigError
 
+# File extension of each supported output format
+OUTPUT_EXTENSIONS = {"csv": "csv", "parquet": "parquet", "ipc": "arrow", "ndjson": "ndjson"}
+# Memory budget in MB of a partition of the out-of-core execution, when neither it nor the memory of the run is given
+DEFAULT_MEMORY_BUDGET = 1024
+
+# Whether each rule of the validation rules registry is enabled by default. Listed here as well, so the command
+# line is parsed without importing the validators and polars with them.
+VALIDATION_RULE_DEFAULTS = {
+    "duplicate_barcodes": True,
+    "unknown_orders": True,
+    "barcode_format": False,
+    "duplicate_order_ids": True,
+    "orders_without_barcodes": True,
+    "orders_without_customers": True,
+}
+
 
 @dataclass(frozen=False)
 class AppArguments:
     """Represents the arguments for the application.
 
     This class stores the following arguments:
-    - barcodes_file: The name of the barcodes csv file.
-    - orders_file: The name of the orders csv file.
+    - barcodes_file: The name of the barcodes csv file, a glob pattern or a directory of csv shard files. The files
+      may be gzip, bz2 or zstd compressed.
+    - orders_file: The name of the orders csv file, a glob pattern or a directory of csv shard files. The files may
+      be gzip, bz2 or zstd compressed.
     - file_path: The directory where the input files are located. Default is "data".
     - top_n: The number of top customers to consider. Default is 5.
+    - top_n_error: The maximum error of approximate top customers totals as a fraction of all barcodes, the totals
+      are exact when not given. Only used by the out-of-core mode, the other modes hold the grouped orders in memory.
+    - categorical: Whether to encode customer ids as categoricals instead of unsigned integers.
+    - enabled_rules: Names of the validation rules to enable on top of the rules enabled by default.
+    - disabled_rules: Names of the validation rules to disable.
+    - rule_timings: Whether to measure and log the time spent on every validation rule. Default is False.
+    - timings: Whether to log the time spent on the imports, the argument parsing and every step of the run.
+    - metrics: Whether to write the wall time, CPU time, peak RSS delta, rows and frame sizes of every step and
+      sub-step of the run to a JSON metrics file next to the output file. Default is False.
+    - explain: Whether to write the optimized polars query plans of the validation and processing stages to a text
+      file next to the output file. Default is False.
+    - profile: Whether to run the polars query plans of the validation and processing stages under the polars
+      profiler, and write the timings of their nodes to a csv file next to the output file. Default is False.
+    - prometheus_file: The path of a file where the metrics of the run are written in the Prometheus text format,
+      e.g. in the directory of the node exporter textfile collector. Not written when not given.
     - debug: Whether to enable debug mode. Default is False.
+    - lazy: Whether to scan the inputs instead of reading them, only their join is collected for the processing.
+      Without the parsed-input cache, values not fitting their declared types fail the run. Default is False.
+    - out_of_core: Whether to process the inputs partition by partition through on-disk spill files. Default is False.
+    - memory_budget: The memory budget of a partition in megabytes, used by the out-of-core mode. It can not exceed
+      the memory of the run. Default is the partition share of the memory of the run when it is given or when it
+      selects the out-of-core mode, and 1024 otherwise.
+    - max_memory: The memory of the run in megabytes. Without a given execution mode, the out-of-core mode is used
+      when the in-memory execution of the inputs is not expected to fit in it. Default is the memory limit of the
+      container cgroup, or the physical memory when it is lower.
+    - output_format: The format of the output file, one of csv, parquet, ipc or ndjson. Default is "csv".
+    - parquet_compression: The compression codec of parquet output files. Default is "zstd".
+    - parquet_row_group_size: The number of rows per row group of parquet output files. Default is the polars one.
+    - fsync: Whether to flush the output files to disk before renaming them in place. Default is False.
+    - backend: The backend processing the data, polars or sqlite to query a database of the inputs. Default is
+      "polars".
+    - serve: Whether to keep the processed data in memory and answer queries over a local HTTP JSON API.
+    - host: The host the server listens on. Default is "127.0.0.1".
+    - port: The port the server listens on, 0 for any free port. Default is 8080.
+    - reload_interval: The seconds between two checks of the input files by the server, which reloads the data when
+      they change, 0 disables the reloads. Default is 2.
+    - watch: Whether to keep running and process the inputs again whenever their files are dropped or changed.
+    - watch_debounce: The seconds without any change of the input files before they are processed again. Default is 1.
+    - watch_polling: Whether to poll the input directories for changes instead of using inotify. Default is False.
+    - incremental: Whether to process only the rows appended since the last run, merging them into a saved state.
+    - no_cache: Whether to parse the input files again instead of reading them from the parsed-input cache.
+    - cache_size: The maximum size of the parsed-input cache in megabytes. Default is 2048.
+    - barcode_index: Whether to write the barcode lookup index of the validated inputs. Default is False.
+    - quarantine_format: The format of the quarantine file of the rejected rows, csv, parquet or none to only log
+      them. Default is "parquet".
     - output_folder_path: The directory where the output file will be saved. Default is "out".
-    - barcodes_file_path: The resolved path to the barcodes file.
-    - orders_file_path: The resolved path to the orders file.
+    - cache_folder_path: The directory of the parsed-input cache. Default is "out/cache".
+    - state_folder_path: The directory of the incremental states. Default is "out/state".
+    - database_folder_path: The directory of the sqlite databases. Default is "out/db".
+    - index_folder_path: The directory of the barcode lookup indexes. Default is "out/index".
+    - barcodes_file_path: The resolved path to the barcodes file, pattern or directory.
+    - orders_file_path: The resolved path to the orders file, pattern or directory.
+    - barcodes_file_paths: The resolved paths of all barcodes files.
+    - orders_file_paths: The resolved paths of all orders files.
     - output_file_path: The resolved path to the output file.
+    - quarantine_file_path: The resolved path to the quarantine file, next to the output file.
+    - metrics_file_path: The resolved path to the JSON metrics file, next to the output file.
+    - prometheus_file_path: The resolved path to the Prometheus metrics file, if any.
+    - plans_file_path: The resolved path to the query plans file, next to the output file.
+    - profile_file_path: The resolved path to the query plan node timings file, next to the output file.
+    - dataset_name: The name of the combination of input files, naming the files derived from them.
+    - cache_path: The resolved path to the parsed-input cache directory.
+    - state_path: The resolved path to the incremental state directory of the input files.
+    - database_path: The resolved path to the sqlite database of the input files.
+    - index_path: The resolved path to the barcode lookup index of the input files.
     """
 
     barcodes_file: str
     orders_file: str
     file_path: str = "data"
     top_n: Optional[int] = 5
+    top_n_error: Optional[float] = None
+    enabled_rules: Optional[list[str]] = None
+    disabled_rules: Optional[list[str]] = None
+    rule_timings: bool = False
+    timings: bool = False
+    metrics: bool = False
+    explain: bool = False
+    profile: bool = False
+    prometheus_file: Optional[str] = None
     debug: bool = False
+    categorical: bool = False
+    lazy: bool = False
+    out_of_core: bool = False
+    memory_budget: Optional[int] = None
+    max_memory: Optional[int] = None
+    output_format: str = "csv"
+    parquet_compression: str = "zstd"
+    parquet_row_group_size: Optional[int] = None
+    fsync: bool = False
+    backend: str = "polars"
+    serve: bool = False
+    host: str = "127.0.0.1"
+    port: int = 8080
+    reload_interval: float = 2.0
+    watch: bool = False
+    watch_debounce: float = 1.0
+    watch_polling: bool = False
+    incremental: bool = False
+    no_cache: bool = False
+    cache_size: int = 2048
+    barcode_index: bool = False
+    quarantine_format: str = "parquet"
     output_folder_path: str = "out"
+    cache_folder_path: str = "out/cache"
+    state_folder_path: str = "out/state"
+    database_folder_path: str = "out/db"
+    index_folder_path: str = "out/index"
     barcodes_file_path: pathlib.Path = field(init=False)
     orders_file_path: pathlib.Path = field(init=False)
+    barcodes_file_paths: list[pathlib.Path] = field(init=False)
+    orders_file_paths: list[pathlib.Path] = field(init=False)
     output_file_path: pathlib.Path = field(init=False)
+    quarantine_file_path: pathlib.Path = field(init=False)
+    metrics_file_path: pathlib.Path = field(init=False)
+    prometheus_file_path: Optional[pathlib.Path] = field(init=False)
+    plans_file_path: pathlib.Path = field(init=False)
+    profile_file_path: pathlib.Path = field(init=False)
+    dataset_name: str = field(init=False)
+    cache_path: pathlib.Path = field(init=False)
+    state_path: pathlib.Path = field(init=False)
+    database_path: pathlib.Path = field(init=False)
+    index_path: pathlib.Path = field(init=False)
 
     def __post_init__(self):
         """Perform post-initialization tasks.
 
         This method sets the log level based on the debug mode and converts string directories into path objects.
-        It also resolves the paths for the orders and barcodes files, and raises an error if the files do not exist.
-        Finally, it sets the output file path based on the resolved paths and the current timestamp.
+        It also resolves the paths for the orders and barcodes files, expanding glob patterns and directories into
+        their csv shard files, and raises an error if no file is found.
+        Finally, it sets the output file path based on the resolved paths, the current timestamp and the extension
+        of the output format.
 
         Raises:
-            ConfigError: If the orders or barcodes file does not exist.
+            ConfigError: If the orders or barcodes file does not exist, or if incompatible modes are combined.
         """
+        self._check_modes()
+
         # Turn string directories into path objs
         app_path = pathlib.Path(__file__).resolve().parent.parent
         input_file_path = app_path / self.file_path
@@ -51,20 +183,85 @@ class AppArguments:
             self.__dict__[f"{name}_path"]: pathlib.Path = (
                 pathlib.Path(file_name) if file_name.startswith(os.path.sep) else input_file_path / file_name
             )
-            if not self.__dict__[f"{name}_path"].exists():
+            self.__dict__[f"{name}_paths"] = self._resolve_shards(self.__dict__[f"{name}_path"])
+            if not self.__dict__[f"{name}_paths"]:
                 raise AppConfigError(f"Unable to find given {name!r} file {file_name!s}.")
 
+        self.dataset_name = f"{self._file_stem(self.orders_file_path)}_{self._file_stem(self.barcodes_file_path)}"
         self.output_file_path = (
             app_path
             / self.output_folder_path
-            / f"{self.orders_file_path.stem}_{self.barcodes_file_path.stem}_{datetime.now():%Y%m%d%H%M%S}.csv"
+            / f"{self.dataset_name}_{datetime.now():%Y%m%d%H%M%S}.{OUTPUT_EXTENSIONS[self.output_format]}"
         )
+        # The rejected rows, the metrics and the query profile of the run are kept next to its output file
+        self.quarantine_file_path = self.output_file_path.with_name(
+            f"{self.output_file_path.stem}_quarantine.{OUTPUT_EXTENSIONS.get(self.quarantine_format, 'csv')}"
+        )
+        self.metrics_file_path = self.output_file_path.with_name(f"{self.output_file_path.stem}_metrics.json")
+        self.plans_file_path = self.output_file_path.with_name(f"{self.output_file_path.stem}_plans.txt")
+        self.profile_file_path = self.output_file_path.with_name(f"{self.output_file_path.stem}_profile.csv")
+        self.prometheus_file_path = None if self.prometheus_file is None else app_path / self.prometheus_file
+        self.cache_path = app_path / self.cache_folder_path
+        # Every combination of input files keeps its own incremental state and database
+        self.state_path = app_path / self.state_folder_path / self.dataset_name
+        self.database_path = app_path / self.database_folder_path / f"{self.dataset_name}.sqlite"
+        self.index_path = app_path / self.index_folder_path / f"{self.dataset_name}.bidx"
+
+    def _check_modes(self) -> None:
+        """Raises ConfigError if incompatible modes or options are combined."""
+        if self.out_of_core and (self.incremental or self.lazy):
+            raise AppConfigError("The out-of-core mode can not be combined with the incremental or lazy modes.")
+        if self.backend == "sqlite" and (self.incremental or self.out_of_core):
+            raise AppConfigError("The sqlite backend can not be combined with the incremental or out-of-core modes.")
+        if self.serve and (self.incremental or self.out_of_core or self.backend != "polars"):
+            raise AppConfigError("The serve mode can only be combined with the in-memory polars backend.")
+        if self.watch and self.serve:
+            raise AppConfigError("The watch and serve modes can not be combined, the server reloads changed inputs.")
+        if self.barcode_index and (self.incremental or self.out_of_core):
+            raise AppConfigError("The barcode index can not be written by the incremental or out-of-core modes.")
+        if self.top_n_error is not None and not 0 < self.top_n_error < 1:
+            raise AppConfigError(f"Top N error must be between 0 and 1, got {self.top_n_error}.")
+        if self.top_n_error is not None and not self.out_of_core:
+            raise AppConfigError("The approximate top customers are only computed by the out-of-core mode.")
+        if self.memory_budget is not None and self.max_memory is not None and self.memory_budget > self.max_memory:
+            raise AppConfigError(
+                f"The memory budget of {self.memory_budget} MB can not exceed the memory of the run of "
+                f"{self.max_memory} MB."
+            )
+
+    @staticmethod
+    def _resolve_shards(path: pathlib.Path) -> list[pathlib.Path]:
+        """Returns the sorted csv files of a directory or a glob pattern, or the path itself if it is a file.
+
+        The csv files of a directory may be compressed, e.g. "barcodes_1.csv.gz".
+        """
+        if path.is_dir():
+            return sorted(file_path for pattern in CSV_PATTERNS for file_path in path.glob(pattern))
+        if re.search(r"[*?\[]", str(path)):
+            return sorted(pathlib.Path(file_path) for file_path in glob.glob(str(path)) if os.path.isfile(file_path))
+        return [path] if path.exists() else []
+
+    @staticmethod
+    def _file_stem(path: pathlib.Path) -> str:
+        """Returns the stem of the path without glob characters nor compression suffix, for the output file name."""
+        stem = path.with_suffix("").stem if path.suffix in COMPRESSED_SUFFIXES else path.stem
+        return re.sub(r"[*?\[\]]", "", stem).strip("_-.") or "shards"
 
     def __str__(self):
         """Returns a string containing only the non-default field values."""
         s = ", ".join(
-            f"{arg.name}={(getattr(self, arg.name).name if arg.name.endswith('_file_path') else getattr(self, arg.name))!r}"
+            f"{arg.name}={self._str_value(arg.name)!r}"
             for arg in fields(self)
             if getattr(self, arg.name) != arg.default
         )
         return f"{type(self).__name__}({s})"
+
+    def _str_value(self, name: str):
+        value = getattr(self, name)
+        if value is None:
+            return value
+        if name.endswith("_file_path") or name in ("cache_path", "state_path", "database_path", "index_path"):
+            return value.name
+        if name.endswith("_file_paths"):
+            return [file_path.name for file_path in value]
+        return value
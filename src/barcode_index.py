@@ -0,0 +1,181 @@
+"""Persisted barcode lookup index, answering barcode scans without loading polars.
+
+The index file holds a header, the sorted barcodes and, for every barcode, the offset of its order in a table of
+the orders and their customers:
+
+    header          magic, version, barcode count, order count
+    barcodes        uint64[barcode count], sorted
+    order offsets   uint32[barcode count], UNUSED for barcodes without an order
+    order ids       uint32[order count]
+    customer ids    uint32[order count], MISSING for orders without a customer
+
+The arrays are written in the byte order of the host building the index, an index read on a host of the other
+byte order fails on its version.
+"""
+
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, NamedTuple
+
+from models.errors import AppReaderError, AppWriterError
+
+if TYPE_CHECKING:
+    import polars as pl
+
+MAGIC = b"TQBI"
+VERSION = 1
+HEADER = struct.Struct("=4sIQQ")
+# Offset of the barcodes without an order, and id of the customer of orders without one
+UNUSED = MISSING = 0xFFFFFFFF
+
+
+class BarcodeLookup(NamedTuple):
+    barcode: int
+    order_id: int | None
+    customer_id: int | None
+
+    @property
+    def used(self) -> bool:
+        return self.order_id is not None
+
+
+def _id_array(values: list[int | None]) -> array:
+    return array("I", (MISSING if value is None else value for value in values))
+
+
+def _cast_ids(df: "pl.DataFrame", columns: list[str]) -> "pl.DataFrame":
+    """Casts id columns to the unsigned 32-bit integers of the index, categorical ids are cast from their text.
+
+    Raises:
+        ValueError: If an id is not an integer the index can hold.
+    """
+    import polars as pl
+
+    for column in columns:
+        ids = df[column].cast(pl.Utf8) if df[column].dtype == pl.Categorical else df[column]
+        index_ids = ids.cast(pl.UInt32, strict=False)
+        invalid_ids = ids.filter((index_ids.is_null() & ids.is_not_null()) | (index_ids == MISSING))
+        if not invalid_ids.is_empty():
+            raise ValueError(f"{column} values must be integers from 0 to {MISSING - 1}, found {invalid_ids[0]!r}.")
+        df = df.with_columns(index_ids)
+    return df
+
+
+def write_barcode_index(
+    barcodes_df: "pl.DataFrame | pl.LazyFrame", orders_df: "pl.DataFrame | pl.LazyFrame", index_path: Path
+) -> int:
+    """Writes the lookup index of the validated barcodes and orders, returns the number of indexed barcodes.
+
+    The index is written to a temporary file first and then moved over the previous one, so lookups opening the
+    index meanwhile read either the previous or the new one.
+
+    Raises:
+        AppWriterError: If the index can not be written.
+    """
+    # Only building the index needs polars, the lookups do not
+    import polars as pl
+
+    try:
+        if isinstance(barcodes_df, pl.LazyFrame):
+            barcodes_df = barcodes_df.collect(streaming=True)
+        if isinstance(orders_df, pl.LazyFrame):
+            orders_df = orders_df.collect(streaming=True)
+        barcodes_df = _cast_ids(barcodes_df.select("barcode", "order_id"), ["order_id"])
+        orders_df = _cast_ids(orders_df.select("order_id", "customer_id"), ["order_id", "customer_id"])
+
+        orders_df = orders_df.unique(subset="order_id", keep="first", maintain_order=True)
+        # Barcodes of orders missing from the orders still point to their order, without a customer
+        unknown_orders_df = (
+            barcodes_df.select("order_id").drop_nulls().unique().join(orders_df, on="order_id", how="anti")
+        )
+        orders_df = pl.concat([orders_df, unknown_orders_df], how="diagonal_relaxed").with_row_count("offset")
+        barcodes_df = (
+            barcodes_df.unique(subset="barcode", keep="first")
+            .join(orders_df.select("order_id", "offset"), on="order_id", how="left")
+            .sort("barcode")
+        )
+
+        header = HEADER.pack(MAGIC, VERSION, barcodes_df.height, orders_df.height)
+        tmp_path = index_path.with_suffix(".tmp")
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        with tmp_path.open("wb") as index_file:
+            index_file.write(header)
+            array("Q", barcodes_df["barcode"].to_list()).tofile(index_file)
+            _id_array([UNUSED if offset is None else offset for offset in barcodes_df["offset"]]).tofile(index_file)
+            _id_array(orders_df["order_id"].to_list()).tofile(index_file)
+            _id_array(orders_df["customer_id"].to_list()).tofile(index_file)
+        os.replace(tmp_path, index_path)
+        return barcodes_df.height
+    except Exception as exc:
+        raise AppWriterError(f"Unable to write barcode index {index_path.name}: {exc!s}") from exc
+
+
+class BarcodeIndex:
+    """Memory-mapped barcode lookup index, answering lookups by binary search.
+
+    Opening the index only maps the file, pages are read by the operating system when the lookups touch them.
+    An index is immutable and can be shared by threads.
+    """
+
+    def __init__(self, index_path: Path):
+        """Opens the index file written by write_barcode_index.
+
+        Raises:
+            AppReaderError: If the file is missing or is not a barcode index.
+        """
+        self.index_path = index_path
+        try:
+            with index_path.open("rb") as index_file:
+                self._mmap = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, barcode_count, order_count = HEADER.unpack_from(self._mmap)
+        except (OSError, ValueError, struct.error) as exc:
+            raise AppReaderError(f"Unable to read barcode index {index_path.name}: {exc!s}") from exc
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise AppReaderError(f"Unable to read barcode index {index_path.name}: Unsupported file format.")
+
+        self._view = view = memoryview(self._mmap)
+        start = HEADER.size
+        self.barcodes = view[start : (start := start + 8 * barcode_count)].cast("Q")
+        self.order_offsets = view[start : (start := start + 4 * barcode_count)].cast("I")
+        self.order_ids = view[start : (start := start + 4 * order_count)].cast("I")
+        self.customer_ids = view[start : start + 4 * order_count].cast("I")
+
+    def __len__(self) -> int:
+        return len(self.barcodes)
+
+    def __enter__(self) -> "BarcodeIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _result(self, position: int) -> BarcodeLookup:
+        offset = self.order_offsets[position]
+        if offset == UNUSED:
+            return BarcodeLookup(self.barcodes[position], None, None)
+        customer_id = self.customer_ids[offset]
+        return BarcodeLookup(
+            self.barcodes[position], self.order_ids[offset], None if customer_id == MISSING else customer_id
+        )
+
+    def lookup(self, barcode: int) -> BarcodeLookup | None:
+        """Returns the order and the customer of a barcode, None if the barcode is unknown."""
+        position = bisect_left(self.barcodes, barcode)
+        if position == len(self.barcodes) or self.barcodes[position] != barcode:
+            return None
+        return self._result(position)
+
+    def lookup_many(self, barcodes: Iterable[int]) -> list[BarcodeLookup | None]:
+        """Returns the lookups of several barcodes in their order, every barcode is searched on its own."""
+        return [self.lookup(barcode) for barcode in barcodes]
+
+    def close(self) -> None:
+        # The array views have to be released before the mapping can be closed
+        for view in (self.barcodes, self.order_offsets, self.order_ids, self.customer_ids, self._view):
+            view.release()
+        self._mmap.close()
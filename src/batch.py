@@ -0,0 +1,223 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any
+
+from app_arguments import AppArguments
+from memory_planning import memory_limit
+from models.errors import AppConfigError, AppError
+from utils import get_logger
+
+# Only the standard library and the light argument modules are imported here. The workers import the application
+# modules, and polars with them, after their initializer capped the polars threads.
+
+# Logger of the pairs processed by a worker process, created by its first pair
+_worker_logger: logging.Logger | None = None
+
+
+def load_manifest(manifest_path: Path) -> dict[str, AppArguments]:
+    """Reads the dataset pairs of a manifest into the arguments of every pair, by pair name.
+
+    The manifest is a JSON object with a "pairs" list and optional "defaults". Every pair holds the
+    "barcodes_file" and "orders_file" and optionally a "name" and any other argument of the application, e.g.
+    "top_n", "output_format" or "output_folder_path", overriding the defaults:
+
+        {"defaults": {"file_path": "data"}, "pairs": [{"name": "a", "barcodes_file": "a.csv", "orders_file": "b.csv"}]}
+
+    Raises:
+        AppConfigError: If the manifest can not be read, or if a pair has invalid arguments or input files.
+    """
+    try:
+        manifest = json.loads(manifest_path.read_text())
+        defaults, pairs = manifest.get("defaults", {}), manifest["pairs"]
+    except (OSError, ValueError, KeyError, AttributeError) as exc:
+        raise AppConfigError(f"Unable to read manifest {manifest_path.name}: {exc!s}") from exc
+
+    pair_args: dict[str, AppArguments] = {}
+    output_names: dict[Path, str] = {}
+    for position, pair in enumerate(pairs, start=1):
+        pair = {**defaults, **pair}
+        name = str(pair.pop("name", f"pair_{position}"))
+        if name in pair_args:
+            raise AppConfigError(f"Manifest pair name {name!r} is used more than once.")
+        try:
+            args = AppArguments(**pair)
+        except TypeError as exc:
+            raise AppConfigError(f"Invalid arguments of manifest pair {name!r}: {exc!s}") from exc
+
+        # Outputs are named after the input files and the start time, so pairs have to write to other folders
+        output_key = args.output_file_path.with_name(args.output_file_path.stem.rsplit("_", 1)[0])
+        if output_key in output_names:
+            raise AppConfigError(
+                f"Manifest pairs {output_names[output_key]!r} and {name!r} write the same output file, "
+                f"set another output_folder_path for one of them."
+            )
+        output_names[output_key] = name
+        pair_args[name] = args
+    return pair_args
+
+
+class _PairNameFilter(logging.Filter):
+    def __init__(self, pair_name: str):
+        super().__init__()
+        self.pair_name = pair_name
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.msg = f"[{self.pair_name}] {record.msg}"
+        return True
+
+
+def _init_worker(polars_threads: int) -> None:
+    # Read by polars when its thread pool is created, before any application module uses polars
+    os.environ["POLARS_MAX_THREADS"] = str(polars_threads)
+
+
+def _run_pair(name: str, args: AppArguments, is_debug: bool) -> dict[str, Any]:
+    """Runs the application on a dataset pair in a worker process, returns the summary of the run."""
+    import polars as pl
+
+    from main import create_app, run_app
+
+    global _worker_logger
+    if _worker_logger is None:
+        _worker_logger = get_logger("BatchWorker", is_debug)
+        _worker_logger.debug(f"Worker {os.getpid()} started with {pl.threadpool_size()} polars threads.")
+    # Messages of the pairs run by the same worker are told apart by their pair name
+    logger = _worker_logger.getChild(name)
+    if not logger.filters:
+        logger.addFilter(_PairNameFilter(name))
+
+    started = time.perf_counter()
+    # Pairs usually write to their own output folders
+    args.output_file_path.parent.mkdir(parents=True, exist_ok=True)
+    app = create_app(args, logger)
+    is_ok = run_app(app, logger)
+    rejected_rows = app.quarantine.rejected_count if app.quarantine is not None else None
+    return {
+        "is_ok": is_ok,
+        "seconds": time.perf_counter() - started,
+        "rejected_rows": rejected_rows,
+        **app.summary,
+    }
+
+
+def _input_size(args: AppArguments) -> int:
+    return sum(file_path.stat().st_size for file_path in args.barcodes_file_paths + args.orders_file_paths)
+
+
+def run_batch(
+    pair_args: dict[str, AppArguments], logger: logging.Logger, workers: int, polars_threads: int, is_debug: bool
+) -> dict[str, dict[str, Any]]:
+    """Runs the application on all dataset pairs on a pool of worker processes, returns the summaries by pair.
+
+    Every worker runs pairs one after the other, with polars capped to the given number of threads, so the pairs
+    running at the same time do not oversubscribe the cores. The largest pairs are started first, so a large pair
+    does not run alone at the end of the batch.
+    """
+    summaries: dict[str, dict[str, Any]] = {}
+    # Workers are spawned instead of forked, so they start without the state and the threads of this process
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(polars_threads,),
+    ) as executor:
+        futures = {
+            executor.submit(_run_pair, name, args, is_debug): name
+            for name, args in sorted(pair_args.items(), key=lambda item: _input_size(item[1]), reverse=True)
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                summaries[name] = future.result()
+            except Exception as exc:
+                logger.error(f"Pair {name} failed: {exc!s}")
+                summaries[name] = {"is_ok": False, "seconds": 0.0, "error": str(exc)}
+    return {name: summaries[name] for name in pair_args}
+
+
+def format_summary(summaries: dict[str, dict[str, Any]], elapsed: float) -> str:
+    """Returns the consolidated summary of a batch, one line per pair and the totals."""
+    lines = [
+        "Batch summary:",
+        f"{'Pair': <20} {'Status': <7} {'Seconds': >8} {'Rejected': >9} {'Unused': >7}  Top customers",
+    ]
+    for name, summary in summaries.items():
+        top_customers = ", ".join(f"{customer_id}: {total}" for customer_id, total in summary.get("top_customers", []))
+        rejected_rows = summary.get("rejected_rows")
+        lines.append(
+            f"{name: <20} {'ok' if summary['is_ok'] else 'failed': <7} {summary['seconds']: >8.2f} "
+            f"{'-' if rejected_rows is None else rejected_rows: >9} {summary.get('unused_barcodes', '-'): >7}  "
+            f"{top_customers}"
+        )
+    failed_count = sum(not summary["is_ok"] for summary in summaries.values())
+    pair_seconds = sum(summary["seconds"] for summary in summaries.values())
+    lines.append(
+        f"{len(summaries) - failed_count} of {len(summaries)} pairs processed in {elapsed:.2f}s "
+        f"({pair_seconds:.2f}s of pair processing), {failed_count} failed."
+    )
+    return "\n".join(lines)
+
+
+def parse_batch_args() -> argparse.Namespace:
+    """Parse & return command line args of the batch mode"""
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(
+        description="Process many barcodes and orders dataset pairs listed in a manifest on a pool of processes",
+        allow_abbrev=False,
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("manifest", type=Path, help="Path of the JSON manifest listing the dataset pairs.")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=cpu_count, help="Number of worker processes, at most one per pair."
+    )
+    parser.add_argument(
+        "--polars_threads",
+        type=int,
+        default=None,
+        help="Number of polars threads of every worker. Default is the cores divided among the workers.",
+    )
+    parser.add_argument("-d", "--debug", action="store_true", help="Enables debug mode.")
+    args = parser.parse_args()
+    if args.workers < 1 or (args.polars_threads is not None and args.polars_threads < 1):
+        parser.error("The number of workers and of polars threads must be at least 1.")
+    args.cpu_count = cpu_count
+    return args
+
+
+def main():
+    """Process all dataset pairs of the manifest and log the consolidated summary."""
+    batch_args = parse_batch_args()
+    logger = get_logger("Batch", batch_args.debug)
+
+    try:
+        pair_args = load_manifest(batch_args.manifest)
+    except AppError as exc:
+        logger.error(f"{exc!s}")
+        return
+    if not pair_args:
+        logger.warning(f"No dataset pair in manifest {batch_args.manifest.name}.")
+        return
+
+    workers = min(batch_args.workers, len(pair_args))
+    polars_threads = batch_args.polars_threads or max(1, batch_args.cpu_count // workers)
+    # Pairs running at the same time share the memory, their execution mode is selected from their share of it
+    limit = memory_limit()
+    for args in pair_args.values():
+        if args.max_memory is None and limit is not None:
+            args.max_memory = limit // workers // 1024**2
+    logger.info(f"Processing {len(pair_args)} pairs on {workers} workers with {polars_threads} polars threads each.")
+
+    started = time.perf_counter()
+    summaries = run_batch(pair_args, logger, workers, polars_threads, batch_args.debug)
+    logger.info(format_summary(summaries, time.perf_counter() - started))
+
+
+# App entry point
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import hashlib
+import os
+from pathlib import Path
+
+import polars as pl
+
+# Size of the blocks hashed at the start, middle and end of a file for its content fingerprint
+FINGERPRINT_BLOCK_SIZE = 1024**2
+
+
+def file_fingerprint(file_path: Path, variant: str = "") -> str:
+    """Hashes the size, the modification time and blocks sampled at the start, middle and end of the file.
+
+    The variant is hashed along, e.g. the options the file is parsed with.
+    """
+    stat = file_path.stat()
+    content_hash = hashlib.blake2b(f"{stat.st_size}:{stat.st_mtime_ns}:{variant}".encode(), digest_size=16)
+    with open(file_path, "rb") as file:
+        for offset in {0, stat.st_size // 2, max(stat.st_size - FINGERPRINT_BLOCK_SIZE, 0)}:
+            file.seek(offset)
+            content_hash.update(file.read(FINGERPRINT_BLOCK_SIZE))
+    return content_hash.hexdigest()
+
+
+class ParsedInputCache:
+    """Stores parsed input frames as uncompressed Arrow IPC files, so later reads can memory-map them.
+
+    Entries are keyed on the resolved path, size, modification time and a content hash of the source file.
+    The modification time of an entry is refreshed on every hit and the least recently used entries are
+    evicted once the total size of the cache exceeds its limit.
+    """
+
+    def __init__(self, cache_path: Path, max_size: int):
+        """Initializes a ParsedInputCache in the given directory with the maximum total size in bytes."""
+        self.cache_path = cache_path
+        self.max_size = max_size
+
+    @staticmethod
+    def _source_key(file_path: Path, variant: str) -> str:
+        """Hashes the resolved path with the variant, entries of the same key only differ by their fingerprint."""
+        return hashlib.blake2b(f"{file_path.resolve()}:{variant}".encode(), digest_size=8).hexdigest()
+
+    def _entry_path(self, file_path: Path, variant: str) -> Path:
+        return self.cache_path / f"{self._source_key(file_path, variant)}-{file_fingerprint(file_path, variant)}.arrow"
+
+    def get(self, file_path: Path, variant: str = "") -> Path | None:
+        """Returns the cache entry of the file if it is still up to date.
+
+        The variant tells apart entries of the same file parsed with different options, e.g. column types.
+        """
+        entry_path = self._entry_path(file_path, variant)
+        if not entry_path.exists():
+            return None
+
+        # Mark the entry as recently used
+        os.utime(entry_path)
+        return entry_path
+
+    def put(self, file_path: Path, df: pl.DataFrame | pl.LazyFrame, variant: str = "") -> Path | None:
+        """Stores the parsed frame of the file, replacing outdated entries of the same file and variant.
+
+        Entries of the file parsed with other variants are kept, they are only evicted once least recently used.
+
+        Returns:
+            Path | None: The cache entry, None if the frame is larger than the whole cache.
+        """
+        self.cache_path.mkdir(parents=True, exist_ok=True)
+        entry_path = self._entry_path(file_path, variant)
+        tmp_path = entry_path.with_suffix(".tmp")
+        try:
+            if isinstance(df, pl.LazyFrame):
+                try:
+                    df.sink_ipc(tmp_path, compression=None)
+                except pl.exceptions.InvalidOperationError:
+                    # Plans which can not be streamed, like the reads of compressed files, are collected first
+                    df.collect().write_ipc(tmp_path, compression="uncompressed")
+            else:
+                df.write_ipc(tmp_path, compression="uncompressed")
+        except Exception:
+            # A plan failing to parse its files leaves a partly written file
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        if tmp_path.stat().st_size > self.max_size:
+            tmp_path.unlink()
+            return None
+
+        for outdated_path in self.cache_path.glob(f"{self._source_key(file_path, variant)}-*.arrow"):
+            if outdated_path != entry_path:
+                outdated_path.unlink(missing_ok=True)
+        os.replace(tmp_path, entry_path)
+        self._evict(entry_path)
+        return entry_path
+
+    def _evict(self, kept_path: Path) -> None:
+        """Removes the least recently used entries until the cache fits in its maximum size.
+
+        The kept entry, the one just stored, is never removed, even when its modification time ties with older
+        entries. Entries may be removed meanwhile by another reader evicting or replacing them, they are then
+        skipped.
+        """
+        entry_stats = []
+        for entry in self.cache_path.glob("*.arrow"):
+            if entry == kept_path:
+                continue
+            try:
+                entry_stats.append((entry, entry.stat()))
+            except FileNotFoundError:
+                continue
+        entry_stats.sort(key=lambda entry_stat: entry_stat[1].st_mtime)
+        total_size = kept_path.stat().st_size + sum(stat.st_size for _, stat in entry_stats)
+        for entry, stat in entry_stats:
+            if total_size <= self.max_size:
+                break
+            total_size -= stat.st_size
+            entry.unlink(missing_ok=True)
@@ -0,0 +1,115 @@
+import bz2
+import gzip
+import io
+import queue
+import threading
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency, zstd compressed files can then not be read
+    zstandard = None  # type: ignore[assignment]
+
+# Leading bytes of the files of every supported codec, the codec of a file is detected from them
+MAGIC_BYTES = {"gzip": b"\x1f\x8b", "bz2": b"BZh", "zstd": b"\x28\xb5\x2f\xfd"}
+# File name patterns of the csv files found in input directories, plain or compressed
+CSV_PATTERNS = ["*.csv", "*.csv.gz", "*.csv.bz2", "*.csv.zst"]
+COMPRESSED_SUFFIXES = [".gz", ".bz2", ".zst"]
+# Rough ratio between the size of a csv file and its compressed size
+COMPRESSION_RATIO = 4
+# Decompressed bytes handed over at once, cut at the last line break
+BLOCK_SIZE = 16 * 1024**2
+# Decompressed blocks waiting to be parsed, bounding the memory used ahead of the parser
+QUEUED_BLOCKS = 2
+
+
+def detect_compression(file_path: Path) -> str | None:
+    """Returns the codec a file is compressed with, None for a plain file."""
+    with open(file_path, "rb") as file:
+        magic = file.read(4)
+    return next((codec for codec, codec_magic in MAGIC_BYTES.items() if magic.startswith(codec_magic)), None)
+
+
+def open_decompressed(file_path: Path, codec: str | None) -> BinaryIO:
+    """Opens a file for reading its decompressed bytes as a stream, a plain file when no codec is given."""
+    if codec is None:
+        return open(file_path, "rb")
+    if codec == "gzip":
+        return gzip.open(file_path, "rb")  # type: ignore[return-value]
+    if codec == "bz2":
+        return bz2.open(file_path, "rb")  # type: ignore[return-value]
+    if zstandard is None:
+        raise ValueError("reading zstd compressed files requires the zstandard package")
+    # The zstd stream reader has no line reading, the buffered reader adds it
+    return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(file_path, "rb"), closefd=True))
+
+
+def read_header(file_path: Path) -> bytes:
+    """Returns the header line of a csv file, decompressed if needed."""
+    with open_decompressed(file_path, detect_compression(file_path)) as file:
+        return file.readline()
+
+
+def _line_blocks(file: BinaryIO, block_size: int) -> Iterator[bytes]:
+    """Yields the lines of a csv file in blocks of about the block size, every block starting with the header."""
+    header, rest, is_empty = file.readline(), b"", True
+    while data := file.read(block_size):
+        data = rest + data
+        end = data.rfind(b"\n") + 1
+        rest = data[end:]
+        if end:
+            yield header + data[:end]
+            is_empty = False
+    if rest.strip() or is_empty:
+        yield header + rest
+
+
+def _put(blocks: queue.Queue, stopped: threading.Event, item: bytes | BaseException | None) -> None:
+    # Gives up once the consumer stopped, e.g. after a failed parse
+    while not stopped.is_set():
+        try:
+            blocks.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def _decompress(file_path: Path, codec: str, block_size: int, blocks: queue.Queue, stopped: threading.Event) -> None:
+    """Puts the line blocks of a compressed file into the queue, followed by None or by the error of the read."""
+    try:
+        with open_decompressed(file_path, codec) as file:
+            for block in _line_blocks(file, block_size):
+                _put(blocks, stopped, block)
+        _put(blocks, stopped, None)
+    except BaseException as exc:
+        _put(blocks, stopped, exc)
+
+
+def iter_decompressed_blocks(file_path: Path, block_size: int = BLOCK_SIZE) -> Iterator[bytes]:
+    """Yields the decompressed content of a compressed csv file as blocks of whole lines, each one a csv on its own.
+
+    The file is decompressed on a separate thread while the consumer parses the previous blocks, which overlap as
+    the decompression and the parsing both release the GIL. At most QUEUED_BLOCKS blocks wait for the consumer, so
+    the decompressed file is never held in memory as a whole. Every block starts with the header line, a file
+    without any rows yields the header line alone.
+    """
+    codec = detect_compression(file_path)
+    if codec is None:
+        raise ValueError("file is not compressed")
+
+    blocks: queue.Queue = queue.Queue(maxsize=QUEUED_BLOCKS)
+    stopped = threading.Event()
+    threading.Thread(
+        target=_decompress,
+        args=(file_path, codec, block_size, blocks, stopped),
+        name=f"decompress-{file_path.name}",
+        daemon=True,
+    ).start()
+    try:
+        while (block := blocks.get()) is not None:
+            if isinstance(block, BaseException):
+                raise block
+            yield block
+    finally:
+        stopped.set()
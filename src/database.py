@@ -0,0 +1,308 @@
+import hashlib
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, Callable
+
+import polars as pl
+
+from cache import file_fingerprint
+from models.processor import ProcessResult
+from processors import DataProcessor
+
+# Number of rows inserted per executemany call while loading the inputs
+LOAD_BATCH_ROWS = 100_000
+
+# Number of rows fetched at once by the queries, each batch is turned into a frame before the next one is fetched
+FETCH_BATCH_ROWS = 100_000
+
+# Tables of the "Moving forward" schema of the readme. The loaded rows have neither primary nor foreign keys on
+# orders and barcodes: duplicates and unknown orders are only reported by the validation, like the polars
+# processing keeps them, so the key columns are indexed instead.
+SCHEMA_SQL = """
+CREATE TABLE Customers (
+    customer_id INT PRIMARY KEY,
+    customer_name VARCHAR(255),
+    total_barcodes INT
+);
+CREATE TABLE Orders (
+    order_id INT,
+    customer_id INT
+);
+CREATE TABLE Barcodes (
+    barcode INT,
+    order_id INT
+);
+CREATE TABLE OrderBarcodes (
+    customer_id INT,
+    order_id INT,
+    barcodes TEXT
+);
+CREATE TABLE Metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Created once the rows are loaded, building an index in one go is much faster than updating it on every insert.
+# The orders index covers the customer, so orders are grouped in index order without sorting them.
+INDEXES_SQL = """
+CREATE INDEX idx_orders_order_id ON Orders (order_id, customer_id);
+CREATE INDEX idx_barcodes_order_id ON Barcodes (order_id);
+"""
+
+# The barcode totals of the customers and the barcodes of the orders are computed once while loading, so later runs
+# read the top customers from an index and the aggregate from a table, instead of joining the inputs again.
+# Barcodes of an order are visited in the order_id index, where equal keys are kept in insertion order, so the
+# lists keep the order of the input files.
+RESULTS_SQL = """
+INSERT INTO Customers (customer_id, total_barcodes)
+SELECT o.customer_id, COUNT(b.barcode)
+FROM Orders AS o
+LEFT JOIN Barcodes AS b ON b.order_id = o.order_id
+WHERE o.customer_id IS NOT NULL
+GROUP BY o.customer_id;
+CREATE INDEX idx_customers_total_barcodes ON Customers (total_barcodes);
+INSERT INTO OrderBarcodes (customer_id, order_id, barcodes)
+SELECT o.customer_id, o.order_id, '[' || group_concat(b.barcode, ', ') || ']'
+FROM Orders AS o INDEXED BY idx_orders_order_id
+JOIN Barcodes AS b ON b.order_id = o.order_id
+WHERE o.customer_id IS NOT NULL AND b.barcode IS NOT NULL
+GROUP BY o.order_id, o.customer_id;
+ANALYZE;
+"""
+
+AGGREGATED_SQL = "SELECT customer_id, order_id, barcodes FROM OrderBarcodes"
+
+CUSTOMER_TOTALS_SQL = "SELECT customer_id, total_barcodes FROM Customers WHERE total_barcodes > 0"
+
+TOP_CUSTOMERS_SQL = f"{CUSTOMER_TOTALS_SQL} ORDER BY total_barcodes DESC LIMIT ?"
+
+UNUSED_BARCODES_SQL = "SELECT COUNT(*) FROM Barcodes WHERE order_id IS NULL"
+
+
+def get_sources_key(file_paths: list[Path], variant: str = "") -> str:
+    """Hashes the fingerprints of all input files, to tell if a database was loaded from the same inputs.
+
+    The tables are hashed as well, databases of another layout are loaded again.
+    """
+    sources_hash = hashlib.blake2b(digest_size=16)
+    sources_hash.update(SCHEMA_SQL.encode())
+    for file_path in file_paths:
+        sources_hash.update(f"{file_path.resolve()}:{file_fingerprint(file_path, variant)}".encode())
+    return sources_hash.hexdigest()
+
+
+class SQLiteStore:
+    """Local SQLite database of the validated input rows.
+
+    The database is loaded in a single transaction, which also records the key of the input files it was loaded
+    from. Later runs on the same input files query the database without reading the files again.
+    Once loaded, the database is only read.
+    """
+
+    def __init__(self, database_path: Path):
+        """Initializes a SQLiteStore on the given database file, which is created on the first load."""
+        self.database_path = database_path
+        self._connection: sqlite3.Connection | None = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.database_path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.database_path)
+        return self._connection
+
+    def is_current(self, sources_key: str) -> bool:
+        """Checks if the database was loaded from the input files of the given key."""
+        if not self.database_path.exists():
+            return False
+        try:
+            row = self.connection.execute("SELECT value FROM Metadata WHERE key = 'sources'").fetchone()
+        except sqlite3.DatabaseError:
+            # Not a database loaded by the store, it is replaced by the next load
+            return False
+        return row is not None and row[0] == sources_key
+
+    @staticmethod
+    def _execute_script(cursor: sqlite3.Cursor, script: str) -> None:
+        # executescript would commit the pending transaction first, so the statements are run one by one
+        for statement in script.split(";"):
+            if statement.strip():
+                cursor.execute(statement)
+
+    @staticmethod
+    def _insert(cursor: sqlite3.Cursor, table: str, df: pl.DataFrame | pl.LazyFrame) -> None:
+        """Inserts the rows of the frame in batches, categorical columns are stored as their text."""
+        if isinstance(df, pl.LazyFrame):
+            df = df.collect(streaming=True)
+        df = df.with_columns(pl.col(pl.Categorical).cast(pl.Utf8))
+        insert_sql = f"INSERT INTO {table} ({', '.join(df.columns)}) VALUES ({', '.join('?' * df.width)})"
+        for batch_df in df.iter_slices(LOAD_BATCH_ROWS):
+            cursor.executemany(insert_sql, batch_df.iter_rows())
+
+    def load(
+        self, barcodes_df: pl.DataFrame | pl.LazyFrame, orders_df: pl.DataFrame | pl.LazyFrame, sources_key: str
+    ) -> None:
+        """Replaces the database with a new one holding the given rows, loaded in a single transaction.
+
+        The new database is built in a temporary file and then moved over the previous one, so neither journaling
+        nor syncing is needed while loading, an interrupted load never leaves a partial database behind.
+        The tables are created without indexes, the indexes are built once all rows are inserted.
+        """
+        self.database_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.database_path.with_suffix(".tmp")
+        tmp_path.unlink(missing_ok=True)
+        # Transactions are handled explicitly instead of being opened implicitly by the module
+        connection = sqlite3.connect(tmp_path, isolation_level=None)
+        try:
+            connection.execute("PRAGMA journal_mode = OFF")
+            connection.execute("PRAGMA synchronous = OFF")
+            cursor = connection.cursor()
+            cursor.execute("BEGIN")
+            self._execute_script(cursor, SCHEMA_SQL)
+            self._insert(cursor, "Orders", orders_df.select("order_id", "customer_id"))
+            self._insert(cursor, "Barcodes", barcodes_df.select("barcode", "order_id"))
+            self._execute_script(cursor, INDEXES_SQL)
+            self._execute_script(cursor, RESULTS_SQL)
+            cursor.execute("INSERT INTO Metadata (key, value) VALUES ('sources', ?)", (sources_key,))
+            cursor.execute("COMMIT")
+        except BaseException:
+            connection.close()
+            tmp_path.unlink(missing_ok=True)
+            raise
+        connection.close()
+
+        self.close()
+        os.replace(tmp_path, self.database_path)
+
+    def query(self, sql: str, parameters: tuple[Any, ...] = ()) -> pl.DataFrame:
+        """Runs a query and returns its rows as a frame.
+
+        Rows are fetched in batches, so only one batch of rows is held as Python objects at a time.
+        """
+        cursor = self.connection.execute(sql, parameters)
+        columns = [column[0] for column in cursor.description]
+        frames = []
+        while rows := cursor.fetchmany(FETCH_BATCH_ROWS):
+            frames.append(pl.DataFrame(rows, schema=columns, orient="row"))
+        if not frames:
+            return pl.DataFrame(schema=columns)
+        return pl.concat(frames, how="vertical_relaxed")
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class SQLiteProcessor(DataProcessor):
+    """Runs the aggregation, the top N customers and the unused barcodes count as indexed SQL queries.
+
+    The given dataframes are merged like in the polars processing, so the merged orders can be validated, and
+    they are loaded into the SQLite store once validated. Orders without barcodes or without customers are left
+    out by the queries, like the order validation drops them from the merged dataframe.
+    The top customers totals are always exact.
+    """
+
+    def __init__(self, store: SQLiteStore):
+        super().__init__()
+        self.store = store
+
+    def load(self, sources_key: str) -> ProcessResult:
+        """Loads the validated dataframes into the store, recording the key of their input files."""
+        if self.barcodes_df is None or self.orders_df is None:
+            return {"is_ok": False, "error": "Unable to load database: Dataframes are not set."}
+
+        try:
+            self.store.load(self.barcodes_df, self.orders_df, sources_key)
+            return {"is_ok": True}
+        except Exception as exc:
+            return {"is_ok": False, "error": f"Unable to load database {self.store.database_path.name}: {exc!s}"}
+
+    def _aggregated_data(self, as_list: bool) -> pl.DataFrame:
+        aggregated_df = self.store.query(AGGREGATED_SQL)
+        if not as_list:
+            return aggregated_df
+        return aggregated_df.with_columns(pl.col("barcodes").str.json_decode(pl.List(pl.UInt64)))
+
+    def get_aggregated_data(self, as_list: bool = False) -> ProcessResult:
+        """
+        Group the barcodes of every order with a customer into a list.
+
+        Args:
+            as_list (bool): Keep barcodes as a native list column, for output formats supporting nested data.
+
+        Returns:
+            pl.DataFrame: Aggregated DataFrame.
+        """
+        try:
+            return {"is_ok": True, "data": self._aggregated_data(as_list)}
+        except Exception as exc:
+            return {"is_ok": False, "error": f"Unable to aggregate data: {exc!s}"}
+
+    def get_results(
+        self, top_n: int = 5, as_list: bool = False, on_aggregated: Callable[[pl.DataFrame], None] | None = None
+    ) -> ProcessResult:
+        """
+        Get the aggregated data, the top N customers and the unused barcodes count from the store.
+
+        Args:
+            top_n (int): Number of top customers to retrieve.
+            as_list (bool): Keep barcodes as a native list column, for output formats supporting nested data.
+            on_aggregated (Callable | None): Called with the aggregated data as soon as it is computed, before the
+                top customers, e.g. to start writing it.
+
+        Returns:
+            dict: "aggregated" and "top_customers" DataFrames, and the "unused_barcodes" count.
+        """
+        try:
+            aggregated_df = self._aggregated_data(as_list)
+            if on_aggregated is not None:
+                on_aggregated(aggregated_df)
+            return {
+                "is_ok": True,
+                "data": {
+                    "aggregated": aggregated_df,
+                    "top_customers": self.store.query(TOP_CUSTOMERS_SQL, (top_n,)),
+                    "unused_barcodes": int(self.store.query(UNUSED_BARCODES_SQL).item()),
+                },
+            }
+        except Exception as exc:
+            return {"is_ok": False, "error": f"Unable to process data: {exc!s}"}
+
+    def get_customer_totals(self) -> ProcessResult:
+        """
+        Get the number of barcodes bought by each customer.
+
+        Returns:
+            pl.DataFrame: DataFrame with customer_id and total_barcodes columns.
+        """
+        try:
+            return {"is_ok": True, "data": self.store.query(CUSTOMER_TOTALS_SQL)}
+        except Exception as exc:
+            return {"is_ok": False, "error": f"Unable to calculate customer totals: {exc!s}"}
+
+    def get_top_n_customers(self, top_n: int = 5) -> ProcessResult:
+        """
+        Get top N customers who bought the most barcodes, the totals are always exact.
+
+        Returns:
+            pl.DataFrame: DataFrame with top N customers.
+        """
+        try:
+            return {"is_ok": True, "data": self.store.query(TOP_CUSTOMERS_SQL, (top_n,))}
+        except Exception as exc:
+            return {"is_ok": False, "error": f"Unable to calculate top N customers: {exc!s}"}
+
+    def get_unused_barcodes_count(self) -> ProcessResult:
+        """
+        Returns the count of unused barcodes.
+
+        Returns:
+            int: The count of unused barcodes.
+        """
+        try:
+            return {"is_ok": True, "data": int(self.store.query(UNUSED_BARCODES_SQL).item())}
+        except Exception as exc:
+            return {"is_ok": False, "error": f"Unable to calculate unused barcodes: {exc!s}"}
@@ -0,0 +1,57 @@
+import sqlite3
+
+from database import SQLiteProcessor, get_sources_key
+from tiqets_app import TiqetsApp
+
+
+class SQLiteTiqetsApp(TiqetsApp):
+    """Runs the application on a SQLite database of the validated input rows.
+
+    The input files are read, validated and bulk-loaded into the database on the first run. Later runs on the
+    same unchanged input files skip reading and validating them, and only query the database. The validation
+    errors are reported by the run loading the files.
+    The processor is expected to be a SQLiteProcessor.
+    """
+
+    processor: SQLiteProcessor
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sources_key = ""
+        self.is_loaded = False
+
+    def read_data(self) -> bool:
+        # Databases loaded with other column types are loaded again
+        self.sources_key = get_sources_key(
+            self.args.barcodes_file_paths + self.args.orders_file_paths, repr(self.schemas)
+        )
+        try:
+            self.is_loaded = self.processor.store.is_current(self.sources_key)
+        except sqlite3.Error as exc:
+            self.logger.error(f"Unable to open database {self.args.database_path.name}: {exc!s}")
+            return False
+
+        if self.is_loaded:
+            self.logger.debug(f"Database {self.args.database_path.name} is up to date, input files are not read.")
+            return True
+        return super().read_data()
+
+    def validate_data(self) -> bool:
+        if self.is_loaded:
+            return True
+        return super().validate_data()
+
+    def process_data(self) -> bool:
+        if not self.is_loaded:
+            with self.metrics.stage("load") as stage:
+                load_proc = self.processor.load(self.sources_key)
+                stage.is_ok = load_proc["is_ok"]
+            if not load_proc["is_ok"]:
+                self.logger.error(load_proc["error"])
+                return False
+            self.logger.debug(f"Database {self.args.database_path.name} loaded.")
+
+        try:
+            return super().process_data()
+        finally:
+            self.processor.store.close()
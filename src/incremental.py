@@ -0,0 +1,387 @@
+import json
+import os
+from pathlib import Path
+from typing import Callable
+
+import polars as pl
+
+from compression import detect_compression
+from models.errors import AppReaderError
+from models.processor import ProcessResult
+from processors import DataProcessor
+from readers import read_csv
+
+STATE_FILE = "state.json"
+# Generations saving only their changed orders and customers on top of a full snapshot, before a new snapshot
+COMPACTION_GENERATIONS = 8
+# Key column of every state frame saved as changes
+STATE_KEYS = {"orders": "order_id", "customers": "customer_id"}
+
+
+def read_delta(
+    file_path: Path, offset: int, schema: dict[str, pl.PolarsDataType] | None = None
+) -> tuple[pl.DataFrame, int]:
+    """Reads the csv rows appended to a file after the given byte offset.
+
+    The header line is always taken from the start of the file. The files are expected to only get rows
+    appended, the rows are read up to the last line break. A trailing line without line break may still be
+    being written, it is left to the next read.
+
+    Args:
+        file_path (Path): The csv file.
+        offset (int): The high-water mark of the previous read, 0 for a file that was never read.
+        schema (dict | None): Declared column types of the file, the types are inferred without it.
+
+    Returns:
+        tuple: The new rows and the offset to read from next time.
+    """
+    try:
+        # The offsets of a compressed file do not match the rows appended to it
+        if detect_compression(file_path) is not None:
+            raise ValueError("compressed files can not be read incrementally")
+        with open(file_path, "rb") as file:
+            header = file.readline()
+            if offset > os.fstat(file.fileno()).st_size:
+                raise ValueError("file is smaller than the already processed part, it was not only appended to")
+            start = max(offset, len(header))
+            file.seek(start)
+            data = file.read()
+            data = data[: data.rfind(b"\n") + 1]
+            new_offset = start + len(data)
+
+        if schema is not None and not data.strip():
+            return pl.DataFrame(schema=schema), new_offset
+        return read_csv(header + data, schema), new_offset
+    except Exception as exc:
+        raise AppReaderError(f"Unable to read file {file_path.name}: {exc!s}") from exc
+
+
+class IncrementalState:
+    """Persisted aggregates of the already processed input rows.
+
+    The state is made of the barcodes of every order, the barcode totals of every customer, the last top
+    customers, the unused barcodes count and the high-water mark of every input file. Every save writes a new
+    generation of the Arrow IPC files and then switches the json state file to it, so an interrupted run
+    leaves the previous state intact. Barcode rows are only appended, one file per generation, to detect
+    duplicates across runs.
+
+    A generation only saves the orders and customers changed by its run, which replace their previous rows
+    when loading, so a save costs the size of the delta rather than of the history. Every COMPACTION_GENERATIONS
+    generations the full frames are saved as a snapshot instead and the older files are removed, which bounds
+    the files read by a load.
+    """
+
+    def __init__(self, state_path: Path):
+        self.state_path = state_path
+        self.generation = 0
+        self.snapshot_generation = 0
+        self.offsets: dict[str, int] = {}
+        self.schemas: dict[str, dict[str, pl.PolarsDataType]] = {}
+        self.unused_barcodes = 0
+        self.orders_df: pl.DataFrame | None = None
+        self.customers_df: pl.DataFrame | None = None
+        self.top_customers_df: pl.DataFrame | None = None
+
+    @property
+    def is_new(self) -> bool:
+        return self.generation == 0
+
+    def _path(self, name: str, generation: int | None = None) -> Path:
+        return self.state_path / f"{name}_{self.generation if generation is None else generation:06d}.arrow"
+
+    def load(self) -> None:
+        """Loads the last saved state, memory-mapping its frames. A missing state results in an empty one."""
+        state_file = self.state_path / STATE_FILE
+        if not state_file.exists():
+            return
+
+        try:
+            state = json.loads(state_file.read_text())
+            self.generation = state["generation"]
+            self.offsets = state["offsets"]
+            self.schemas = {
+                name: {column: getattr(pl, dtype) for column, dtype in schema.items()}
+                for name, schema in state["schemas"].items()
+            }
+            self.snapshot_generation = state["snapshot_generation"]
+            self.unused_barcodes = state["unused_barcodes"]
+            self.orders_df = self._load_changes("orders")
+            self.customers_df = self._load_changes("customers")
+            self.top_customers_df = pl.read_ipc(self._path("top_customers"), memory_map=True)
+        except Exception as exc:
+            raise AppReaderError(f"Unable to read incremental state {state_file!s}: {exc!s}") from exc
+
+    def _load_changes(self, name: str) -> pl.DataFrame:
+        """Loads the snapshot of a frame and replaces its rows by the changed ones of every later generation."""
+        key = STATE_KEYS[name]
+        df = pl.read_ipc(self._path(name, self.snapshot_generation), memory_map=True)
+        for generation in range(self.snapshot_generation + 1, self.generation + 1):
+            changes_df = pl.read_ipc(self._path(name, generation), memory_map=True)
+            df = pl.concat([df.filter(~pl.col(key).is_in(changes_df[key])), changes_df], how="vertical_relaxed")
+        return df
+
+    def scan_barcodes(self) -> pl.LazyFrame | None:
+        """Scans the barcode rows of all saved generations."""
+        if self.is_new:
+            return None
+        barcodes_paths = [self._path("barcodes", generation) for generation in range(1, self.generation + 1)]
+        return pl.scan_ipc(barcodes_paths, memory_map=True)
+
+    def save(
+        self,
+        offsets: dict[str, int],
+        barcodes_df: pl.DataFrame,
+        changed_orders_df: pl.DataFrame,
+        changed_customers_df: pl.DataFrame,
+    ) -> None:
+        """Saves a new generation of the state together with the new high-water marks.
+
+        Args:
+            offsets (dict): The high-water mark of every input file.
+            barcodes_df (pl.DataFrame): The barcode rows read by the run.
+            changed_orders_df (pl.DataFrame): The orders of the current frames changed by the run.
+            changed_customers_df (pl.DataFrame): The customers of the current frames changed by the run.
+        """
+        previous_generation = self.generation
+        previous_snapshot_generation = self.snapshot_generation
+        self.generation += 1
+        self.offsets = offsets
+        self.state_path.mkdir(parents=True, exist_ok=True)
+        if self.generation - self.snapshot_generation >= COMPACTION_GENERATIONS or previous_generation == 0:
+            self.snapshot_generation = self.generation
+            changed_orders_df, changed_customers_df = self.orders_df, self.customers_df
+
+        # Written even when empty, to overwrite the leftover of an interrupted run with the same generation
+        barcodes_df.write_ipc(self._path("barcodes"), compression="uncompressed")
+        changed_orders_df.write_ipc(self._path("orders"), compression="uncompressed")
+        changed_customers_df.write_ipc(self._path("customers"), compression="uncompressed")
+        self.top_customers_df.write_ipc(self._path("top_customers"), compression="uncompressed")
+
+        state = {
+            "generation": self.generation,
+            "snapshot_generation": self.snapshot_generation,
+            "offsets": self.offsets,
+            "schemas": {
+                name: {column: str(dtype) for column, dtype in schema.items()} for name, schema in self.schemas.items()
+            },
+            "unused_barcodes": self.unused_barcodes,
+        }
+        tmp_file = self.state_path / f"{STATE_FILE}.tmp"
+        tmp_file.write_text(json.dumps(state, indent=2))
+        os.replace(tmp_file, self.state_path / STATE_FILE)
+
+        if previous_generation:
+            self._path("top_customers", previous_generation).unlink(missing_ok=True)
+        # The snapshot replaces the files of the previous snapshot and of the changes saved on top of it
+        if previous_generation and self.snapshot_generation == self.generation:
+            for generation in range(previous_snapshot_generation, self.generation):
+                for name in STATE_KEYS:
+                    self._path(name, generation).unlink(missing_ok=True)
+
+
+class IncrementalProcessor(DataProcessor):
+    """Merges the rows appended since the last run into the persisted aggregates.
+
+    The given dataframes are the deltas. Only the orders touched by them are regrouped, the barcode totals of
+    the touched customers are updated by the difference of their touched orders, and the top customers are
+    ranked among the previous top customers and the touched ones, as totals only grow with appended rows.
+    merged_df holds the touched orders only, so the inherited per-frame methods describe the delta, while
+    get_results and get_unused_barcodes_count cover the whole history.
+    """
+
+    def __init__(self, state: IncrementalState):
+        super().__init__()
+        self.state = state
+        self.touched_orders_df: pl.DataFrame | None = None
+        self.updated_orders_df: pl.DataFrame | None = None
+        self.pending_state: tuple[pl.DataFrame, pl.DataFrame, pl.DataFrame, int, pl.DataFrame] | None = None
+
+    def set_dataframes(self, barcodes_df: pl.DataFrame, orders_df: pl.DataFrame) -> ProcessResult:
+        """Sets the delta dataframes and regroups the barcodes of the orders they touch."""
+        try:
+            self.barcodes_df = barcodes_df
+            self.orders_df = orders_df
+            order_id_dtype = orders_df.schema["order_id"]
+            customer_id_dtype = orders_df.schema["customer_id"]
+            barcode_dtype = barcodes_df.schema["barcode"]
+
+            touched_ids = pl.concat(
+                [orders_df["order_id"], barcodes_df["order_id"].cast(order_id_dtype).drop_nulls()]
+            ).unique()
+            state_orders_df = (
+                self.state.orders_df
+                if self.state.orders_df is not None
+                else pl.DataFrame(
+                    schema={
+                        "order_id": order_id_dtype,
+                        "customer_id": customer_id_dtype,
+                        "barcodes": pl.List(barcode_dtype),
+                    }
+                )
+            )
+            self.touched_orders_df = state_orders_df.filter(pl.col("order_id").is_in(touched_ids))
+
+            # Long format of the touched orders, rows of orders without any barcode are flagged out of the lists.
+            # Null barcodes are left out, like the orders without barcodes dropped by the order validation.
+            is_barcode = pl.col("_is_barcode")
+            rows_df = pl.concat(
+                [
+                    self.touched_orders_df.with_columns((pl.col("barcodes").list.len() > 0).alias("_is_barcode"))
+                    .explode("barcodes")
+                    .rename({"barcodes": "barcode"}),
+                    orders_df.select(
+                        "order_id",
+                        "customer_id",
+                        pl.lit(None, dtype=barcode_dtype).alias("barcode"),
+                        pl.lit(False).alias("_is_barcode"),
+                    ),
+                    barcodes_df.filter(pl.col("order_id").is_not_null() & pl.col("barcode").is_not_null()).select(
+                        pl.col("order_id").cast(order_id_dtype),
+                        pl.lit(None, dtype=customer_id_dtype).alias("customer_id"),
+                        "barcode",
+                        pl.lit(True).alias("_is_barcode"),
+                    ),
+                ],
+                how="vertical_relaxed",
+            )
+            self.updated_orders_df = rows_df.group_by("order_id", maintain_order=True).agg(
+                pl.col("customer_id").drop_nulls().first(),
+                pl.col("barcode").filter(is_barcode).alias("barcodes"),
+            )
+
+            # Orders without barcodes explode into a null barcode, like the left join of the full processing
+            self.merged_df = (
+                self.updated_orders_df.filter(pl.col("customer_id").is_not_null())
+                .explode("barcodes")
+                .select("order_id", "customer_id", pl.col("barcodes").alias("barcode"))
+            )
+            return {"is_ok": True}
+        except Exception as exc:
+            return {"is_ok": False, "error": f"Unable to set dataframes: {exc!s}"}
+
+    @staticmethod
+    def _order_totals(orders_df: pl.DataFrame, sign: int = 1) -> pl.DataFrame:
+        """Returns the signed barcode count of every order with a customer and at least one barcode."""
+        return orders_df.filter(pl.col("customer_id").is_not_null()).select(
+            "customer_id", (pl.col("barcodes").list.len().cast(pl.Int64) * sign).alias("total_barcodes")
+        )
+
+    def _update_customers(self, top_n: int) -> tuple[pl.DataFrame, pl.DataFrame, pl.DataFrame]:
+        """Adds the barcode count changes of the touched orders to the customer totals and re-ranks them.
+
+        Returns the updated customer totals, the top customers and the totals of the touched customers.
+        """
+        customer_id_dtype = self.orders_df.schema["customer_id"]
+        customers_df = (
+            self.state.customers_df
+            if self.state.customers_df is not None
+            else pl.DataFrame(schema={"customer_id": customer_id_dtype, "total_barcodes": pl.Int64})
+        )
+
+        changes_df = (
+            pl.concat([self._order_totals(self.updated_orders_df), self._order_totals(self.touched_orders_df, -1)])
+            .group_by("customer_id")
+            .agg(pl.sum("total_barcodes"))
+        )
+        touched_customers_df = (
+            pl.concat([customers_df.filter(pl.col("customer_id").is_in(changes_df["customer_id"])), changes_df])
+            .group_by("customer_id")
+            .agg(pl.sum("total_barcodes"))
+            .filter(pl.col("total_barcodes") > 0)
+        )
+        is_untouched = ~pl.col("customer_id").is_in(touched_customers_df["customer_id"])
+        customers_df = pl.concat([customers_df.filter(is_untouched), touched_customers_df])
+
+        # Untouched customers outside of the previous top customers can not have overtaken them
+        top_customers_df = self.state.top_customers_df
+        if top_customers_df is None or top_customers_df.height < min(top_n, customers_df.height):
+            candidates_df = customers_df
+        else:
+            candidates_df = pl.concat([top_customers_df.filter(is_untouched), touched_customers_df])
+        return customers_df, self._top_customers(candidates_df, top_n), touched_customers_df
+
+    def get_results(
+        self, top_n: int = 5, as_list: bool = False, on_aggregated: Callable[[pl.DataFrame], None] | None = None
+    ) -> ProcessResult:
+        """
+        Get the aggregated data, the top N customers and the unused barcodes count of the whole history.
+
+        The touched orders replace their previous aggregates. The state itself is only updated by save_state,
+        once the output is written.
+
+        Args:
+            top_n (int): Number of top customers to retrieve.
+            as_list (bool): Keep barcodes as a native list column, for output formats supporting nested data.
+            on_aggregated (Callable | None): Called with the aggregated data as soon as it is computed, before the
+                top customers, e.g. to start writing it.
+
+        Returns:
+            dict: "aggregated" and "top_customers" DataFrames, and the "unused_barcodes" count.
+        """
+        err_prefix = "Unable to process data:"
+        if self.updated_orders_df is None:
+            return {
+                "is_ok": False,
+                "error": f"{err_prefix} Merged dataset is empty.",
+            }
+
+        try:
+            orders_df = self.updated_orders_df
+            if self.state.orders_df is not None:
+                is_untouched = ~pl.col("order_id").is_in(self.touched_orders_df["order_id"])
+                orders_df = pl.concat([self.state.orders_df.filter(is_untouched), orders_df], how="vertical_relaxed")
+            aggregated_df = orders_df.filter(
+                pl.col("customer_id").is_not_null() & (pl.col("barcodes").list.len() > 0)
+            ).select("customer_id", "order_id", "barcodes")
+            if not as_list:
+                aggregated_df = self._with_barcodes_list_text(aggregated_df)
+            if on_aggregated is not None:
+                on_aggregated(aggregated_df)
+
+            customers_df, top_customers_df, touched_customers_df = self._update_customers(top_n)
+            unused_barcodes = self.get_unused_barcodes_count()["data"]
+
+            self.pending_state = (orders_df, customers_df, top_customers_df, unused_barcodes, touched_customers_df)
+            return {
+                "is_ok": True,
+                "data": {
+                    "aggregated": aggregated_df,
+                    "top_customers": top_customers_df,
+                    "unused_barcodes": unused_barcodes,
+                },
+            }
+        except Exception as exc:
+            return {"is_ok": False, "error": f"{err_prefix} {exc!s}"}
+
+    def _with_barcodes_list_text(self, aggregated_df: pl.DataFrame) -> pl.DataFrame:
+        """Renders the barcodes lists as the text of python lists, quoting string items. Lists hold no nulls."""
+        barcode_dtype = aggregated_df.schema["barcodes"].inner
+        if barcode_dtype == pl.Utf8:
+            aggregated_df = aggregated_df.with_columns(
+                pl.col("barcodes").list.eval(self._barcode_text(barcode_dtype, pl.element()))
+            )
+        return aggregated_df.with_columns(self._barcodes_list_text(aggregated_df.schema["barcodes"]))
+
+    def save_state(self, offsets: dict[str, int]) -> None:
+        """Applies the results of the last get_results call to the state and saves it with the high-water marks."""
+        (
+            self.state.orders_df,
+            self.state.customers_df,
+            self.state.top_customers_df,
+            self.state.unused_barcodes,
+            touched_customers_df,
+        ) = self.pending_state
+        self.state.save(offsets, self.barcodes_df, self.updated_orders_df, touched_customers_df)
+        self.pending_state = None
+
+    def get_unused_barcodes_count(self) -> ProcessResult:
+        """
+        Returns the count of unused barcodes, adding the ones of the delta to the persisted count.
+
+        Returns:
+            int: The count of unused barcodes.
+        """
+        unused_barcodes_proc = super().get_unused_barcodes_count()
+        if unused_barcodes_proc["is_ok"]:
+            unused_barcodes_proc["data"] += self.state.unused_barcodes
+        return unused_barcodes_proc
@@ -0,0 +1,110 @@
+from pathlib import Path
+
+import polars as pl
+
+from incremental import IncrementalProcessor, read_delta
+from models.errors import AppReaderError
+from models.validator import ValidationResult
+from tiqets_app import TiqetsApp
+
+
+class IncrementalTiqetsApp(TiqetsApp):
+    """Runs the application incrementally on inputs that only get rows appended.
+
+    Only the rows appended since the last run are read, from the high-water mark of every input file, and
+    merged into the aggregates persisted by the incremental processor. The state is saved once the output
+    file is written, so a failed run is simply repeated from the previous high-water marks.
+    The processor is expected to be an IncrementalProcessor.
+    """
+
+    processor: IncrementalProcessor
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.offsets: dict[str, int] = {}
+
+    def _read_deltas(self, file_paths: list[Path], name: str) -> pl.DataFrame:
+        """Reads the new rows of all files of a dataset, with the column types declared at the first run."""
+        state = self.processor.state
+        schema = state.schemas.setdefault(name, self.schemas[name])
+        delta_dfs = []
+        for file_path in file_paths:
+            key = str(file_path.resolve())
+            delta_df, self.offsets[key] = read_delta(file_path, state.offsets.get(key, 0), schema)
+            delta_dfs.append(delta_df)
+        return pl.concat(delta_dfs, how="vertical_relaxed")
+
+    def read_data(self) -> bool:
+        state = self.processor.state
+        try:
+            state.load()
+            self.barcodes_df = self._read_deltas(self.args.barcodes_file_paths, "barcodes")
+            self.orders_df = self._read_deltas(self.args.orders_file_paths, "orders")
+        except AppReaderError as exc:
+            self.logger.error(f"{exc!s}")
+            return False
+
+        # Empty deltas are fine once there is a state, the output is then generated from the state alone
+        if state.is_new and self._is_empty(self.barcodes_df):
+            self.logger.warning(f"No data row in barcodes file: {self.args.barcodes_file}")
+            return False
+        if state.is_new and self._is_empty(self.orders_df):
+            self.logger.warning(f"No data row in orders file: {self.args.orders_file}")
+            return False
+
+        self.logger.debug(
+            f"Incremental state generation {state.generation} loaded. New rows: {self.barcodes_df.height} barcodes, "
+            f"{self.orders_df.height} orders."
+        )
+        return True
+
+    def validate_data(self) -> bool:
+        self.barcodes_df = self._apply_schema(self.barcodes_df, "barcodes")
+        self.orders_df = self._apply_schema(self.orders_df, "orders")
+
+        # Duplicates of the new barcodes and orders are searched among the ones of the previous runs as well.
+        # Barcodes may be appended before their orders, so they are not checked against the known orders.
+        state = self.processor.state
+        barcodes_df = self.barcodes_df
+        history_lf = state.scan_barcodes()
+        if history_lf is not None:
+            duplicates_df = history_lf.filter(pl.col("barcode").is_in(self.barcodes_df["barcode"])).collect()
+            barcodes_df = pl.concat([duplicates_df, self.barcodes_df], how="vertical_relaxed")
+        barcode_validation: ValidationResult = self.validator.validate_barcodes(barcodes_df, "barcode")
+        self._log_validation_errors(barcode_validation)
+
+        orders_df = self.orders_df
+        if state.orders_df is not None:
+            # Orders of the state without a customer only had barcodes so far, they were not appended yet
+            duplicates_df = state.orders_df.filter(
+                pl.col("order_id").is_in(self.orders_df["order_id"]) & pl.col("customer_id").is_not_null()
+            )
+            orders_df = pl.concat(
+                [duplicates_df.select(self.orders_df.columns), self.orders_df], how="vertical_relaxed"
+            )
+        self._log_validation_errors(self.validator.validate_order_ids(orders_df, "order_id"))
+
+        set_df_proc = self.processor.set_dataframes(self.barcodes_df, self.orders_df)
+        if not set_df_proc["is_ok"]:
+            self.logger.error(set_df_proc["error"])
+            return False
+
+        # Only the touched orders are checked, as the orders of the previous runs were already reported
+        order_validation = self.validator.validate_orders(self.processor.merged_df, "barcode")
+        self._log_validation_errors(order_validation)
+
+        self._log_rule_timings()
+        return self._write_quarantine()
+
+    def process_data(self) -> bool:
+        if not super().process_data():
+            return False
+
+        try:
+            self.processor.save_state(self.offsets)
+        except Exception as exc:
+            self.logger.error(f"Unable to save incremental state {self.processor.state.state_path!s}: {exc!s}")
+            return False
+        self.logger.debug(f"Incremental state generation {self.processor.state.generation} saved.")
+
+        return True
@@ -1,45 +1,285 @@
-from models.processor import BaseProcessor
-from models.reader import BaseReader
-from models.validator import BaseValidator
-from processors import DataProcessor
-from readers import CSVReader
-from tiqets_app import TiqetsApp
+import dataclasses
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from app_arguments import DEFAULT_MEMORY_BUDGET, AppArguments
+from models.errors import AppConfigError, AppError
 from utils import get_logger, parse_args
-from validators import DataValidator
+
+# The application modules import polars, so they are only imported once a run needs them. The help and the
+# argument errors are returned without importing them.
+if TYPE_CHECKING:
+    from models.processor import BaseProcessor
+    from query_profile import QueryProfiler
+    from server import DatasetSnapshot
+    from tiqets_app import TiqetsApp
+
+
+def get_execution_mode(
+    args: AppArguments, profiler: "QueryProfiler | None" = None
+) -> "tuple[BaseProcessor, type[TiqetsApp]]":
+    """Returns the processor and the application class of the execution mode given by the arguments.
+
+    The query plans of the polars processors are collected by the given profiler.
+    """
+    from processors import DataProcessor
+
+    if args.serve:
+        from server import ServeTiqetsApp
+
+        return DataProcessor(profiler), ServeTiqetsApp
+    if args.out_of_core:
+        from partitioned_app import PartitionedTiqetsApp
+
+        return DataProcessor(profiler), PartitionedTiqetsApp
+    if args.incremental:
+        from incremental import IncrementalProcessor, IncrementalState
+        from incremental_app import IncrementalTiqetsApp
+
+        return IncrementalProcessor(IncrementalState(args.state_path)), IncrementalTiqetsApp
+    if args.backend == "sqlite":
+        from database import SQLiteProcessor, SQLiteStore
+        from database_app import SQLiteTiqetsApp
+
+        return SQLiteProcessor(SQLiteStore(args.database_path)), SQLiteTiqetsApp
+
+    from tiqets_app import TiqetsApp
+
+    return DataProcessor(profiler), TiqetsApp
+
+
+def _megabytes(size: int) -> str:
+    return f"{size / 1024**2:,.1f} MB"
+
+
+def _budget(size: int) -> int:
+    # Memory budgets are given in whole megabytes
+    return max(size // 1024**2, 1)
+
+
+def select_execution_mode(args: AppArguments, logger: logging.Logger) -> None:
+    """Switches to the out-of-core execution when the in-memory execution is not expected to fit in the memory.
+
+    The memory of reading, joining and aggregating the inputs in memory is estimated from their sizes and sampled
+    rows, and compared with the memory given to the run or the memory limit of the container. Runs with a given
+    execution mode, like the lazy, out-of-core, incremental or serve modes or the sqlite backend, keep it. The
+    choice is logged with the estimate it is based on.
+
+    The partitions of the out-of-core execution keep a given memory budget. Otherwise their budget is derived from
+    the memory the execution is selected from, or from the given memory of the run when the mode is given.
+    """
+    from memory_planning import (
+        HEADROOM,
+        estimate_memory,
+        memory_limit,
+        partition_budget,
+    )
+    from memory_planning import select_execution_mode as select_mode
+
+    if args.out_of_core and args.memory_budget is None:
+        args.memory_budget = (
+            DEFAULT_MEMORY_BUDGET if args.max_memory is None else _budget(partition_budget(args.max_memory * 1024**2))
+        )
+    if args.lazy or args.out_of_core or args.incremental or args.serve or args.backend != "polars":
+        return
+    max_memory = memory_limit() if args.max_memory is None else args.max_memory * 1024**2
+    if max_memory is None:
+        logger.debug("Running in memory, the memory limit is not known.")
+        return
+    try:
+        estimate = estimate_memory(args.barcodes_file_paths, args.orders_file_paths)
+    except (OSError, ValueError) as exc:
+        # Unreadable inputs are reported by the reader
+        logger.debug(f"Running in memory, the memory of the inputs can not be estimated: {exc!s}")
+        return
+
+    mode, budget = select_mode(estimate, max_memory)
+    reasoning = (
+        f"the in-memory execution of about {estimate.barcodes_rows:,} barcodes and {estimate.orders_rows:,} orders is "
+        f"estimated to peak at {_megabytes(estimate.peak_bytes)} (read {_megabytes(estimate.read_bytes)}, join "
+        f"{_megabytes(estimate.join_bytes)}, aggregation {_megabytes(estimate.aggregation_bytes)}), {HEADROOM:.0%} of "
+        f"the {_megabytes(max_memory)} memory can be used"
+    )
+    if mode == "eager":
+        logger.info(f"Running in memory, {reasoning}.")
+    elif args.barcode_index:
+        logger.warning(f"Running in memory as the barcode index is written, although {reasoning}.")
+    else:
+        args.out_of_core = True
+        if args.memory_budget is None:
+            args.memory_budget = _budget(budget)
+        logger.info(f"Running out-of-core with partitions of {args.memory_budget} MB, {reasoning}.")
+
+
+def create_app(args: AppArguments, logger: logging.Logger) -> "TiqetsApp":
+    """Creates the application of the execution mode with its dependencies.
+
+    Without a given execution mode, the mode is selected from the estimated memory of the inputs.
+    """
+    from cache import ParsedInputCache
+    from models.reader import BaseReader
+    from models.validator import BaseValidator
+    from models.writer import BaseWriter
+    from quarantine import QuarantineSink
+    from query_profile import QueryProfiler
+    from readers import CachedReader, CSVReader, LazyCSVReader
+    from validators import DataValidator
+    from writers import CSVWriter, IPCWriter, NDJSONWriter, ParquetWriter
+
+    select_execution_mode(args, logger)
+    reader: BaseReader = LazyCSVReader() if args.lazy or args.out_of_core else CSVReader()
+    # The out-of-core and incremental executions read the csv files in parts, the cache would not pay off
+    if not args.no_cache and not args.out_of_core and not args.incremental:
+        reader = CachedReader(reader, ParsedInputCache(args.cache_path, args.cache_size * 1024**2), args.lazy)
+    profiler = QueryProfiler(args.explain, args.profile)
+    validator: BaseValidator = DataValidator(
+        args.enabled_rules or (), args.disabled_rules or (), timed=args.rule_timings and args.debug, profiler=profiler
+    )
+    writers: dict[str, BaseWriter] = {
+        "csv": CSVWriter(args.fsync),
+        "parquet": ParquetWriter(args.parquet_compression, args.parquet_row_group_size, args.fsync),
+        "ipc": IPCWriter(args.fsync),
+        "ndjson": NDJSONWriter(args.fsync),
+    }
+
+    processor, app_class = get_execution_mode(args, profiler)
+    quarantine = (
+        None
+        if args.quarantine_format == "none"
+        else QuarantineSink(writers[args.quarantine_format], args.quarantine_file_path)
+    )
+    return app_class(args, logger, reader, validator, processor, writers[args.output_format], quarantine, profiler)
+
+
+def run_app(app: "TiqetsApp", logger: logging.Logger, timings: dict[str, float] | None = None) -> bool:
+    """Reads, validates and processes the data, stopping at the first failing step.
+
+    Every step is measured by the metrics of the application, which are written once the run is over. The seconds
+    spent on every step are added to the timings, when given. The application is closed once the run is over, even
+    when a step raises.
+    """
+    try:
+        for step, action, run_step in [
+            ("read", "reading", app.read_data),
+            ("validate", "validating", app.validate_data),
+            ("process", "processing", app.process_data),
+        ]:
+            with app.metrics.stage(run_step.__name__) as stage:
+                stage.is_ok = run_step()
+            if timings is not None:
+                timings[step] = stage.wall_seconds
+            if not stage.is_ok:
+                logger.debug(f"Process terminated because of errors on {action} data")
+                break
+        else:
+            logger.debug("Process finished successfully.")
+    finally:
+        app.close()
+
+    app.write_metrics(stage.is_ok)
+    app.write_query_profile()
+    return stage.is_ok
+
+
+def serve(args: AppArguments, logger: logging.Logger) -> None:
+    """Serves the processed data over HTTP until interrupted, reloading it when the input files change."""
+
+    from server import SnapshotServer
+
+    def load_snapshot() -> "DatasetSnapshot | None":
+        app = create_app(args, logger)
+        return app.snapshot if run_app(app, logger) else None
+
+    try:
+        server = SnapshotServer(
+            (args.host, args.port),
+            load_snapshot,
+            args.barcodes_file_paths + args.orders_file_paths,
+            logger,
+            args.top_n,
+            args.reload_interval,
+        )
+    except (AppError, OSError) as exc:
+        logger.error(f"{exc!s}")
+        return
+    logger.info(f"Serving on http://{args.host}:{server.server_port}, press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Server stopped.")
+    finally:
+        server.server_close()
+
+
+def watch(args: AppArguments, logger: logging.Logger) -> None:
+    """Processes the inputs, then processes them again whenever their files change, until interrupted.
+
+    Every cycle runs in the same process, so the imported modules and the parsed-input cache stay warm. The
+    input paths are resolved again on every cycle, picking up the files dropped meanwhile, and every cycle
+    writes its own output file.
+    """
+    from watcher import DirectoryWatcher
+
+    watcher = DirectoryWatcher(
+        [args.barcodes_file_path, args.orders_file_path], args.watch_debounce, args.watch_polling
+    )
+    logger.info(f"Watching the input files with {watcher.method}, press Ctrl+C to stop.")
+    cycle, changed_files = 0, [*args.barcodes_file_paths, *args.orders_file_paths]
+    try:
+        while True:
+            cycle += 1
+            started = time.perf_counter()
+            try:
+                # Resolves the input shards and the output file of the cycle again
+                cycle_args = dataclasses.replace(args)
+            except AppConfigError as exc:
+                logger.error(f"{exc!s}")
+            else:
+                is_ok = run_app(create_app(cycle_args, logger), logger)
+                logger.info(
+                    f"Cycle {cycle} {'finished' if is_ok else 'failed'} in {time.perf_counter() - started:.2f}s, "
+                    f"changed files: {', '.join(file_path.name for file_path in changed_files)}."
+                )
+            changed_files = watcher.wait_for_changes()
+    except KeyboardInterrupt:
+        logger.info("Watching stopped.")
+    finally:
+        watcher.close()
+
+
+def log_timings(timings: dict[str, float], logger: logging.Logger) -> None:
+    total = sum(timings.values())
+    logger.info(
+        f"Timings: {', '.join(f'{step} {seconds:.3f}s' for step, seconds in timings.items())}, total {total:.3f}s."
+    )
 
 
 # Main function
 def main():
     """Execute the main logic of the application."""
     # Parse command-line arguments
+    started = time.perf_counter()
     args = parse_args()
     logger = get_logger("MainApp", args.debug)
+    timings = {"arguments": time.perf_counter() - started}
 
     logger.debug(f"Starting process with args: {args}")
 
-    # Create instances of dependencies
-    reader: BaseReader = CSVReader()
-    validator: BaseValidator = DataValidator()
-    processor: BaseProcessor = DataProcessor()
-
-    app = TiqetsApp(args, logger, reader, validator, processor)
-
-    is_ok = app.read_data()
-    if not is_ok:
-        logger.debug("Process terminated because of errors on reading data")
+    if args.serve:
+        serve(args, logger)
         return
-
-    is_ok = app.validate_data()
-    if not is_ok:
-        logger.debug("Process terminated because of errors on validating data")
-        return
-
-    is_ok = app.process_data()
-    if not is_ok:
-        logger.debug("Process terminated because of errors on processing data")
+    if args.watch:
+        watch(args, logger)
         return
 
-    logger.debug("Process finished successfully.")
+    # The application modules are imported by the creation of the application
+    started = time.perf_counter()
+    app = create_app(args, logger)
+    timings["imports"] = time.perf_counter() - started
+    run_app(app, logger, timings)
+    if args.timings:
+        log_timings(timings, logger)
 
 
 # App entry point
@@ -0,0 +1,143 @@
+import math
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from compression import COMPRESSION_RATIO, detect_compression, open_decompressed
+
+# Bytes read at every sampled place of a csv file to estimate the size of its rows
+SAMPLE_BYTES = 16 * 1024
+# Sampled places of plain csv files
+SAMPLES = 4
+# Bytes of a parsed integer value
+VALUE_BYTES = 8
+# Share of the memory limit the estimated peak may reach, the rest is left to the interpreter, the polars buffers
+# and the estimation error
+HEADROOM = 0.7
+# Cgroup limits from this value on stand for no limit
+UNLIMITED_BYTES = 2**60
+
+
+def memory_limit(cgroup_path: Path = Path("/sys/fs/cgroup")) -> int | None:
+    """Returns the memory limit of the cgroup of the container in bytes, or the physical memory when it is lower.
+
+    Both the cgroup v2 "memory.max" and the cgroup v1 "memory.limit_in_bytes" files are read. Returns None when
+    neither a limit nor the physical memory is known.
+    """
+    limits = []
+    for limit_path in [cgroup_path / "memory.max", cgroup_path / "memory" / "memory.limit_in_bytes"]:
+        try:
+            value = limit_path.read_text().strip()
+        except OSError:
+            continue
+        # "max" stands for no limit on cgroup v2
+        if value.isdigit() and int(value) < UNLIMITED_BYTES:
+            limits.append(int(value))
+    try:
+        limits.append(os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE"))
+    except (AttributeError, ValueError, OSError):
+        # Not available on windows
+        pass
+    return min(limits, default=None)
+
+
+def _sampled_lines(sample: bytes, is_line_start: bool, is_file_end: bool) -> list[bytes]:
+    # Lines cut by the start or the end of the sample are left out
+    lines = sample.split(b"\n")
+    lines = lines[(0 if is_line_start else 1) : (None if is_file_end else -1)]
+    return [line for line in lines if line.strip()]
+
+
+def sample_csv(file_path: Path) -> tuple[int, int, float]:
+    """Returns the estimated rows, the columns and the average bytes per row of a csv file, from sampled lines.
+
+    Plain files are sampled in the middle of evenly spread parts of the file, as the size of the rows may grow along
+    the file, e.g. with increasing ids. Compressed files are only sampled at their start, and their rows are estimated
+    from the decompressed lines and a typical compression ratio.
+    """
+    codec = detect_compression(file_path)
+    file_size = os.path.getsize(file_path)
+    lines: list[bytes] = []
+    with open_decompressed(file_path, codec) as file:
+        header = file.readline()
+        # Seeking into a compressed file would decompress all data before the offset
+        offsets = (
+            [None]
+            if codec is not None
+            else [len(header) + (file_size - len(header)) * (2 * idx + 1) // (2 * SAMPLES) for idx in range(SAMPLES)]
+        )
+        for offset in offsets:
+            if offset is not None:
+                file.seek(offset)
+            sample = file.read(SAMPLE_BYTES)
+            lines += _sampled_lines(sample, offset is None, len(sample) < SAMPLE_BYTES)
+
+    if not lines:
+        return 0, header.count(b",") + 1, 1.0
+    row_bytes = sum(len(line) + 1 for line in lines) / len(lines)
+    data_bytes = file_size * (1 if codec is None else COMPRESSION_RATIO) - len(header)
+    return math.ceil(max(data_bytes, 0) / row_bytes), header.count(b",") + 1, row_bytes
+
+
+@dataclass
+class MemoryEstimate:
+    """Estimated memory of the in-memory execution of the inputs.
+
+    - barcodes_rows: The estimated rows of the barcodes files.
+    - orders_rows: The estimated rows of the orders files.
+    - read_bytes: The parsed barcodes and orders frames.
+    - join_bytes: The barcodes joined with the customers of their orders.
+    - aggregation_bytes: The barcodes grouped by order, with their rendering as text in the output.
+    """
+
+    barcodes_rows: int
+    orders_rows: int
+    read_bytes: int
+    join_bytes: int
+    aggregation_bytes: int
+
+    @property
+    def peak_bytes(self) -> int:
+        # The read frames, the joined frame and the aggregation are held at the same time
+        return self.read_bytes + self.join_bytes + self.aggregation_bytes
+
+
+def estimate_memory(barcodes_file_paths: list[Path], orders_file_paths: list[Path]) -> MemoryEstimate:
+    """Estimates the memory of reading, joining and aggregating the inputs from their sizes and sampled rows."""
+    barcodes_samples = [sample_csv(file_path) for file_path in barcodes_file_paths]
+    orders_samples = [sample_csv(file_path) for file_path in orders_file_paths]
+    barcodes_rows = sum(rows for rows, _, _ in barcodes_samples)
+    orders_rows = sum(rows for rows, _, _ in orders_samples)
+    # Text width of the barcodes of an order, about the length of their csv lines
+    barcode_text_bytes = max((row_bytes for _, _, row_bytes in barcodes_samples), default=0)
+
+    return MemoryEstimate(
+        barcodes_rows=barcodes_rows,
+        orders_rows=orders_rows,
+        read_bytes=VALUE_BYTES * sum(rows * columns for rows, columns, _ in barcodes_samples + orders_samples),
+        # barcode, order_id and customer_id of every barcode
+        join_bytes=VALUE_BYTES * 3 * barcodes_rows,
+        # customer_id, order_id and the list offset of every order, the listed barcodes and their text
+        aggregation_bytes=int(VALUE_BYTES * (3 * orders_rows + barcodes_rows) + barcode_text_bytes * barcodes_rows),
+    )
+
+
+def partition_budget(max_memory: int) -> int:
+    """Returns the memory budget in bytes of a partition of the chunked execution within the memory of the run.
+
+    The partitions take half of the usable memory, the other half is left to the reading and spilling of the input
+    batches and to the results.
+    """
+    return int(max_memory * HEADROOM) // 2
+
+
+def select_execution_mode(estimate: MemoryEstimate, max_memory: int) -> tuple[str, int | None]:
+    """Returns "eager" when the estimated peak fits in the memory, or "chunked" with the memory budget of a partition.
+
+    Args:
+        estimate (MemoryEstimate): Estimated memory of the in-memory execution.
+        max_memory (int): Memory available to the run in bytes.
+    """
+    if estimate.peak_bytes <= int(max_memory * HEADROOM):
+        return "eager", None
+    return "chunked", partition_budget(max_memory)
@@ -0,0 +1,185 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Iterator
+
+from models.errors import AppWriterError
+
+try:
+    import resource
+except ImportError:  # Not available on windows, the peak RSS is then not measured
+    resource = None  # type: ignore[assignment]
+
+
+def peak_rss() -> int | None:
+    """Returns the peak resident set size of the process in bytes, None if it can not be measured."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def _frame_sizes(frames: tuple[Any, ...]) -> tuple[int | None, int | None]:
+    """Returns the rows and the estimated bytes of dataframes or series, None if any of them is lazy."""
+    if not frames or any(not hasattr(frame, "estimated_size") for frame in frames):
+        return None, None
+    return sum(len(frame) for frame in frames), sum(frame.estimated_size() for frame in frames)
+
+
+@dataclass
+class StageMetrics:
+    """Measures of a stage of a run.
+
+    - name: The name of the stage, prefixed by the names of its enclosing stages, e.g. "validate_data.barcodes".
+    - wall_seconds: The elapsed time of the stage.
+    - cpu_seconds: The CPU time of all threads of the process during the stage.
+    - peak_rss_delta_bytes: How much the stage raised the peak RSS of the process, 0 if it stayed below an earlier
+      peak. None if the peak RSS can not be measured.
+    - rows_in: The rows of the frames the stage started from, None if they are lazy or not set.
+    - rows_out: The rows of the frames the stage produced, None if they are lazy or not set.
+    - estimated_bytes: The estimated size of the frames the stage produced, None if they are lazy or not set.
+    - is_ok: Whether the stage succeeded.
+    """
+
+    name: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_rss_delta_bytes: int | None = None
+    rows_in: int | None = None
+    rows_out: int | None = None
+    estimated_bytes: int | None = None
+    is_ok: bool = True
+
+    def set_input(self, *frames: Any) -> None:
+        self.rows_in, _ = _frame_sizes(frames)
+
+    def set_output(self, *frames: Any) -> None:
+        self.rows_out, self.estimated_bytes = _frame_sizes(frames)
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _write_atomically(file_path: Path, text: str) -> None:
+    """Writes the text to a temporary file renamed over the file, so readers never see a partial file."""
+    tmp_path = file_path.with_name(f".{file_path.name}.tmp")
+    try:
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(text)
+        os.replace(tmp_path, file_path)
+    except OSError as exc:
+        raise AppWriterError(f"Unable to write metrics file {file_path.name}: {exc!s}") from exc
+
+
+class MetricsRecorder:
+    """Records the wall time, CPU time, peak RSS delta, rows and frame sizes of the stages of a run.
+
+    Stages are nested: a stage started within another one is named after it, and stages are listed in the order
+    they started, so the sub-steps of a stage follow it. Stages may run concurrently on several threads, a stage
+    run on another thread than its enclosing stage is given the enclosing stage as parent.
+    """
+
+    # Prometheus metrics of the stages, by StageMetrics field
+    STAGE_METRICS = {
+        "wall_seconds": ("tiqets_stage_wall_seconds", "Elapsed time of the stage."),
+        "cpu_seconds": ("tiqets_stage_cpu_seconds", "CPU time of the process during the stage."),
+        "peak_rss_delta_bytes": ("tiqets_stage_peak_rss_delta_bytes", "Increase of the peak RSS by the stage."),
+        "rows_in": ("tiqets_stage_rows_in", "Rows the stage started from."),
+        "rows_out": ("tiqets_stage_rows_out", "Rows the stage produced."),
+        "estimated_bytes": ("tiqets_stage_estimated_bytes", "Estimated size of the frames the stage produced."),
+        "is_ok": ("tiqets_stage_success", "Whether the stage succeeded."),
+    }
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.stages: list[StageMetrics] = []
+        # Open stages of every thread, innermost last
+        self._local = threading.local()
+
+    @property
+    def _open_stages(self) -> list[StageMetrics]:
+        if not hasattr(self._local, "open_stages"):
+            self._local.open_stages = []
+        return self._local.open_stages
+
+    @property
+    def current_stage(self) -> StageMetrics | None:
+        """Returns the innermost open stage of the calling thread."""
+        return self._open_stages[-1] if self._open_stages else None
+
+    @contextmanager
+    def stage(self, name: str, parent: StageMetrics | None = None) -> Iterator[StageMetrics]:
+        """Measures the enclosed block as a stage, the yielded metrics take the rows and frames of the stage.
+
+        Args:
+            name (str): Name of the stage, prefixed by the name of its parent.
+            parent (StageMetrics | None): Enclosing stage, the innermost open stage of the thread by default.
+        """
+        parent = parent or self.current_stage
+        stage = StageMetrics(name if parent is None else f"{parent.name}.{name}")
+        self.stages.append(stage)
+        self._open_stages.append(stage)
+        started_rss, started_wall, started_cpu = peak_rss(), time.perf_counter(), time.process_time()
+        try:
+            yield stage
+        except BaseException:
+            stage.is_ok = False
+            raise
+        finally:
+            stage.wall_seconds = time.perf_counter() - started_wall
+            stage.cpu_seconds = time.process_time() - started_cpu
+            if started_rss is not None:
+                stage.peak_rss_delta_bytes = peak_rss() - started_rss
+            self._open_stages.pop()
+
+    def to_dict(self, run: dict[str, Any]) -> dict[str, Any]:
+        """Returns the metrics of all stages after the given information of the run."""
+        return {
+            **run,
+            "started_at": self.started_at,
+            "peak_rss_bytes": peak_rss(),
+            "stages": [asdict(stage) for stage in self.stages],
+        }
+
+    def write_json(self, file_path: Path, run: dict[str, Any]) -> None:
+        """Writes the metrics of the stages and the given information of the run to a JSON file.
+
+        Raises:
+            AppWriterError: If the file can not be written.
+        """
+        _write_atomically(file_path, json.dumps(self.to_dict(run), indent=2, default=str) + "\n")
+
+    def write_prometheus(self, file_path: Path, labels: dict[str, str], is_ok: bool) -> None:
+        """Writes the metrics in the Prometheus text format, e.g. for the textfile collector of the node exporter.
+
+        Measures which are not known, like the rows of lazy frames, are left out.
+
+        Raises:
+            AppWriterError: If the file can not be written.
+        """
+        run_labels = ",".join(f'{name}="{_label_value(value)}"' for name, value in labels.items())
+        lines = []
+        for field_name, (metric, description) in self.STAGE_METRICS.items():
+            lines += [f"# HELP {metric} {description}", f"# TYPE {metric} gauge"]
+            for stage in self.stages:
+                value = getattr(stage, field_name)
+                if value is not None:
+                    lines.append(f'{metric}{{{run_labels},stage="{_label_value(stage.name)}"}} {float(value)!r}')
+
+        run_metrics = {
+            "tiqets_run_success": ("Whether the run succeeded.", float(is_ok)),
+            "tiqets_run_started_timestamp_seconds": ("Start time of the run.", self.started_at),
+            "tiqets_run_peak_rss_bytes": ("Peak RSS of the process.", peak_rss()),
+        }
+        for metric, (description, value) in run_metrics.items():
+            if value is not None:
+                lines += [f"# HELP {metric} {description}", f"# TYPE {metric} gauge"]
+                lines.append(f"{metric}{{{run_labels}}} {float(value)!r}")
+        _write_atomically(file_path, "\n".join(lines) + "\n")
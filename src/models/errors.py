@@ -9,3 +9,7 @@ class AppReaderError(AppError):
 
 class AppConfigError(AppError):
     pass
+
+
+class AppWriterError(AppError):
+    pass
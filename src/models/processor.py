@@ -1,4 +1,4 @@
-from typing import Any, NotRequired, Protocol, TypedDict
+from typing import Any, Callable, NotRequired, Protocol, TypedDict
 
 import polars as pl
 
@@ -12,14 +12,24 @@ class ProcessResult(TypedDict):
 
 # Base interface for all processor classes
 class BaseProcessor(Protocol):
-    barcodes_df: pl.DataFrame
-    orders_df: pl.DataFrame
-    merged_df: pl.DataFrame
+    barcodes_df: pl.DataFrame | pl.LazyFrame
+    orders_df: pl.DataFrame | pl.LazyFrame
+    merged_df: pl.DataFrame | pl.LazyFrame
 
-    def set_dataframes(self, barcodes_df: pl.DataFrame, orders_df: pl.DataFrame) -> ProcessResult:
+    def set_dataframes(
+        self, barcodes_df: pl.DataFrame | pl.LazyFrame, orders_df: pl.DataFrame | pl.LazyFrame
+    ) -> ProcessResult:
         ...
 
-    def get_aggregated_data(self) -> ProcessResult:
+    def get_aggregated_data(self, as_list: bool = False) -> ProcessResult:
+        ...
+
+    def get_results(
+        self, top_n: int = 5, as_list: bool = False, on_aggregated: Callable[[pl.DataFrame], None] | None = None
+    ) -> ProcessResult:
+        ...
+
+    def get_customer_totals(self) -> ProcessResult:
         ...
 
     def get_top_n_customers(self, top_n: int = 5) -> ProcessResult:
@@ -1,7 +1,7 @@
 from pathlib import Path
 from typing import Protocol
 
-from polars import DataFrame
+from polars import DataFrame, LazyFrame, PolarsDataType
 
 from models.errors import AppReaderError
 
@@ -9,5 +9,7 @@ from models.errors import AppReaderError
 # Base interface for all reader classes
 class BaseReader(Protocol):
     @staticmethod
-    def read(file_path: Path | str) -> DataFrame | AppReaderError:
+    def read(
+        file_path: Path | str | list[Path], schema: dict[str, PolarsDataType] | None = None
+    ) -> DataFrame | LazyFrame | AppReaderError:
         ...
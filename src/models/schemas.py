@@ -0,0 +1,21 @@
+from polars import Categorical, PolarsDataType, UInt32, UInt64
+
+# Declared column types of the input files, ids are unsigned and as narrow as their value ranges allow
+BARCODES_SCHEMA: dict[str, PolarsDataType] = {"barcode": UInt64, "order_id": UInt32}
+ORDERS_SCHEMA: dict[str, PolarsDataType] = {"order_id": UInt32, "customer_id": UInt32}
+
+# Columns only used as grouping keys, which can be encoded as categoricals instead
+CATEGORICAL_COLUMNS = ("customer_id",)
+
+
+def get_input_schemas(categorical: bool = False) -> dict[str, dict[str, PolarsDataType]]:
+    """Returns the declared schemas of the "barcodes" and "orders" inputs.
+
+    Args:
+        categorical (bool): Encode the categorical columns as categoricals instead of numbers.
+    """
+    schemas = {"barcodes": dict(BARCODES_SCHEMA), "orders": dict(ORDERS_SCHEMA)}
+    if categorical:
+        for schema in schemas.values():
+            schema.update({column: Categorical for column in CATEGORICAL_COLUMNS if column in schema})
+    return schemas
@@ -1,22 +1,59 @@
 from dataclasses import dataclass
-from typing import Any, List, NotRequired, Protocol, TypedDict
+from typing import Any, Callable, List, NotRequired, Protocol, TypedDict
 
-from polars import DataFrame
+from polars import DataFrame, Expr, LazyFrame, PolarsDataType, Series
 
+# Number of failed rows shown in the text of an error, all of them are kept in the failed rows frame
+SAMPLE_ROWS = 10
 
-# Data class for error with a string message and a list of failed rows
+
+# Data class for error with a string message and a frame of failed rows, tagged with the rule that failed
 @dataclass
 class ValidationError:
     error_message: str
-    failed_rows: List[Any] | None = None
+    failed_df: DataFrame | None = None
+    rule: str | None = None
+
+    def __post_init__(self):
+        # Failed rows can be given as a list of row dicts as well
+        if isinstance(self.failed_df, list):
+            self.failed_df = DataFrame(self.failed_df)
+
+    @property
+    def failed_rows(self) -> List[Any] | None:
+        """Returns the failed rows as dicts, materialising them all as python objects."""
+        return None if self.failed_df is None else self.failed_df.to_dicts()
+
+    @property
+    def failed_count(self) -> int:
+        return 0 if self.failed_df is None else self.failed_df.height
 
     def __str__(self) -> str:
-        error_output_rows = (
-            ""
-            if self.failed_rows is None
-            else ("\n".join([", ".join([f'"{key}": {value}' for key, value in d.items()]) for d in self.failed_rows]))
+        if self.failed_df is None:
+            return f"{self.error_message} \n"
+
+        # Only a sample of the failed rows is rendered, as there can be millions of them
+        sample_rows = "\n".join(
+            ", ".join(f'"{key}": {value}' for key, value in row.items())
+            for row in self.failed_df.head(SAMPLE_ROWS).iter_rows(named=True)
         )
-        return f"{self.error_message} \n{error_output_rows}"
+        remaining_count = self.failed_count - SAMPLE_ROWS
+        more_rows = f"\n... {remaining_count} more rows" if remaining_count > 0 else ""
+        return f"{self.error_message} ({self.failed_count} rows) \n{sample_rows}{more_rows}"
+
+
+# Data class for a validation rule, flagging the invalid rows of a dataset with a boolean expression
+@dataclass(frozen=True)
+class ValidationRule:
+    name: str
+    dataset: str
+    error_message: str
+    # Builds the flag from the checked column and the reference values, e.g. the known order ids
+    flag: Callable[[str, Series | None], Expr]
+    # Other columns the rule needs, the rule is skipped when the data does not have them
+    columns: tuple[str, ...] = ()
+    uses_reference: bool = False
+    enabled: bool = True
 
 
 # Interface for the validation method return object type
@@ -28,8 +65,29 @@ class ValidationResult(TypedDict):
 
 # Base interface for all validator classes
 class BaseValidator(Protocol):
-    def validate_barcodes(self, dataframe: DataFrame, column: str) -> ValidationResult:
+    # Seconds spent on every validation rule, only measured when timing is enabled
+    timings: dict[str, float]
+
+    def validate_barcodes(
+        self, dataframe: DataFrame | LazyFrame, column: str, order_ids: Series | None = None
+    ) -> ValidationResult:
+        ...
+
+    def validate_order_ids(self, dataframe: DataFrame | LazyFrame, column: str) -> ValidationResult:
+        ...
+
+    def validate_orders(self, dataframe: DataFrame | LazyFrame, column: str) -> ValidationResult:
+        ...
+
+    def validate_schema(self, dataframe: DataFrame | LazyFrame, schema: dict[str, PolarsDataType]) -> ValidationResult:
         ...
 
-    def validate_orders(self, dataframe: DataFrame, column: str) -> ValidationResult:
+    def validate(
+        self,
+        dataframe: DataFrame | LazyFrame,
+        dataset: str,
+        column: str,
+        reference: Series | None = None,
+        reference_rules_only: bool = False,
+    ) -> ValidationResult:
         ...
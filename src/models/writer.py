@@ -0,0 +1,13 @@
+from pathlib import Path
+from typing import Protocol
+
+from polars import DataFrame, LazyFrame
+
+
+# Base interface for all writer classes
+class BaseWriter(Protocol):
+    # Whether list columns are written natively, otherwise they have to be converted to text first
+    supports_lists: bool
+
+    def write(self, df: DataFrame | LazyFrame, file_path: Path) -> None:
+        ...
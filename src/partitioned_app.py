@@ -0,0 +1,219 @@
+import tempfile
+from pathlib import Path
+
+import polars as pl
+
+from models.errors import AppWriterError
+from models.validator import ValidationError, ValidationResult
+from partitioning import get_partition_count, scan_partition, spill_partitions
+from sketches import TopKSketch
+from tiqets_app import TiqetsApp
+
+
+class PartitionedTiqetsApp(TiqetsApp):
+    """Runs the application out-of-core for inputs larger than the available memory.
+
+    Both inputs are hash-partitioned by order_id into on-disk spill files, so that every partition can be
+    validated, joined and aggregated on its own and only one partition is held in memory at a time.
+    Barcodes are additionally partitioned by barcode to keep the duplicate detection exact across partitions.
+    The reader is expected to scan lazily, it is only used to check the inputs before spilling them. Inputs fitting
+    in a single partition are not spilled, they are validated and processed in memory from the scans.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.spill_dir: tempfile.TemporaryDirectory | None = None
+        self.partitions: int = 1
+        self.barcodes_schema: dict[str, pl.PolarsDataType] = {}
+        self.orders_schema: dict[str, pl.PolarsDataType] = {}
+        self.barcodes_partitions: dict[str, list[Path]] = {}
+        self.orders_partitions: dict[str, list[Path]] = {}
+
+    @staticmethod
+    def _merge_validation_errors(errors: dict[str, ValidationError], validation: ValidationResult) -> None:
+        """Merges the errors of a partition into the errors of the previous partitions by error message."""
+        if validation["is_valid"]:
+            return
+
+        for error in validation["errors"]:
+            merged_error = errors.setdefault(error.error_message, ValidationError(error.error_message, rule=error.rule))
+            if error.failed_df is not None:
+                merged_error.failed_df = (
+                    error.failed_df
+                    if merged_error.failed_df is None
+                    else pl.concat([merged_error.failed_df, error.failed_df], how="vertical_relaxed", rechunk=False)
+                )
+
+    def _read_schema(self, name: str) -> dict[str, pl.PolarsDataType]:
+        # The inputs are spilled as strings, their values are cast and validated partition by partition
+        return {column: pl.Utf8 for column in self.schemas[name]}
+
+    def read_data(self) -> bool:
+        if not super().read_data():
+            return False
+
+        memory_budget = self.args.memory_budget * 1024**2
+        self.partitions = get_partition_count(
+            self.args.barcodes_file_paths + self.args.orders_file_paths, memory_budget
+        )
+        if self.partitions == 1:
+            self.logger.debug("Input files fit in a single partition, they are processed in memory.")
+            return True
+
+        self.spill_dir = tempfile.TemporaryDirectory(prefix="spill_", dir=self.args.output_file_path.parent)
+        spill_path = Path(self.spill_dir.name)
+
+        # Hash both order_id columns with the same type, so matching orders end up in the same partition
+        order_id_dtype = {"order_id": self.orders_df.schema["order_id"]}
+        self.barcodes_schema = dict(self.barcodes_df.schema) | order_id_dtype
+        self.orders_schema = dict(self.orders_df.schema)
+
+        with self.metrics.stage("spill") as stage:
+            try:
+                self.barcodes_partitions = spill_partitions(
+                    self.args.barcodes_file_paths,
+                    spill_path,
+                    "barcodes",
+                    ["order_id", "barcode"],
+                    self.partitions,
+                    memory_budget,
+                    self.barcodes_schema,
+                )
+                self.orders_partitions = spill_partitions(
+                    self.args.orders_file_paths,
+                    spill_path,
+                    "orders",
+                    ["order_id"],
+                    self.partitions,
+                    memory_budget,
+                    self.orders_schema,
+                )
+            except (OSError, pl.ComputeError) as exc:
+                stage.is_ok = False
+                self.logger.error(f"Unable to spill the input files: {exc!s}")
+                return False
+        self.logger.debug(f"Input files are spilled into {self.partitions} partitions.")
+
+        return True
+
+    def validate_data(self) -> bool:
+        if self.spill_dir is None:
+            return super().validate_data()
+
+        # Duplicates are searched within the barcode partitions, a barcode value never spans two of them
+        errors: dict[str, ValidationError] = {}
+        for partition_path in self.barcodes_partitions["barcode"]:
+            barcodes_df = scan_partition(partition_path, self.barcodes_schema).collect()
+            schema_validation = self.validator.validate_schema(barcodes_df, self.schemas["barcodes"])
+            self._merge_validation_errors(errors, schema_validation)
+            barcodes_df = schema_validation.get("data", barcodes_df)
+            self._merge_validation_errors(errors, self.validator.validate_barcodes(barcodes_df, "barcode"))
+
+        self._log_validation_errors({"is_valid": not errors, "errors": list(errors.values())})
+        return True
+
+    def _process_partitions(
+        self, aggregated_path: Path, errors: dict[str, ValidationError]
+    ) -> tuple[pl.DataFrame, int] | None:
+        """Joins, validates and aggregates the partitions one by one, spilling the aggregated data of each.
+
+        With an approximate error, the customer totals of every partition are fed to a bounded memory sketch
+        instead of being folded into the totals of all customers.
+
+        Returns:
+            tuple | None: The top N customers and the unused barcodes count, None on errors.
+        """
+        customers_df: pl.DataFrame | None = None
+        sketch = (
+            None if self.args.top_n_error is None else TopKSketch.from_error(self.args.top_n_error, self.args.top_n)
+        )
+        unused_barcodes = 0
+
+        for idx in range(self.partitions):
+            barcodes_df = scan_partition(self.barcodes_partitions["order_id"][idx], self.barcodes_schema).collect()
+            orders_df = scan_partition(self.orders_partitions["order_id"][idx], self.orders_schema).collect()
+
+            # Invalid barcode values were already reported while validating the partitions by barcode
+            barcodes_df = self.validator.validate_schema(barcodes_df, self.schemas["barcodes"]).get("data", barcodes_df)
+            orders_validation = self.validator.validate_schema(orders_df, self.schemas["orders"])
+            self._merge_validation_errors(errors, orders_validation)
+            orders_df = orders_validation.get("data", orders_df)
+
+            # Orders are partitioned by order id as well, so duplicate and unknown order ids are found here
+            self._merge_validation_errors(errors, self.validator.validate_order_ids(orders_df, "order_id"))
+            self._merge_validation_errors(
+                errors,
+                self.validator.validate(
+                    barcodes_df, "barcodes", "barcode", orders_df["order_id"], reference_rules_only=True
+                ),
+            )
+
+            set_df_proc = self.processor.set_dataframes(barcodes_df, orders_df)
+            if not set_df_proc["is_ok"]:
+                self.logger.error(set_df_proc["error"])
+                return None
+
+            order_validation = self.validator.validate_orders(self.processor.merged_df, "barcode")
+            if not order_validation["is_valid"]:
+                self._merge_validation_errors(errors, order_validation)
+                self.processor.merged_df = order_validation["data"]
+
+            aggregate_proc = self.processor.get_aggregated_data(as_list=self.writer.supports_lists)
+            totals_proc = self.processor.get_customer_totals()
+            unused_barcodes_proc = self.processor.get_unused_barcodes_count()
+            for proc in (aggregate_proc, totals_proc, unused_barcodes_proc):
+                if not proc["is_ok"]:
+                    self.logger.error(proc["error"])
+                    return None
+
+            self._collect(aggregate_proc["data"]).write_parquet(aggregated_path / f"{idx:05d}.parquet")
+            unused_barcodes += unused_barcodes_proc["data"]
+
+            # Customers span order partitions, fold their totals so they stay bounded by the customer count
+            totals_df = self._collect(totals_proc["data"])
+            if sketch is not None:
+                sketch.update(totals_df)
+            elif customers_df is None:
+                customers_df = totals_df
+            else:
+                customers_df = (
+                    pl.concat([customers_df, totals_df]).group_by("customer_id").agg(pl.sum("total_barcodes"))
+                )
+
+        if sketch is not None:
+            return sketch.top(self.args.top_n), unused_barcodes
+        top_customers_df = customers_df.top_k(self.args.top_n, by="total_barcodes")
+        return top_customers_df.sort("total_barcodes", descending=True), unused_barcodes
+
+    def process_data(self) -> bool:
+        if self.spill_dir is None:
+            return super().process_data()
+
+        errors: dict[str, ValidationError] = {}
+        aggregated_path = Path(self.spill_dir.name) / "aggregated"
+        aggregated_path.mkdir()
+
+        try:
+            partition_results = self._process_partitions(aggregated_path, errors)
+            if partition_results is None:
+                return False
+
+            # Stream the spilled aggregates of all partitions into the output file
+            self.writer.write(pl.scan_parquet(aggregated_path / "*.parquet"), self.args.output_file_path)
+        except AppWriterError as exc:
+            self.logger.error(f"{exc!s}")
+            return False
+
+        top_customers_df, unused_barcodes = partition_results
+        self._log_validation_errors({"is_valid": not errors, "errors": list(errors.values())})
+        self.logger.info(f"Processed data file is generated {self.args.output_file_path.name!s}.")
+
+        self._log_results(top_customers_df, unused_barcodes)
+        self._log_rule_timings()
+
+        return self._write_quarantine()
+
+    def close(self) -> None:
+        if self.spill_dir is not None:
+            self.spill_dir.cleanup()
+            self.spill_dir = None
@@ -0,0 +1,107 @@
+import math
+import os
+from pathlib import Path
+from typing import Iterator
+
+import polars as pl
+
+from compression import (
+    COMPRESSION_RATIO,
+    QUEUED_BLOCKS,
+    detect_compression,
+    iter_decompressed_blocks,
+)
+
+# Rough ratio between the in-memory footprint of a partition while it is joined & aggregated and its csv size
+MEMORY_PER_CSV_BYTE = 4
+MIN_BATCH_ROWS = 10_000
+PARTITION_COLUMN = "_partition"
+
+
+def get_partition_count(file_paths: list[Path], memory_budget: int) -> int:
+    """Returns the number of partitions needed so that processing one partition fits in the memory budget.
+
+    Args:
+        file_paths (list[Path]): Input csv files processed together.
+        memory_budget (int): Memory budget in bytes.
+    """
+    total_size = sum(
+        os.path.getsize(file_path) * (1 if detect_compression(file_path) is None else COMPRESSION_RATIO)
+        for file_path in file_paths
+    )
+    return max(1, math.ceil(total_size * MEMORY_PER_CSV_BYTE / memory_budget))
+
+
+def get_batch_rows(file_path: Path, memory_budget: int) -> int:
+    """Returns the number of csv rows read at once while spilling, estimated from the size of the first lines."""
+    with open(file_path, "rb") as file:
+        sample = file.read(64 * 1024)
+    row_size = max(len(sample) // max(sample.count(b"\n"), 1), 1)
+    return max(MIN_BATCH_ROWS, memory_budget // (row_size * MEMORY_PER_CSV_BYTE))
+
+
+def read_batches(file_path: Path, memory_budget: int, schema: dict[str, pl.PolarsDataType]) -> Iterator[pl.DataFrame]:
+    """Yields the rows of a csv file in batches sized by the memory budget.
+
+    Compressed files are decompressed block by block, every block being a batch. The decompressed blocks waiting
+    to be parsed are part of the budget.
+    """
+    if detect_compression(file_path) is not None:
+        block_size = memory_budget // (MEMORY_PER_CSV_BYTE + QUEUED_BLOCKS)
+        for block in iter_decompressed_blocks(file_path, block_size):
+            yield pl.read_csv(block, dtypes=schema)
+        return
+
+    reader = pl.read_csv_batched(file_path, dtypes=schema, batch_size=get_batch_rows(file_path, memory_budget))
+    while batches := reader.next_batches(1):
+        yield from batches
+
+
+def spill_partitions(
+    file_paths: list[Path],
+    spill_path: Path,
+    name: str,
+    keys: list[str],
+    partitions: int,
+    memory_budget: int,
+    schema: dict[str, pl.PolarsDataType],
+) -> dict[str, list[Path]]:
+    """Hash-partitions csv files into on-disk parquet spill files in a single pass.
+
+    The files are read in batches sized by the memory budget and every batch is split by the hash of each key,
+    so a key value always ends up in the same partition across batches and files.
+
+    Args:
+        file_paths (list[Path]): The csv files to partition, e.g. the shards of one dataset.
+        spill_path (Path): Directory where the spill files are written.
+        name (str): Name of the dataset, used as the prefix of its partition directories.
+        keys (list[str]): Columns to partition by, one independent partitioning is written per key.
+        partitions (int): Number of partitions.
+        memory_budget (int): Memory budget in bytes.
+        schema (dict): Column types of the files, join keys must have the same type to get the same hashes.
+
+    Returns:
+        dict[str, list[Path]]: Directory of each partition for every key, to be scanned with "<dir>/*.parquet".
+    """
+    partition_paths = {key: [spill_path / f"{name}_{key}" / f"{idx:05d}" for idx in range(partitions)] for key in keys}
+    for paths in partition_paths.values():
+        for path in paths:
+            path.mkdir(parents=True, exist_ok=True)
+
+    batch_idx = 0
+    for file_path in file_paths:
+        for batch in read_batches(file_path, memory_budget, schema):
+            for key in keys:
+                partitioned = batch.with_columns((pl.col(key).hash() % partitions).alias(PARTITION_COLUMN))
+                for idx, part_df in partitioned.partition_by(PARTITION_COLUMN, as_dict=True).items():
+                    part_df.drop(PARTITION_COLUMN).write_parquet(partition_paths[key][idx] / f"{batch_idx:06d}.parquet")
+            batch_idx += 1
+
+    return partition_paths
+
+
+def scan_partition(partition_path: Path, schema: dict[str, pl.PolarsDataType]) -> pl.LazyFrame:
+    """Scans the spill files of a partition, partitions without any rows result in an empty frame."""
+    if not any(partition_path.glob("*.parquet")):
+        return pl.LazyFrame(schema=schema)
+    return pl.scan_parquet(partition_path / "*.parquet")
@@ -1,32 +1,59 @@
+from typing import Callable
+
 import polars as pl
 
 from models.processor import ProcessResult
+from query_profile import QueryProfiler
 
 
 class DataProcessor:
-    def __init__(self):
-        """Initializes a DataProcessor object with the given barcodes and orders dataframe."""
+    def __init__(self, profiler: QueryProfiler | None = None):
+        """Initializes a DataProcessor object with the given barcodes and orders dataframe.
+
+        Args:
+            profiler (QueryProfiler | None): Profiler collecting the plans of the join and the groupings, when they
+                are explained or profiled.
+        """
+
+        self.profiler = profiler or QueryProfiler()
+        self.barcodes_df: pl.DataFrame | pl.LazyFrame | None = None
+        self.orders_df: pl.DataFrame | pl.LazyFrame | None = None
+        self.merged_df: pl.DataFrame | pl.LazyFrame | None = None
 
-        self.barcodes_df: pl.DataFrame | None = None
-        self.orders_df: pl.DataFrame | None = None
-        self.merged_df: pl.DataFrame | None = None
+    def set_dataframes(
+        self, barcodes_df: pl.DataFrame | pl.LazyFrame, orders_df: pl.DataFrame | pl.LazyFrame
+    ) -> ProcessResult:
+        """Sets the input dataframes and merges them.
 
-    def set_dataframes(self, barcodes_df: pl.DataFrame, orders_df: pl.DataFrame) -> ProcessResult:
+        When LazyFrames are given, the merge is only added to the query plan and the results of the
+        other methods are LazyFrames as well.
+        """
         try:
             self.barcodes_df = barcodes_df
             self.orders_df = orders_df
             # Merge orders and barcodes dataframes.
-            self.merged_df = self.orders_df.join(barcodes_df, on="order_id", how="left")
+            if self.profiler.enabled and isinstance(orders_df, pl.DataFrame):
+                self.merged_df = self.profiler.collect(
+                    "join", orders_df.lazy().join(barcodes_df.lazy(), on="order_id", how="left")
+                )
+            else:
+                self.merged_df = self.orders_df.join(barcodes_df, on="order_id", how="left")
             return {"is_ok": True}
         except Exception as exc:
             return {"is_ok": False, "error": f"Unable to set dataframes: {exc!s}"}
 
-    def get_aggregated_data(self) -> ProcessResult:
+    def get_aggregated_data(self, as_list: bool = False) -> ProcessResult:
         """
         Group the merged dataframe by customer_id and order_id and aggregate the grouped dataframe.
 
+        The barcodes of each order are rendered natively as the text of a python list, e.g. "[1, 2, 3]",
+        so no python callback runs per group.
+
+        Args:
+            as_list (bool): Keep barcodes as a native list column, for output formats supporting nested data.
+
         Returns:
-            pl.DataFrame: Aggregated DataFrame.
+            pl.DataFrame | pl.LazyFrame: Aggregated DataFrame.
         """
         err_prefix = "Unable to aggregate data:"
         if self.merged_df is None:
@@ -36,23 +63,166 @@ class DataProcessor:
             }
 
         try:
-            grouped = self.merged_df.groupby(["customer_id", "order_id"])
-
             # Aggregate the grouped dataframe to get the list of barcodes for each order
-            aggregated_df = grouped.agg(pl.col("barcode").alias("barcodes").apply(lambda col: str(col.to_list())))
+            aggregated_df = self._group_orders(
+                self.merged_df, native=as_list or self._has_plain_barcodes(self.merged_df)
+            )
+            if not as_list:
+                aggregated_df = aggregated_df.with_columns(self._barcodes_list_text(aggregated_df.schema["barcodes"]))
             return {"is_ok": True, "data": aggregated_df}
         except Exception as exc:
             return {"is_ok": False, "error": f"{err_prefix} {exc!s}"}
 
+    def get_results(
+        self, top_n: int = 5, as_list: bool = False, on_aggregated: Callable[[pl.DataFrame], None] | None = None
+    ) -> ProcessResult:
+        """
+        Get the aggregated data, the top N customers and the unused barcodes count in a single pass.
+
+        The merged dataframe is grouped by order once, into the aggregate along with the barcode count of every
+        order. Lazy inputs stay a single plan up to the aggregate, collected together with the unused barcodes.
+        Customers are ranked by summing the barcode counts of their orders.
+
+        Args:
+            top_n (int): Number of top customers to retrieve.
+            as_list (bool): Keep barcodes as a native list column, for output formats supporting nested data.
+            on_aggregated (Callable | None): Called with the aggregated data as soon as it is computed, before the
+                top customers, e.g. to start writing it.
+
+        Returns:
+            dict: "aggregated" and "top_customers" DataFrames, and the "unused_barcodes" count.
+        """
+        err_prefix = "Unable to process data:"
+        if self.merged_df is None or self.barcodes_df is None:
+            return {
+                "is_ok": False,
+                "error": f"{err_prefix} Merged dataset is empty.",
+            }
+
+        try:
+            # The join and the grouping by order are shared by all results. Eager inputs are materialised once here,
+            # as are profiled runs to time the grouping, lazy inputs are only grouped within the collected aggregate
+            orders_lf = self._group_orders(
+                self.merged_df.lazy(), native=as_list or self._has_plain_barcodes(self.merged_df), with_totals=True
+            )
+            if not isinstance(self.merged_df, pl.LazyFrame) or self.profiler.enabled:
+                orders_lf = self.profiler.collect("group_orders", orders_lf).lazy()
+            if not as_list:
+                orders_lf = orders_lf.with_columns(self._barcodes_list_text(orders_lf.schema["barcodes"]))
+            unused_barcodes_lf = self.barcodes_df.lazy().select(pl.col("order_id").is_null().sum())
+
+            # Plans collected together do not share their common subplans, so the customers are ranked from the
+            # barcode counts collected along the aggregate, rather than from a plan grouping the orders again
+            orders_df, unused_barcodes_df = self.profiler.collect_all(
+                {"aggregate": orders_lf, "unused_barcodes": unused_barcodes_lf}
+            )
+            aggregated_df = orders_df.drop("total_barcodes")
+            if on_aggregated is not None:
+                on_aggregated(aggregated_df)
+            customers_lf = self._top_customers(
+                orders_df.lazy().group_by("customer_id").agg(pl.sum("total_barcodes")), top_n
+            )
+            customers_df = self.profiler.collect("top_customers", customers_lf)
+            return {
+                "is_ok": True,
+                "data": {
+                    "aggregated": aggregated_df,
+                    "top_customers": customers_df,
+                    "unused_barcodes": int(unused_barcodes_df.item()),
+                },
+            }
+        except Exception as exc:
+            return {"is_ok": False, "error": f"{err_prefix} {exc!s}"}
+
+    @classmethod
+    def _group_orders(
+        cls, merged_df: pl.DataFrame | pl.LazyFrame, native: bool = True, with_totals: bool = False
+    ) -> pl.DataFrame | pl.LazyFrame:
+        """
+        Groups the merged dataframe by order into a barcodes list column.
+
+        Args:
+            merged_df (pl.DataFrame | pl.LazyFrame): Merged orders and barcodes.
+            native (bool): Keep the native barcode values, otherwise the items are converted to their text first.
+            with_totals (bool): Add the number of barcodes of each order as total_barcodes.
+        """
+        group_keys = ["customer_id", "order_id"]
+        totals = [pl.col("barcode").count().alias("total_barcodes")] if with_totals else []
+
+        if native:
+            return merged_df.group_by(group_keys).agg(pl.col("barcode").alias("barcodes"), *totals)
+
+        return (
+            merged_df.with_columns(cls._barcode_text(merged_df.schema["barcode"]).alias("barcode_text"))
+            .group_by(group_keys)
+            .agg(pl.col("barcode_text").alias("barcodes"), *totals)
+        )
+
+    @staticmethod
+    def _top_customers(customers_df: pl.DataFrame | pl.LazyFrame, top_n: int) -> pl.DataFrame | pl.LazyFrame:
+        """Selects the top N customers by a partial top-k selection, only the selected rows are sorted."""
+        return customers_df.top_k(top_n, by="total_barcodes").sort("total_barcodes", descending=True)
+
+    @staticmethod
+    def _barcodes_list_text(dtype: pl.PolarsDataType) -> pl.Expr:
+        """Returns the barcodes list column as the text of a python list, casting native items to text."""
+        barcodes = pl.col("barcodes") if dtype == pl.List(pl.Utf8) else pl.col("barcodes").cast(pl.List(pl.Utf8))
+        return pl.format("[{}]", barcodes.list.join(", ")).alias("barcodes")
+
+    @staticmethod
+    def _has_plain_barcodes(df: pl.DataFrame | pl.LazyFrame) -> bool:
+        """Checks if barcodes are printed as is, which holds for non-null numbers. Lazy frames are not scanned."""
+        if isinstance(df, pl.LazyFrame):
+            return False
+        return df.schema["barcode"] != pl.Utf8 and df["barcode"].null_count() == 0
+
+    @staticmethod
+    def _barcode_text(dtype: pl.PolarsDataType, barcode: pl.Expr | None = None) -> pl.Expr:
+        """Returns the barcode as it is printed inside a python list: strings are quoted and nulls are None.
+
+        The barcode column is used unless another expression is given, e.g. the elements of a barcodes list.
+        """
+        barcode = (pl.col("barcode") if barcode is None else barcode).cast(pl.Utf8)
+        if dtype == pl.Utf8:
+            barcode = pl.format("'{}'", barcode)
+        return barcode.fill_null("None")
+
+    def get_customer_totals(self) -> ProcessResult:
+        """
+        Get the number of barcodes bought by each customer.
+
+        Returns:
+            pl.DataFrame | pl.LazyFrame: DataFrame with customer_id and total_barcodes columns.
+        """
+        err_prefix = "Unable to calculate customer totals:"
+
+        if self.merged_df is None:
+            return {
+                "is_ok": False,
+                "error": f"{err_prefix} Merged dataset is empty.",
+            }
+
+        try:
+            customers_df = self.merged_df.group_by("customer_id").agg(pl.count("barcode").alias("total_barcodes"))
+            return {"is_ok": True, "data": customers_df}
+
+        except Exception as exc:
+            return {
+                "is_ok": False,
+                "error": f"{err_prefix} {exc!s}",
+            }
+
     def get_top_n_customers(self, top_n: int = 5) -> ProcessResult:
         """
         Get top N customers who bought the most barcodes.
 
+        The top N is selected without sorting all customers.
+
         Args:
             top_n (int): Number of top customers to retrieve.
 
         Returns:
-            pl.DataFrame: DataFrame with top N customers.
+            pl.DataFrame | pl.LazyFrame: DataFrame with top N customers.
         """
         err_prefix = "Unable to calculate top N customers:"
 
@@ -63,12 +233,7 @@ class DataProcessor:
             }
 
         try:
-            customers_df = (
-                self.merged_df.groupby("customer_id")
-                .agg(pl.count("barcode").alias("total_barcodes"))
-                .sort("total_barcodes", descending=True)
-                .limit(top_n)
-            )
+            customers_df = self._top_customers(self.get_customer_totals()["data"], top_n)
             return {"is_ok": True, "data": customers_df}
 
         except Exception as exc:
@@ -93,7 +258,10 @@ class DataProcessor:
             }
 
         try:
-            unused_barcodes = int(self.barcodes_df["order_id"].is_null().sum())
+            unused_barcodes_df = self.barcodes_df.select(pl.col("order_id").is_null().sum())
+            if isinstance(unused_barcodes_df, pl.LazyFrame):
+                unused_barcodes_df = unused_barcodes_df.collect(streaming=True)
+            unused_barcodes = int(unused_barcodes_df.item())
             return {"is_ok": True, "data": unused_barcodes}
 
         except Exception as exc:
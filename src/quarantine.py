@@ -0,0 +1,43 @@
+from pathlib import Path
+
+import polars as pl
+
+from models.validator import ValidationError
+from models.writer import BaseWriter
+
+
+class QuarantineSink:
+    """Collects the rows rejected by the validation and writes them to one quarantine file.
+
+    Every row is tagged with the rule that rejected it in a "rule" column. The rows of all rules are written
+    together with the union of their columns, the columns a rule does not have are left empty.
+    """
+
+    def __init__(self, writer: BaseWriter, file_path: Path):
+        """Initializes a QuarantineSink writing the quarantine file with the given writer."""
+        self.writer = writer
+        self.file_path = file_path
+        self.rejected_dfs: list[pl.DataFrame] = []
+
+    @property
+    def rejected_count(self) -> int:
+        return sum(rejected_df.height for rejected_df in self.rejected_dfs)
+
+    def add(self, error: ValidationError) -> None:
+        """Adds the failed rows of a validation error, tagged with the rule of the error."""
+        if error.failed_df is None or error.failed_df.is_empty():
+            return
+        self.rejected_dfs.append(error.failed_df.select(pl.lit(error.rule).alias("rule"), pl.all()))
+
+    def write(self) -> Path | None:
+        """Writes all rejected rows collected so far.
+
+        Returns:
+            Path | None: The quarantine file, None if no row was rejected.
+        """
+        if not self.rejected_dfs:
+            return None
+
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        self.writer.write(pl.concat(self.rejected_dfs, how="diagonal_relaxed"), self.file_path)
+        return self.file_path
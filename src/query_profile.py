@@ -0,0 +1,108 @@
+from pathlib import Path
+
+import polars as pl
+
+from models.errors import AppWriterError
+
+
+class QueryProfiler:
+    """Collects the lazy query plans of the processing stages, explaining and profiling them when enabled.
+
+    With explain, the optimized plan of every collected stage is kept. With profile, every stage is collected by
+    LazyFrame.profile() instead of LazyFrame.collect(), which runs the same plan while timing each of its nodes,
+    so the profiled run produces the same data. Plans collected together are then collected one by one, so the
+    timings of each plan are kept apart. A disabled profiler only collects the plans.
+    """
+
+    def __init__(self, explain: bool = False, profile: bool = False):
+        """Initializes a QueryProfiler.
+
+        Args:
+            explain (bool): Keep the optimized plan of every stage.
+            profile (bool): Collect every stage under the profiler and keep the timings of its nodes.
+        """
+        self.explain = explain
+        self.profile = profile
+        # Optimized plans, by stage
+        self.plans: dict[str, str] = {}
+        # Node timings of every profiled stage, in microseconds since the stage started
+        self.node_timings: list[pl.DataFrame] = []
+        self.stages: set[str] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.explain or self.profile
+
+    def _stage_name(self, stage: str) -> str:
+        # Stages run once per partition or per reload are numbered from their second run on
+        name, run = stage, 1
+        while name in self.stages:
+            run += 1
+            name = f"{stage}_{run}"
+        self.stages.add(name)
+        return name
+
+    def collect(self, stage: str, lf: pl.LazyFrame, streaming: bool = False) -> pl.DataFrame:
+        """Collects the plan of a stage."""
+        if not self.enabled:
+            return lf.collect(streaming=streaming)
+
+        stage = self._stage_name(stage)
+        if self.explain:
+            self.plans[stage] = lf.explain(optimized=True, streaming=streaming)
+        if not self.profile:
+            return lf.collect(streaming=streaming)
+
+        df, timings_df = lf.profile(streaming=streaming)
+        self.node_timings.append(
+            timings_df.select(
+                pl.lit(stage).alias("stage"),
+                "node",
+                pl.col("start").alias("start_us"),
+                pl.col("end").alias("end_us"),
+                (pl.col("end") - pl.col("start")).alias("duration_us"),
+            )
+        )
+        return df
+
+    def collect_all(self, stages: dict[str, pl.LazyFrame]) -> list[pl.DataFrame]:
+        """Collects the plans of several stages, together unless they are profiled."""
+        if not self.profile:
+            if self.explain:
+                for stage, lf in stages.items():
+                    self.plans[self._stage_name(stage)] = lf.explain(optimized=True)
+            return pl.collect_all(list(stages.values()))
+        return [self.collect(stage, lf) for stage, lf in stages.items()]
+
+    def slowest_nodes(self, count: int = 3) -> pl.DataFrame:
+        """Returns the profiled nodes that took the longest, the optimization of the plans left out."""
+        if not self.node_timings:
+            return pl.DataFrame(schema={"stage": pl.Utf8, "node": pl.Utf8, "duration_us": pl.UInt64})
+        return (
+            pl.concat(self.node_timings)
+            .filter(pl.col("node") != "optimization")
+            .top_k(count, by="duration_us")
+            .sort("duration_us", descending=True)
+            .select("stage", "node", "duration_us")
+        )
+
+    def write(self, plans_path: Path, profile_path: Path) -> list[Path]:
+        """Writes the optimized plans to a text file and the node timings to a csv file, returns the written paths.
+
+        Raises:
+            AppWriterError: If a file can not be written.
+        """
+        written_paths = []
+        try:
+            plans_path.parent.mkdir(parents=True, exist_ok=True)
+            if self.explain:
+                plans_path.write_text("".join(f"== {stage} ==\n{plan}\n\n" for stage, plan in self.plans.items()))
+                written_paths.append(plans_path)
+            if self.profile:
+                columns = ["stage", "node", "start_us", "end_us", "duration_us"]
+                node_timings_df = pl.concat(self.node_timings) if self.node_timings else pl.DataFrame(schema=columns)
+                node_timings_df.write_csv(profile_path)
+                written_paths.append(profile_path)
+        except (OSError, pl.ComputeError) as exc:
+            raise AppWriterError(f"Unable to write query profile: {exc!s}") from exc
+        return written_paths
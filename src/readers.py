@@ -1,17 +1,214 @@
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+from typing import Any, Callable
 
 import polars as pl
 
+from cache import ParsedInputCache
+from compression import detect_compression, iter_decompressed_blocks, read_header
 from models.errors import AppReaderError
+from models.reader import BaseReader
+
+
+def _file_name(file_path: Path | str | list[Path]) -> str:
+    if isinstance(file_path, list):
+        return ", ".join(_file_name(shard_path) for shard_path in file_path)
+    return file_path.name if isinstance(file_path, Path) else str(file_path)
+
+
+def _failing_column(exc: Exception, dtypes: dict[str, pl.PolarsDataType]) -> str | None:
+    """Returns the declared non-string column a parse error is about, None for any other error."""
+    match = re.search(r"at column '(.*?)'", str(exc))
+    if match is None or dtypes.get(match.group(1), pl.Utf8) == pl.Utf8:
+        return None
+    return match.group(1)
+
+
+def _read_declared(read: Callable[[dict[str, pl.PolarsDataType]], Any], schema: dict[str, pl.PolarsDataType]) -> Any:
+    """Reads with the declared column types, reading the columns with values not fitting their type as strings.
+
+    The read is only repeated for a failing column, which is then read as strings so its violations are reported by
+    the strict cast of the validation, while the other columns keep their declared types.
+    """
+    dtypes = dict(schema)
+    while True:
+        try:
+            return read(dtypes)
+        except pl.exceptions.ComputeError as exc:
+            column = _failing_column(exc, dtypes)
+            if column is None:
+                raise
+            dtypes[column] = pl.Utf8
+
+
+def read_csv(source: Path | str | bytes, schema: dict[str, pl.PolarsDataType] | None = None) -> pl.DataFrame:
+    """Reads a csv source with the declared column types, skipping the schema inference.
+
+    Columns missing from the schema are read as strings, as are the declared columns with values not fitting their
+    type, so the violations can be reported by the validation.
+    """
+    if schema is None:
+        return pl.read_csv(source)
+    return _read_declared(lambda dtypes: pl.read_csv(source, dtypes=dtypes, infer_schema_length=0), schema)
+
+
+def read_csv_file(file_path: Path, schema: dict[str, pl.PolarsDataType] | None = None) -> pl.DataFrame:
+    """Reads a csv file with the declared column types, decompressing gzip, bz2 and zstd compressed files.
+
+    Compressed files are parsed block by block while they are decompressed, so the decompressed file is never
+    held in memory as a whole. As every block is read like a file on its own, blocks with values not fitting their
+    declared types are read as strings and the concatenation turns the declared columns of all blocks into strings.
+    """
+    if detect_compression(file_path) is None:
+        return read_csv(file_path, schema)
+    block_dfs = [read_csv(block, schema) for block in iter_decompressed_blocks(file_path)]
+    return pl.concat(block_dfs, how="vertical_relaxed", rechunk=False)
+
+
+def scan_compressed_csv(file_path: Path, schema: dict[str, pl.PolarsDataType] | None = None) -> pl.LazyFrame:
+    """Returns a LazyFrame reading a compressed csv file once it is collected.
+
+    Compressed files can not be scanned by polars, the file is decompressed and parsed as a whole when the plan is
+    collected. With a schema, the columns are read as strings, as the columns with values not fitting their type are
+    only known once read, and the declared types are applied by the validation. Without it they are read right away
+    to infer their types.
+    """
+    if schema is None:
+        return read_csv_file(file_path).lazy()
+    string_schema = {column: pl.Utf8 for column in pl.read_csv(read_header(file_path), infer_schema_length=0).columns}
+    return pl.LazyFrame().map_batches(
+        lambda _: read_csv_file(file_path, string_schema), schema=string_schema, streamable=False
+    )
+
+
+def start_read(read: Callable[..., Any], *args: Any) -> Future:
+    """Starts a read on its own thread, returns the future of its result.
+
+    The thread is a daemon, so a read whose result is not needed anymore, e.g. after the read of another input
+    failed, neither delays the caller nor the exit of the process. A running polars parse can not be interrupted,
+    it finishes in the background and its result is dropped.
+    """
+    future: Future = Future()
+
+    def run() -> None:
+        # Reads cancelled before they started are skipped
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(read(*args))
+        except BaseException as exc:
+            future.set_exception(exc)
+
+    threading.Thread(target=run, name=f"read-{read.__name__}", daemon=True).start()
+    return future
 
 
 class CSVReader:
     @staticmethod
-    def read(file_path: Path | str) -> pl.DataFrame:
-        """Reads a CSV file and returns a Polars DataFrame."""
+    def read(file_path: Path | str | list[Path], schema: dict[str, pl.PolarsDataType] | None = None) -> pl.DataFrame:
+        """Reads a CSV file and returns a Polars DataFrame.
+
+        A list of shard files is read in parallel threads, as the parsing releases the GIL, and the shards are
+        concatenated into one frame without copying their chunks.
+        Without a schema the column types are inferred.
+        """
+        try:
+            if not isinstance(file_path, list):
+                return read_csv_file(Path(file_path), schema)
+            if len(file_path) == 1:
+                return read_csv_file(file_path[0], schema)
+
+            with ThreadPoolExecutor(max_workers=min(len(file_path), os.cpu_count() or 1)) as executor:
+                shard_dfs = list(executor.map(lambda shard_path: read_csv_file(shard_path, schema), file_path))
+            return pl.concat(shard_dfs, how="vertical_relaxed", rechunk=False)
+        except Exception as exc:
+            raise AppReaderError(f"Unable to read file {_file_name(file_path)}: {exc!s}") from exc
+
+
+class LazyCSVReader:
+    @staticmethod
+    def read(file_path: Path | str | list[Path], schema: dict[str, pl.PolarsDataType] | None = None) -> pl.LazyFrame:
+        """Scans a CSV file and returns a Polars LazyFrame without loading the data.
+
+        A list of shard files results in one scan over all of them.
+        With a schema, the columns are scanned with their declared types without any schema inference. The values
+        are only parsed by the collects of the plan, a value not fitting its type fails them.
+        Compressed files can not be scanned, they are read once the plan is collected.
+        """
+
+        def scan(shard_path: Path) -> pl.LazyFrame:
+            if detect_compression(shard_path) is not None:
+                return scan_compressed_csv(shard_path, schema)
+            if schema is None:
+                return pl.scan_csv(shard_path)
+            return pl.scan_csv(shard_path, dtypes=schema, infer_schema_length=0)
+
         try:
-            return pl.read_csv(file_path)
+            if isinstance(file_path, list):
+                lazy_df = pl.concat([scan(shard_path) for shard_path in file_path], how="vertical_relaxed")
+            else:
+                lazy_df = scan(Path(file_path))
+            # Resolve the schema now so missing or empty files fail here instead of at collect time
+            _ = lazy_df.schema
+            return lazy_df
         except Exception as exc:
-            raise AppReaderError(
-                f"Unable to read file {file_path.name if isinstance(file_path, Path) else str(file_path)}: {exc!s}"
-            ) from exc
+            raise AppReaderError(f"Unable to read file {_file_name(file_path)}: {exc!s}") from exc
+
+
+class CachedReader:
+    """Wraps a reader with a parsed-input cache, so unchanged files are memory-mapped instead of parsed again.
+
+    Shard files are cached one by one, a changed shard only invalidates its own entry.
+    """
+
+    def __init__(self, reader: BaseReader, cache: ParsedInputCache, lazy: bool = False):
+        self.reader = reader
+        self.cache = cache
+        self.lazy = lazy
+
+    def _parse(
+        self, file_path: Path, schema: dict[str, pl.PolarsDataType] | None, variant: str
+    ) -> tuple[pl.DataFrame | pl.LazyFrame, Path | None]:
+        """Parses the file with the wrapped reader into the cache, returns the frame and its cache entry.
+
+        The scans of a lazy reader are only parsed by the put, the columns with values not fitting their type are
+        then read as strings, like by the eager reads.
+        """
+
+        def parse(dtypes: dict[str, pl.PolarsDataType] | None) -> tuple[pl.DataFrame | pl.LazyFrame, Path | None]:
+            df = self.reader.read(file_path, dtypes)
+            return df, self.cache.put(file_path, df, variant)
+
+        return parse(None) if schema is None else _read_declared(parse, schema)
+
+    def _read_file(self, file_path: Path, schema: dict[str, pl.PolarsDataType] | None) -> pl.DataFrame | pl.LazyFrame:
+        # Frames parsed with another schema are different entries
+        variant = "" if schema is None else repr(schema)
+        entry_path = self.cache.get(file_path, variant)
+        if entry_path is None:
+            df, entry_path = self._parse(file_path, schema, variant)
+            if entry_path is None:
+                return df
+        # The entry is mapped right away, also by lazy reads: the put of a later shard may evict and remove it
+        # before the plan is collected, while a removed file stays readable through its mapping
+        df = pl.read_ipc(entry_path, memory_map=True)
+        return df.lazy() if self.lazy else df
+
+    def read(
+        self, file_path: Path | str | list[Path], schema: dict[str, pl.PolarsDataType] | None = None
+    ) -> pl.DataFrame | pl.LazyFrame:
+        """Reads the file from the cache, parsing and caching it with the wrapped reader on a cache miss."""
+        file_paths = (
+            [Path(shard_path) for shard_path in file_path] if isinstance(file_path, list) else [Path(file_path)]
+        )
+        try:
+            frames = [self._read_file(shard_path, schema) for shard_path in file_paths]
+        except AppReaderError:
+            raise
+        except Exception as exc:
+            raise AppReaderError(f"Unable to read file {_file_name(file_path)}: {exc!s}") from exc
+
+        return frames[0] if len(frames) == 1 else pl.concat(frames, how="vertical_relaxed", rechunk=False)
@@ -0,0 +1,225 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlsplit
+
+import polars as pl
+
+from models.errors import AppError
+from tiqets_app import TiqetsApp
+
+
+class DatasetSnapshot:
+    """Processed inputs kept in memory, sorted by their lookup keys.
+
+    Lookups are binary searches on the sorted key columns, so they take well under a millisecond without holding
+    per-row python objects. A snapshot is never modified once built, it is shared by all request threads and
+    replaced as a whole when the inputs are reloaded.
+    """
+
+    def __init__(self, aggregated_df: pl.DataFrame, customer_totals_df: pl.DataFrame, unused_barcodes: int):
+        """Initializes a DatasetSnapshot from the aggregated orders with native barcode lists."""
+        # Categorical ids are looked up by their text, they do not sort by it
+        aggregated_df = aggregated_df.with_columns(pl.col(pl.Categorical).cast(pl.Utf8))
+        self.orders_df = aggregated_df.sort("order_id")
+        self.customers_df = aggregated_df.select("customer_id", "order_id").sort("customer_id", "order_id")
+        self.top_customers_df = customer_totals_df.with_columns(pl.col(pl.Categorical).cast(pl.Utf8)).sort(
+            "total_barcodes", "customer_id", descending=[True, False]
+        )
+        self.unused_barcodes = unused_barcodes
+        self.loaded_at = datetime.now()
+
+    @staticmethod
+    def _key(series: pl.Series, value: str) -> int | str:
+        """Converts a key of the url to the type of the key column, raising ValueError for malformed keys."""
+        return value if series.dtype == pl.Utf8 else int(value)
+
+    def get_order(self, order_id: str) -> dict[str, Any] | None:
+        """Returns the order id, the customer and the barcodes of an order, None if the order is unknown."""
+        order_ids = self.orders_df["order_id"]
+        key = self._key(order_ids, order_id)
+        idx = order_ids.search_sorted(key)
+        if idx >= len(order_ids) or order_ids[idx] != key:
+            return None
+        return self.orders_df.row(idx, named=True)
+
+    def get_customer_orders(self, customer_id: str) -> dict[str, Any]:
+        """Returns the order ids of a customer, no order ids if the customer is unknown."""
+        customer_ids = self.customers_df["customer_id"]
+        key = self._key(customer_ids, customer_id)
+        start, end = customer_ids.search_sorted(key, "left"), customer_ids.search_sorted(key, "right")
+        return {"customer_id": key, "orders": self.customers_df["order_id"][start:end].to_list()}
+
+    def get_top_customers(self, top_n: int) -> list[dict[str, Any]]:
+        return self.top_customers_df.head(top_n).to_dicts()
+
+
+class ServeTiqetsApp(TiqetsApp):
+    """Processes the inputs into a DatasetSnapshot to be served, instead of writing an output file."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.snapshot: DatasetSnapshot | None = None
+
+    def process_data(self) -> bool:
+        aggregate_proc = self.processor.get_aggregated_data(as_list=True)
+        totals_proc = self.processor.get_customer_totals()
+        unused_barcodes_proc = self.processor.get_unused_barcodes_count()
+        for proc in (aggregate_proc, totals_proc, unused_barcodes_proc):
+            if not proc["is_ok"]:
+                self.logger.error(proc["error"])
+                return False
+
+        self.snapshot = DatasetSnapshot(
+            self._collect(aggregate_proc["data"]), self._collect(totals_proc["data"]), unused_barcodes_proc["data"]
+        )
+        self.logger.info(f"Dataset loaded, {self.snapshot.orders_df.height} orders are served.")
+        return True
+
+
+class SnapshotRequestHandler(BaseHTTPRequestHandler):
+    """Answers the JSON API from the current snapshot of the server.
+
+    Routes:
+        GET /orders/<order_id>/barcodes
+        GET /customers/<customer_id>/orders
+        GET /top_customers?n=<top_n>
+        GET /unused_barcodes
+        GET /health
+    """
+
+    server: "SnapshotServer"
+    # Keeps the connections of the clients open between requests
+    protocol_version = "HTTP/1.1"
+    # Responses are small, waiting to coalesce them with the next write only delays them
+    disable_nagle_algorithm = True
+
+    def _send_json(self, status: HTTPStatus, body: dict[str, Any]) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _route(self, snapshot: DatasetSnapshot, parts: list[str], query: dict[str, list[str]]) -> dict[str, Any]:
+        """Returns the response body of a path, raising LookupError for unknown resources."""
+        match parts:
+            case ["orders", order_id, "barcodes"]:
+                order = snapshot.get_order(order_id)
+                if order is None:
+                    raise LookupError(f"Order {order_id} not found")
+                return order
+            case ["customers", customer_id, "orders"]:
+                return snapshot.get_customer_orders(customer_id)
+            case ["top_customers"]:
+                top_n = int(query.get("n", [self.server.top_n])[0])
+                return {"top_customers": snapshot.get_top_customers(top_n)}
+            case ["unused_barcodes"]:
+                return {"unused_barcodes": snapshot.unused_barcodes}
+            case ["health"]:
+                return {"status": "ok", "loaded_at": snapshot.loaded_at.isoformat(timespec="seconds")}
+        raise LookupError(f"Unknown path /{'/'.join(parts)}")
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        # Requests keep the snapshot they started with, even if a reload swaps it meanwhile
+        snapshot = self.server.snapshot
+        try:
+            self._send_json(HTTPStatus.OK, self._route(snapshot, parts, parse_qs(url.query)))
+        except LookupError as exc:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": str(exc)})
+        except ValueError as exc:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": f"Invalid request: {exc!s}"})
+
+    def log_message(self, format: str, *args) -> None:
+        self.server.logger.debug(f"{self.address_string()} - {format % args}")
+
+
+class SnapshotServer(ThreadingHTTPServer):
+    """HTTP server answering every request in its own thread from the current dataset snapshot.
+
+    The input files are polled in a background thread, and the snapshot is rebuilt and swapped once they changed.
+    Until the new snapshot is ready, and when reloading fails, requests are answered from the previous one.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        load_snapshot: Callable[[], DatasetSnapshot | None],
+        file_paths: list[Path],
+        logger: logging.Logger,
+        top_n: int = 5,
+        reload_interval: float = 2.0,
+    ):
+        """Initializes a SnapshotServer, loading the first snapshot before listening.
+
+        Args:
+            address (tuple): Host and port to listen on.
+            load_snapshot (Callable): Reads, validates and processes the inputs, returns None on errors.
+            file_paths (list[Path]): Input files watched for changes.
+            logger (logging.Logger): Logger of the requests and reloads.
+            top_n (int): Number of top customers returned when not given by the request.
+            reload_interval (float): Seconds between two checks of the input files, 0 disables the reloads.
+
+        Raises:
+            AppError: If the first snapshot can not be loaded.
+        """
+        self.load_snapshot = load_snapshot
+        self.file_paths = file_paths
+        self.logger = logger
+        self.top_n = top_n
+        self.reload_interval = reload_interval
+        self.stopped = threading.Event()
+
+        self.file_stats = self._stat_files()
+        snapshot = load_snapshot()
+        if snapshot is None:
+            raise AppError("Unable to load the dataset to serve.")
+        self.snapshot = snapshot
+        super().__init__(address, SnapshotRequestHandler)
+
+    def _stat_files(self) -> list[tuple[int, int] | None]:
+        stats = []
+        for file_path in self.file_paths:
+            try:
+                stat = os.stat(file_path)
+                stats.append((stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                stats.append(None)
+        return stats
+
+    def _watch_files(self) -> None:
+        while not self.stopped.wait(self.reload_interval):
+            file_stats = self._stat_files()
+            if file_stats == self.file_stats:
+                continue
+
+            self.file_stats = file_stats
+            self.logger.info("Input files changed, reloading the dataset.")
+            started = time.perf_counter()
+            snapshot = self.load_snapshot()
+            if snapshot is None:
+                self.logger.error("Reloading the dataset failed, the previous one is still served.")
+                continue
+            # Replacing the reference is atomic, running requests finish on the snapshot they hold
+            self.snapshot = snapshot
+            self.logger.info(f"Dataset reloaded in {time.perf_counter() - started:.2f}s.")
+
+    def serve_forever(self, poll_interval: float = 0.5) -> None:
+        if self.reload_interval > 0:
+            threading.Thread(target=self._watch_files, name="reload", daemon=True).start()
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            self.stopped.set()
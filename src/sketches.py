@@ -0,0 +1,70 @@
+import math
+
+import polars as pl
+
+
+class TopKSketch:
+    """Space-Saving summary keeping the heaviest keys of a stream in bounded memory.
+
+    It keeps at most `capacity` counters, whatever the number of distinct keys. Updates are applied per batch,
+    by merging the exact counts of the batch into the summary: keys missing from a full summary may have been
+    evicted with at most the smallest counter, which is added to their count and recorded as their error, then
+    the largest `capacity` counters are kept. Estimates are upper bounds, at most their max_error above the
+    true counts, which is itself at most total / capacity, and every key with a larger true count is kept.
+    """
+
+    def __init__(self, capacity: int, key: str = "customer_id", count: str = "total_barcodes"):
+        """Initializes an empty sketch with the given number of counters and column names."""
+        if capacity < 1:
+            raise ValueError(f"Capacity of a sketch must be positive, got {capacity}.")
+        self.capacity = capacity
+        self.key = key
+        self.count = count
+        self.counters: pl.DataFrame | None = None
+        self.total = 0
+
+    @classmethod
+    def from_error(cls, error: float, top_n: int = 1, **kwargs) -> "TopKSketch":
+        """Returns a sketch whose counts are overestimated by at most the given fraction of the total count."""
+        if not 0 < error < 1:
+            raise ValueError(f"Error of a sketch must be between 0 and 1, got {error}.")
+        return cls(max(math.ceil(1 / error), top_n), **kwargs)
+
+    @property
+    def error_bound(self) -> int:
+        """Returns the maximum overestimation of any count, the smallest counter once the summary is full."""
+        if self.counters is None or self.counters.height < self.capacity:
+            return 0
+        return int(self.counters[self.count].min())
+
+    def update(self, counts_df: pl.DataFrame) -> None:
+        """Adds a batch of (key, count) rows, keys may be repeated within the batch."""
+        counts_df = counts_df.select(
+            self.key, pl.col(self.count).cast(pl.Int64), pl.lit(None, dtype=pl.Int64).alias("max_error")
+        )
+        self.total += int(counts_df[self.count].sum() or 0)
+
+        floor = self.error_bound
+        if self.counters is not None:
+            counts_df = pl.concat([self.counters, counts_df], how="vertical_relaxed")
+        counters = (
+            counts_df.group_by(self.key)
+            .agg(pl.sum(self.count), pl.col("max_error").max())
+            .with_columns(
+                pl.col(self.count) + pl.when(pl.col("max_error").is_null()).then(floor).otherwise(0),
+                pl.col("max_error").fill_null(floor),
+            )
+        )
+        self.counters = counters.top_k(self.capacity, by=self.count) if counters.height > self.capacity else counters
+
+    def top(self, n: int) -> pl.DataFrame:
+        """Returns the n keys with the largest estimated counts, in descending order of their counts.
+
+        The maximum overestimation of every count is reported alongside it in the max_error column.
+        """
+        counters = (
+            self.counters
+            if self.counters is not None
+            else pl.DataFrame(schema={self.key: pl.Int64, self.count: pl.Int64, "max_error": pl.Int64})
+        )
+        return counters.top_k(n, by=self.count).sort(self.count, descending=True)
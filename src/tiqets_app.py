@@ -1,11 +1,22 @@
 import logging
+from concurrent.futures import Future, as_completed, wait
+from typing import Any
 
 import polars as pl
 
 from app_arguments import AppArguments
+from barcode_index import write_barcode_index
+from metrics import MetricsRecorder, StageMetrics
+from models.errors import AppWriterError
 from models.processor import BaseProcessor
 from models.reader import BaseReader
+from models.schemas import get_input_schemas
 from models.validator import BaseValidator, ValidationResult
+from models.writer import BaseWriter
+from quarantine import QuarantineSink
+from query_profile import QueryProfiler
+from readers import start_read
+from writers import start_write
 
 
 class TiqetsApp:
@@ -16,88 +27,306 @@ class TiqetsApp:
         reader: BaseReader,
         validator: BaseValidator,
         processor: BaseProcessor,
+        writer: BaseWriter,
+        quarantine: QuarantineSink | None = None,
+        profiler: QueryProfiler | None = None,
     ):
         self.args = args
         self.logger = logger
         self.reader = reader
         self.validator = validator
         self.processor = processor
-        self.barcodes_df: pl.DataFrame
-        self.orders_df: pl.DataFrame
+        self.writer = writer
+        self.quarantine = quarantine
+        self.profiler = profiler or QueryProfiler()
+        self.schemas = get_input_schemas(args.categorical)
+        # Results of the run, e.g. for the summary of a batch
+        self.summary: dict[str, Any] = {}
+        # Measures of the steps of the run and of their sub-steps
+        self.metrics = MetricsRecorder()
+        self.barcodes_df: pl.DataFrame | pl.LazyFrame
+        self.orders_df: pl.DataFrame | pl.LazyFrame
 
-    def read_data(self) -> bool:
-        # Read CSV files
-        self.barcodes_df = self.reader.read(self.args.barcodes_file_path)
-        if self.barcodes_df.shape[0] == 0:
-            self.logger.warning(f"No data row in barcodes file: {self.args.barcodes_file}")
+    @staticmethod
+    def _is_empty(df: pl.DataFrame | pl.LazyFrame) -> bool:
+        """Checks if there is any data row, fetching only the first row of lazy frames."""
+        if isinstance(df, pl.LazyFrame):
+            try:
+                return df.limit(1).collect().is_empty()
+            except pl.ComputeError:
+                # Scanned files failing to parse have rows, the error is reported by the validation
+                return False
+        return df.shape[0] == 0
+
+    @staticmethod
+    def _loaded_rows(df: pl.DataFrame | pl.LazyFrame) -> str:
+        # Counting the rows of a lazy frame would need a full scan, so it is skipped
+        if isinstance(df, pl.LazyFrame):
+            return "Rows will be scanned lazily."
+        return f"{df.shape[0]} rows found."
+
+    @staticmethod
+    def _collect(df: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame:
+        # The streaming engine would only add its buffers to the small results collected here
+        return df.collect() if isinstance(df, pl.LazyFrame) else df
+
+    def _log_validation_errors(self, validation: ValidationResult) -> None:
+        if not validation["is_valid"]:
+            for error_pair in validation["errors"]:
+                self.logger.warning(f"{error_pair!s}")
+                if self.quarantine is not None:
+                    self.quarantine.add(error_pair)
+
+    def _write_quarantine(self) -> bool:
+        """Writes the rows rejected by the validation to the quarantine file, if any."""
+        if self.quarantine is None:
+            return True
+
+        try:
+            quarantine_path = self.quarantine.write()
+        except AppWriterError as exc:
+            self.logger.error(f"{exc!s}")
             return False
+        if quarantine_path is not None:
+            self.logger.warning(
+                f"{self.quarantine.rejected_count} rejected rows are written to quarantine file {quarantine_path.name}."
+            )
+        return True
 
-        self.logger.debug(
-            f"Barcodes file {self.args.barcodes_file_path.name} loaded. {self.barcodes_df.shape[0]} rows found."
-        )
+    def _write_barcode_index(
+        self, barcodes_df: pl.DataFrame | pl.LazyFrame, orders_df: pl.DataFrame | pl.LazyFrame
+    ) -> bool:
+        """Writes the barcode lookup index of the validated inputs, if enabled."""
+        if not self.args.barcode_index:
+            return True
 
-        self.orders_df = self.reader.read(self.args.orders_file_path)
-        if self.orders_df.shape[0] == 0:
-            self.logger.warning(f"No data row in orders file: {self.args.orders_file}")
+        try:
+            indexed_count = write_barcode_index(barcodes_df, orders_df, self.args.index_path)
+        except AppWriterError as exc:
+            self.logger.error(f"{exc!s}")
             return False
+        self.logger.info(f"Barcode index {self.args.index_path.name} is written with {indexed_count} barcodes.")
+        return True
 
-        self.logger.debug(
-            f"Orders file {self.args.orders_file_path.name} loaded. {self.orders_df.shape[0]} rows found."
+    def _log_rule_timings(self) -> None:
+        if self.validator.timings:
+            rule_timings = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.validator.timings.items())
+            self.logger.debug(f"Validation rule timings: {rule_timings}.")
+
+    def _apply_schema(self, df: pl.DataFrame | pl.LazyFrame, name: str) -> pl.DataFrame | pl.LazyFrame:
+        """Casts an input to its declared schema, reporting and dropping the rows with invalid values."""
+        with self.metrics.stage(f"schema_{name}") as stage:
+            stage.set_input(df)
+            schema_validation = self.validator.validate_schema(df, self.schemas[name])
+            self._log_validation_errors(schema_validation)
+            df = schema_validation.get("data", df)
+            stage.set_output(df)
+        return df
+
+    def _log_top_customers(self, customers_df: pl.DataFrame) -> None:
+        output = [
+            f"Top {self.args.top_n} customers:",
+            f"{'Customer ID': ^15}, {'Total Barcodes': ^15}",
+        ] + [f"{row['customer_id']: ^15}, {row['total_barcodes']: ^15}" for row in customers_df.rows(named=True)]
+        # Approximate totals come with the maximum overestimation of each of them
+        if "max_error" in customers_df.columns and not customers_df.is_empty():
+            output.append(f"Approximate totals, at most {customers_df['max_error'].max()} above the true totals.")
+        self.logger.info("\n".join(output))
+
+    def _log_results(self, top_customers_df: pl.DataFrame, unused_barcodes: int) -> None:
+        """Logs the top N customers and the number of unused barcodes, and keeps them in the summary of the run."""
+        # Output top N customers
+        self._log_top_customers(top_customers_df)
+
+        # Output number of unused barcodes
+        self.logger.info(f"Number of unused barcodes: {unused_barcodes!s}.")
+
+        self.summary.update(
+            output_file=self.args.output_file_path.name,
+            top_customers=top_customers_df.select("customer_id", "total_barcodes").rows(),
+            unused_barcodes=unused_barcodes,
         )
 
+    def write_metrics(self, is_ok: bool) -> None:
+        """Writes the metrics of the run to the JSON metrics file and to the Prometheus textfile, if enabled."""
+        if not self.args.metrics and self.args.prometheus_file_path is None:
+            return
+
+        try:
+            if self.args.metrics:
+                run = {
+                    "dataset": self.args.dataset_name,
+                    "barcodes_files": [file_path.name for file_path in self.args.barcodes_file_paths],
+                    "orders_files": [file_path.name for file_path in self.args.orders_file_paths],
+                    "output_file": self.args.output_file_path.name,
+                    "is_ok": is_ok,
+                    "summary": self.summary,
+                }
+                self.metrics.write_json(self.args.metrics_file_path, run)
+                self.logger.debug(f"Metrics file {self.args.metrics_file_path.name} is written.")
+            if self.args.prometheus_file_path is not None:
+                self.metrics.write_prometheus(
+                    self.args.prometheus_file_path, {"dataset": self.args.dataset_name}, is_ok
+                )
+        except AppWriterError as exc:
+            self.logger.error(f"{exc!s}")
+
+    def write_query_profile(self) -> None:
+        """Writes the optimized query plans and the node timings of the run, if enabled, and logs the slowest nodes."""
+        if not self.profiler.enabled:
+            return
+
+        try:
+            written_paths = self.profiler.write(self.args.plans_file_path, self.args.profile_file_path)
+        except AppWriterError as exc:
+            self.logger.error(f"{exc!s}")
+            return
+        self.logger.info(f"Query profile is written to {', '.join(file_path.name for file_path in written_paths)}.")
+        slowest_nodes = self.profiler.slowest_nodes()
+        if not slowest_nodes.is_empty():
+            self.logger.info(
+                "Slowest query plan nodes: "
+                + ", ".join(
+                    f"{row['stage']} {' '.join(row['node'].split())} {row['duration_us'] / 1000:.1f}ms"
+                    for row in slowest_nodes.rows(named=True)
+                )
+                + "."
+            )
+
+    def close(self) -> None:
+        """Releases the temporary resources of the run once it is over, whether its steps succeeded or not."""
+
+    def _read_schema(self, name: str) -> dict[str, pl.PolarsDataType]:
+        """Returns the column types the files of an input are read with."""
+        return self.schemas[name]
+
+    def _read_input(self, name: str, parent: StageMetrics | None) -> tuple[pl.DataFrame | pl.LazyFrame, bool]:
+        """Reads the files of an input, returns the frame and whether it has no data row."""
+        with self.metrics.stage(name, parent) as stage:
+            df = self.reader.read(getattr(self.args, f"{name}_file_paths"), self._read_schema(name))
+            stage.set_output(df)
+            return df, self._is_empty(df)
+
+    def read_data(self) -> bool:
+        # Read the barcodes and orders CSV files concurrently, the polars parsing releases the GIL
+        futures = {
+            start_read(self._read_input, name, self.metrics.current_stage): name for name in ("barcodes", "orders")
+        }
+        frames = {}
+        try:
+            for future in as_completed(futures):
+                name = futures[future]
+                df, is_empty = future.result()
+                if is_empty:
+                    self.logger.warning(f"No data row in {name} file: {getattr(self.args, f'{name}_file')}")
+                    return False
+                self.logger.debug(
+                    f"{name.capitalize()} file {getattr(self.args, f'{name}_file_path').name} loaded. "
+                    f"{self._loaded_rows(df)}"
+                )
+                frames[name] = df
+        finally:
+            # Once a read failed, the other one is not waited for
+            for future in futures:
+                future.cancel()
+
+        self.barcodes_df, self.orders_df = frames["barcodes"], frames["orders"]
         return True
 
     def validate_data(self) -> bool:
-        # Validate data
-        barcode_validation: ValidationResult = self.validator.validate_barcodes(self.barcodes_df, "barcode")
-        if not barcode_validation["is_valid"]:
-            for error_pair in barcode_validation["errors"]:
-                self.logger.warning(f"{error_pair!s}")
-
-        set_df_proc = self.processor.set_dataframes(self.barcodes_df, self.orders_df)
-        if not set_df_proc["is_ok"]:
-            self.logger.error(set_df_proc["error"])
+        try:
+            return self._validate_data()
+        except pl.ComputeError as exc:
+            # Scanned files are only parsed by the collects of the validation, which fail on values not fitting
+            # their declared types
+            self.logger.error(f"Unable to read the input files: {exc!s}")
             return False
 
-        order_validation = self.validator.validate_orders(self.processor.merged_df, "barcode")
-        if not order_validation["is_valid"]:
-            for error_pair in order_validation["errors"]:
-                self.logger.warning(f"{error_pair!s}")
+    def _validate_data(self) -> bool:
+        # Validate data
+        self.barcodes_df = self._apply_schema(self.barcodes_df, "barcodes")
+        self.orders_df = self._apply_schema(self.orders_df, "orders")
 
-            self.processor.merged_df = order_validation["data"]
+        with self.metrics.stage("barcodes") as stage:
+            stage.set_input(self.barcodes_df)
+            order_ids = self._collect(self.orders_df.select(pl.col("order_id").unique())).to_series()
+            barcode_validation: ValidationResult = self.validator.validate_barcodes(
+                self.barcodes_df, "barcode", order_ids
+            )
+            self._log_validation_errors(barcode_validation)
+            stage.set_output(barcode_validation.get("data", self.barcodes_df))
+        with self.metrics.stage("order_ids") as stage:
+            stage.set_input(self.orders_df)
+            order_id_validation = self.validator.validate_order_ids(self.orders_df, "order_id")
+            self._log_validation_errors(order_id_validation)
+            stage.set_output(order_id_validation.get("data", self.orders_df))
 
-        return True
+        with self.metrics.stage("set_dataframes") as stage:
+            stage.set_input(self.barcodes_df, self.orders_df)
+            set_df_proc = self.processor.set_dataframes(self.barcodes_df, self.orders_df)
+            if not set_df_proc["is_ok"]:
+                stage.is_ok = False
+                self.logger.error(set_df_proc["error"])
+                return False
+            # The join of scanned inputs is collected once, for the validation of the orders and the processing,
+            # while the inputs themselves are never held in memory
+            if isinstance(self.processor.merged_df, pl.LazyFrame):
+                self.processor.merged_df = self.profiler.collect("join", self.processor.merged_df)
+            stage.set_output(self.processor.merged_df)
 
-    def process_data(self) -> bool:
-        # Process data
-        aggregate_proc = self.processor.get_aggregated_data()
-        if not aggregate_proc["is_ok"]:
-            self.logger.error(aggregate_proc["error"])
+        with self.metrics.stage("orders") as stage:
+            stage.set_input(self.processor.merged_df)
+            order_validation = self.validator.validate_orders(self.processor.merged_df, "barcode")
+            if not order_validation["is_valid"]:
+                self._log_validation_errors(order_validation)
+                self.processor.merged_df = order_validation["data"]
+            stage.set_output(self.processor.merged_df)
+
+        self._log_rule_timings()
+        with self.metrics.stage("barcode_index") as stage:
+            stage.is_ok = self._write_barcode_index(
+                barcode_validation.get("data", self.barcodes_df), order_id_validation.get("data", self.orders_df)
+            )
+        if not stage.is_ok:
             return False
+        with self.metrics.stage("quarantine") as stage:
+            stage.is_ok = self._write_quarantine()
+        return stage.is_ok
 
-        # Generate the processed output dataset
-        aggregate_proc["data"].write_csv(self.args.output_file_path, separator=",")
-        self.logger.info(f"Processed data file is generated {self.args.output_file_path.name!s}.")
+    def process_data(self) -> bool:
+        # Process data, the aggregation, top N customers and unused barcodes are computed together. The processed
+        # output dataset is generated in the background as soon as the aggregate is computed, while the top
+        # customers are ranked and the results are reported
+        write_futures: list[Future] = []
+        with self.metrics.stage("results") as stage:
+            # Processors querying a database have no merged frame
+            stage.set_input(getattr(self.processor, "merged_df", None))
+            results_proc = self.processor.get_results(
+                self.args.top_n,
+                as_list=self.writer.supports_lists,
+                on_aggregated=lambda aggregated_df: write_futures.append(
+                    start_write(self.writer, aggregated_df, self.args.output_file_path)
+                ),
+            )
+            if not results_proc["is_ok"]:
+                stage.is_ok = False
+                self.logger.error(results_proc["error"])
+                # A started write still completes, the run does not end before its thread
+                wait(write_futures)
+                return False
 
-        # Get top N customers & output
-        top_customers_proc = self.processor.get_top_n_customers(self.args.top_n)
-        if not top_customers_proc["is_ok"]:
-            self.logger.warning(aggregate_proc["error"])
-        else:
-            output = [
-                f"Top {self.args.top_n} customers:",
-                f"{'Customer ID': ^15}, {'Total Barcodes': ^15}",
-            ] + [
-                f"{row['customer_id']: ^15}, {row['total_barcodes']: ^15}"
-                for row in top_customers_proc["data"].rows(named=True)
-            ]
-            self.logger.info("\n".join(output))
+            results = results_proc["data"]
+            stage.set_output(results["aggregated"])
 
-        # Output number of unused barcodes
-        unused_barcodes_proc = self.processor.get_unused_barcodes_count()
-        if not unused_barcodes_proc["is_ok"]:
-            self.logger.warning(unused_barcodes_proc["error"])
-        else:
-            self.logger.info(f"Number of unused barcodes: {unused_barcodes_proc['data']!s}.")
+        with self.metrics.stage("write") as stage:
+            stage.set_input(results["aggregated"])
+            self._log_results(results["top_customers"], results["unused_barcodes"])
+            try:
+                write_futures[0].result()
+            except AppWriterError as exc:
+                stage.is_ok = False
+                self.logger.error(f"{exc!s}")
+                return False
+        self.logger.info(f"Processed data file is generated {self.args.output_file_path.name!s}.")
 
         return True
@@ -3,7 +3,13 @@ import logging
 import sys
 from logging.handlers import TimedRotatingFileHandler
 
-from app_arguments import AppArguments
+from app_arguments import (
+    DEFAULT_MEMORY_BUDGET,
+    OUTPUT_EXTENSIONS,
+    VALIDATION_RULE_DEFAULTS,
+    AppArguments,
+)
+from models.errors import AppConfigError
 
 
 def parse_args() -> AppArguments:
@@ -20,10 +26,219 @@ def parse_args() -> AppArguments:
     parser.add_argument("orders_file", type=str, help="Name of the orders csv file.")
     parser.add_argument("-p", "--file_path", type=str, default="data", help="Path of the dataset files")
     parser.add_argument("-t", "--top_n", type=int, default=5, help="Number of top customers to display.")
+    parser.add_argument(
+        "-e",
+        "--top_n_error",
+        type=float,
+        default=None,
+        help="Enables approximate top customers in bounded memory, with totals overestimated by at most this "
+        "fraction of all barcodes, e.g. 0.001. Requires the out-of-core execution.",
+    )
+    parser.add_argument(
+        "--enabled_rules",
+        nargs="+",
+        default=None,
+        choices=list(VALIDATION_RULE_DEFAULTS),
+        metavar="RULE",
+        help="Validation rules to enable on top of the default ones: "
+        + ", ".join(name for name, enabled in VALIDATION_RULE_DEFAULTS.items() if not enabled)
+        + ".",
+    )
+    parser.add_argument(
+        "--disabled_rules",
+        nargs="+",
+        default=None,
+        choices=list(VALIDATION_RULE_DEFAULTS),
+        metavar="RULE",
+        help="Validation rules to disable: "
+        + ", ".join(name for name, enabled in VALIDATION_RULE_DEFAULTS.items() if enabled)
+        + ".",
+    )
+    parser.add_argument(
+        "--rule_timings",
+        action="store_true",
+        help="Logs the time spent on every validation rule in debugging mode, the rules are then evaluated one by one "
+        "in addition.",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Logs the time spent on the imports, the argument parsing, reading, validation and processing.",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="Writes the wall time, CPU time, peak RSS delta, rows and frame sizes of every step and sub-step to a "
+        "JSON metrics file next to the output file.",
+    )
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="Writes the optimized polars query plans of the validation and processing stages to a text file next "
+        "to the output file.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Runs the polars query plans of the validation and processing stages under the polars profiler, and "
+        "writes the timings of their nodes to a csv file next to the output file.",
+    )
+    parser.add_argument(
+        "--prometheus_file",
+        type=str,
+        default=None,
+        help="Writes the metrics of every step and sub-step to this file in the Prometheus text format, e.g. for the "
+        "node exporter textfile collector.",
+    )
     parser.add_argument("-d", "--debug", action="store_true", help="Enables debugging mode.")
+    parser.add_argument(
+        "--categorical",
+        action="store_true",
+        help="Encodes customer ids as categoricals instead of unsigned integers, e.g. for non-numeric ids.",
+    )
+    parser.add_argument(
+        "-l",
+        "--lazy",
+        action="store_true",
+        help="Enables lazy execution: inputs are only scanned by the validation, and their join is collected once "
+        "for the processing, so the parsed inputs are never held in memory. Without the parsed-input cache, values "
+        "not fitting their declared types fail the run instead of being rejected.",
+    )
+    parser.add_argument(
+        "-o",
+        "--out_of_core",
+        action="store_true",
+        help="Enables out-of-core execution: inputs are hash-partitioned to disk and processed one partition at a time.",
+    )
+    parser.add_argument(
+        "-m",
+        "--memory_budget",
+        type=int,
+        default=None,
+        help="Memory budget in MB of a partition of the out-of-core execution, at most the memory of the run. Defaults "
+        "to the partition share of the memory of the run when given or when it selects the out-of-core execution, "
+        f"and to {DEFAULT_MEMORY_BUDGET} MB otherwise.",
+    )
+    parser.add_argument(
+        "--max_memory",
+        type=int,
+        default=None,
+        help="Memory in MB of the run, the out-of-core execution is selected when the inputs are not expected to fit "
+        "in it. Defaults to the memory limit of the container. The memory budget of the partitions is derived from it, "
+        "unless given.",
+    )
+
+    parser.add_argument(
+        "-f",
+        "--output_format",
+        type=str,
+        default="csv",
+        choices=list(OUTPUT_EXTENSIONS),
+        help="Format of the output file, all but csv keep the barcodes as a native list.",
+    )
+    parser.add_argument(
+        "--barcode_index",
+        action="store_true",
+        help="Writes a memory-mapped lookup index of the validated barcodes, their orders and customers, for "
+        "scanning barcodes without processing the inputs.",
+    )
+    parser.add_argument(
+        "--index_folder_path", type=str, default="out/index", help="Directory of the barcode lookup indexes."
+    )
+    parser.add_argument(
+        "--quarantine_format",
+        type=str,
+        default="parquet",
+        choices=["csv", "parquet", "none"],
+        help="Format of the quarantine file next to the output file, where the rows rejected by the validation are "
+        "written with the rule that rejected them. With none, they are only sampled in the log.",
+    )
+    parser.add_argument(
+        "--parquet_compression",
+        type=str,
+        default="zstd",
+        choices=["zstd", "lz4", "snappy", "gzip", "brotli", "uncompressed"],
+        help="Compression codec of parquet output files.",
+    )
+    parser.add_argument(
+        "--parquet_row_group_size", type=int, default=None, help="Number of rows per row group of parquet output files."
+    )
+    parser.add_argument(
+        "--fsync",
+        action="store_true",
+        help="Flushes the output files to disk before renaming them in place, so they survive a power loss.",
+    )
+
+    parser.add_argument(
+        "-b",
+        "--backend",
+        type=str,
+        default="polars",
+        choices=["polars", "sqlite"],
+        help="Backend processing the data. With sqlite, inputs are bulk-loaded into a database once and later runs on "
+        "the same files only query it.",
+    )
+    parser.add_argument(
+        "--database_folder_path", type=str, default="out/db", help="Directory of the sqlite backend databases."
+    )
+    parser.add_argument(
+        "-s",
+        "--serve",
+        action="store_true",
+        help="Keeps the processed data in memory and answers queries over a local HTTP JSON API: "
+        "/orders/<order_id>/barcodes, /customers/<customer_id>/orders, /top_customers?n=<top_n> and /unused_barcodes.",
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Host the server listens on.")
+    parser.add_argument("--port", type=int, default=8080, help="Port the server listens on, 0 for any free port.")
+    parser.add_argument(
+        "--reload_interval",
+        type=float,
+        default=2.0,
+        help="Seconds between two checks of the input files by the server, which reloads the data when they change. "
+        "0 disables the reloads.",
+    )
+    parser.add_argument(
+        "-w",
+        "--watch",
+        action="store_true",
+        help="Keeps running and processes the inputs again in the same process whenever their files are dropped or "
+        "changed. Combined with the incremental mode, only the appended rows are processed.",
+    )
+    parser.add_argument(
+        "--watch_debounce",
+        type=float,
+        default=1.0,
+        help="Seconds without any change of the input files before they are processed again, so partially written "
+        "files are not read.",
+    )
+    parser.add_argument(
+        "--watch_polling",
+        action="store_true",
+        help="Polls the input directories for changes instead of using inotify, e.g. on network file systems.",
+    )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help="Enables incremental execution: only rows appended since the last run are read and merged into a saved "
+        "state. Remove the state directory to start over.",
+    )
+    parser.add_argument(
+        "--state_folder_path", type=str, default="out/state", help="Directory of the incremental execution states."
+    )
+    parser.add_argument(
+        "--no_cache",
+        action="store_true",
+        help="Disables the parsed-input cache, input files are parsed again instead of memory-mapping the cache.",
+    )
+    parser.add_argument("--cache_size", type=int, default=2048, help="Maximum size in MB of the parsed-input cache.")
 
     cli_args, _ = parser.parse_known_args()
-    return AppArguments(**vars(cli_args))
+    try:
+        return AppArguments(**vars(cli_args))
+    except AppConfigError as exc:
+        # Reported like the errors of the parser, with the usage instead of a traceback
+        parser.error(str(exc))
 
 
 def get_logger(name: str, is_debug: bool) -> logging.Logger:
@@ -38,8 +253,9 @@ def get_logger(name: str, is_debug: bool) -> logging.Logger:
     handler_stream.setLevel(logging.DEBUG if is_debug else logging.INFO)
     handler_stream.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
 
+    # The log file is only opened by the first warning, runs without any do not touch it
     handler_file_rotating_error = TimedRotatingFileHandler(
-        filename="out/logs/errors", when="D", interval=1, backupCount=5
+        filename="out/logs/errors", when="D", interval=1, backupCount=5, delay=True
     )
     handler_file_rotating_error.suffix = "%Y-%m-%d.log"
     handler_file_rotating_error.setLevel(logging.WARNING)
@@ -1,57 +1,255 @@
+import time
+from typing import Iterable
+
 import polars as pl
 
-from models.validator import ValidationError, ValidationResult
+from models.errors import AppConfigError
+from models.validator import ValidationError, ValidationResult, ValidationRule
+from query_profile import QueryProfiler
+
+# Largest barcode value of the GS1 formats, GTIN-14
+MAX_GTIN = 10**14 - 1
+
+
+def _gtin_check_digit_is_valid(column: str) -> pl.Expr:
+    """Checks the GS1 mod 10 check digit of numeric barcodes of up to 14 digits.
+
+    Leading zeros do not change the check digit, so EAN-8, UPC-A, EAN-13 and GTIN-14 barcodes are all checked as
+    GTIN-14. The digits are weighted 1 and 3 alternately from the right, starting with the check digit.
+    """
+    value = pl.col(column).cast(pl.UInt64, strict=False)
+    checksum = pl.sum_horizontal(
+        value // pl.lit(10**position, dtype=pl.UInt64) % 10 * (3 if position % 2 else 1) for position in range(14)
+    )
+    return (value <= MAX_GTIN) & (checksum % 10 == 0)
+
+
+# Registry of the validation rules by name. The rules of a dataset are evaluated together as flag columns
+VALIDATION_RULES: dict[str, ValidationRule] = {
+    rule.name: rule
+    for rule in [
+        ValidationRule(
+            "duplicate_barcodes",
+            "barcodes",
+            "Duplicate barcodes found",
+            lambda column, _: pl.col(column).is_duplicated(),
+        ),
+        ValidationRule(
+            "unknown_orders",
+            "barcodes",
+            "Barcodes of unknown orders found",
+            lambda _, order_ids: pl.col("order_id").is_not_null() & ~pl.col("order_id").is_in(order_ids),
+            columns=("order_id",),
+            uses_reference=True,
+        ),
+        ValidationRule(
+            "barcode_format",
+            "barcodes",
+            "Barcodes with an invalid GS1 check digit found",
+            lambda column, _: pl.col(column).is_not_null() & ~_gtin_check_digit_is_valid(column).fill_null(False),
+            enabled=False,
+        ),
+        ValidationRule(
+            "duplicate_order_ids",
+            "orders",
+            "Duplicate order ids found",
+            lambda column, _: pl.col(column).is_duplicated(),
+        ),
+        ValidationRule(
+            "orders_without_barcodes",
+            "merged",
+            "Orders without barcodes found",
+            lambda column, _: pl.col(column).is_null(),
+        ),
+        ValidationRule(
+            "orders_without_customers",
+            "merged",
+            "Orders without customers found",
+            lambda _, __: pl.col("customer_id").is_null(),
+            columns=("customer_id",),
+        ),
+    ]
+}
 
 
 class DataValidator:
-    """Validates if there are duplicate values or missing values in the specified column."""
+    """Validates the datasets with the registered validation rules, and the values against the declared types.
 
-    def validate_barcodes(self, df: pl.DataFrame, column: str) -> ValidationResult:
-        """Validates that dataset not includes duplicate barcodes."""
+    All enabled rules of a dataset are computed as flag columns of a single vectorized pass over the data, the rows
+    with any flag are fetched once and split by rule for reporting.
+    Both eager DataFrames and LazyFrames are accepted. For lazy inputs only the failing rows are collected
+    for reporting, while the returned data stays lazy so it can be chained into the processing plan.
+    """
 
-        try:
-            duplicated_barcodes = self._get_duplicated_barcodes(df, column)
-            if duplicated_barcodes is None:
-                return {"is_valid": True}
+    def __init__(
+        self,
+        enabled_rules: Iterable[str] = (),
+        disabled_rules: Iterable[str] = (),
+        timed: bool = False,
+        profiler: QueryProfiler | None = None,
+    ):
+        """Initializes a DataValidator with the rules enabled by default, toggled by the given rule names.
 
-            # there are duplicated values in the specified column
-            return {
-                "is_valid": False,
-                "errors": [ValidationError("Duplicate barcodes found", duplicated_barcodes.to_dicts())],
-                "data": df.unique(subset=[column], keep="none", maintain_order=True),
-            }
+        Args:
+            enabled_rules (Iterable[str]): Names of the rules to enable, on top of the rules enabled by default.
+            disabled_rules (Iterable[str]): Names of the rules to disable.
+            timed (bool): Measure the time spent on every rule, which evaluates the rules one by one in addition.
+            profiler (QueryProfiler | None): Profiler collecting the plans of the rules, when they are explained or
+                profiled.
+
+        Raises:
+            AppConfigError: If a rule name is not registered.
+        """
+        enabled_rules, disabled_rules = set(enabled_rules), set(disabled_rules)
+        unknown_rules = (enabled_rules | disabled_rules) - VALIDATION_RULES.keys()
+        if unknown_rules:
+            raise AppConfigError(f"Unknown validation rules: {', '.join(sorted(unknown_rules))}.")
+
+        self.rules = [
+            rule
+            for rule in VALIDATION_RULES.values()
+            if (rule.enabled or rule.name in enabled_rules) and rule.name not in disabled_rules
+        ]
+        self.timed = timed
+        self.timings: dict[str, float] = {}
+        self.profiler = profiler or QueryProfiler()
+
+    def validate_barcodes(
+        self, df: pl.DataFrame | pl.LazyFrame, column: str, order_ids: pl.Series | None = None
+    ) -> ValidationResult:
+        """Validates that dataset not includes duplicate barcodes, nor barcodes of orders missing from the order ids.
+
+        Barcodes are only checked against the orders when the order ids are given.
+        """
+
+        try:
+            return self.validate(df, "barcodes", column, order_ids)
         except Exception as exc:
+            # Values of scanned files not fitting their declared types fail the collect, the app reports a read error
+            if isinstance(df, pl.LazyFrame) and isinstance(exc, pl.ComputeError):
+                raise
             return {
                 "is_valid": False,
-                "errors": [ValidationError(f"Error occurred during validation: {exc!s}", df.to_dicts())],
+                "errors": [
+                    ValidationError(
+                        f"Error occurred during validation: {exc!s}",
+                        None if isinstance(df, pl.LazyFrame) else df,
+                        "validation_error",
+                    )
+                ],
                 "data": df.clear(),
             }
 
-    def validate_orders(self, df: pl.DataFrame, column: str) -> ValidationResult:
-        """Checks that all orders have a corresponding barcode."""
-        orphan_orders = self._get_orders_wo_barcodes(df, column)
-        if orphan_orders is None:
+    def validate_order_ids(self, df: pl.DataFrame | pl.LazyFrame, column: str) -> ValidationResult:
+        """Validates that dataset not includes duplicate order ids."""
+        return self.validate(df, "orders", column)
+
+    def validate_schema(
+        self, df: pl.DataFrame | pl.LazyFrame, schema: dict[str, pl.PolarsDataType]
+    ) -> ValidationResult:
+        """Validates that the values fit the declared column types and casts the columns to these types.
+
+        Values that can not be cast, e.g. text or negative numbers in unsigned id columns, are reported and their
+        rows are dropped. Missing values are kept. The data is only returned when a column had to be cast.
+        """
+        cast_schema = {
+            column: dtype for column, dtype in schema.items() if column in df.columns and df.schema[column] != dtype
+        }
+        if not cast_schema:
             return {"is_valid": True}
 
-        #  there are missing values in the specified column.
-        return {
-            "is_valid": False,
-            "errors": [ValidationError("Orders without barcodes found", orphan_orders.to_dicts())],
-            "data": df.drop_nulls(subset=column),
+        invalid_values = {
+            column: pl.col(column).is_not_null() & pl.col(column).cast(dtype, strict=False).is_null()
+            for column, dtype in cast_schema.items()
+        }
+        # The rows with any invalid value are fetched at once, then split by column for reporting
+        is_invalid = pl.any_horizontal(list(invalid_values.values()))
+        invalid_df = df.filter(is_invalid)
+        if isinstance(invalid_df, pl.LazyFrame):
+            invalid_df = invalid_df.collect(streaming=True)
+
+        errors = []
+        for column, is_invalid_value in invalid_values.items():
+            invalid_rows = invalid_df.filter(is_invalid_value)
+            if not invalid_rows.is_empty():
+                errors.append(
+                    ValidationError(
+                        f"Invalid {column} values found, expected {cast_schema[column]}",
+                        invalid_rows,
+                        f"invalid_{column}",
+                    )
+                )
+
+        data = df.filter(~is_invalid) if errors else df
+        data = data.with_columns(pl.col(column).cast(dtype, strict=False) for column, dtype in cast_schema.items())
+        return {"is_valid": not errors, "errors": errors, "data": data}
+
+    def validate_orders(self, df: pl.DataFrame | pl.LazyFrame, column: str) -> ValidationResult:
+        """Checks that all merged orders have a corresponding barcode and a customer."""
+        return self.validate(df, "merged", column)
+
+    def validate(
+        self,
+        df: pl.DataFrame | pl.LazyFrame,
+        dataset: str,
+        column: str,
+        reference: pl.Series | None = None,
+        reference_rules_only: bool = False,
+    ) -> ValidationResult:
+        """Validates the data with all enabled rules of the dataset in a single pass.
+
+        Args:
+            df (pl.DataFrame | pl.LazyFrame): Data to validate.
+            dataset (str): Dataset of the rules to apply, one of "barcodes", "orders" or "merged".
+            column (str): Column checked by the rules, e.g. the barcode column.
+            reference (pl.Series | None): Values referenced by the data, rules using them are skipped when None.
+            reference_rules_only (bool): Apply only the rules using the reference values.
+
+        Returns:
+            ValidationResult: The errors of every failed rule, and the data without the flagged rows.
+        """
+        flags = {
+            f"_{rule.name}": rule.flag(column, reference)
+            for rule in self.rules
+            if rule.dataset == dataset
+            and all(rule_column in df.columns for rule_column in rule.columns)
+            and (reference is not None or not rule.uses_reference)
+            and (rule.uses_reference or not reference_rules_only)
         }
+        if not flags:
+            return {"is_valid": True}
+        if self.timed:
+            self._time_rules(df, flags)
+
+        # Evaluate all flags in one pass, then fetch the rows with any flag at once
+        is_invalid = pl.any_horizontal(list(flags))
+        if isinstance(df, pl.LazyFrame):
+            flagged_df = df.with_columns(**flags)
+            # Flags over whole columns, like the duplicates, can not be streamed, the streaming engine would only add
+            # its buffers to the memory of the collect
+            invalid_df = self.profiler.collect(f"validate_{dataset}", flagged_df.filter(is_invalid))
+        else:
+            flagged_df = self.profiler.collect(f"validate_{dataset}", df.lazy().with_columns(**flags))
+            invalid_df = flagged_df.filter(is_invalid)
+        if invalid_df.is_empty():
+            return {"is_valid": True}
+
+        errors = []
+        for rule in self.rules:
+            flag = f"_{rule.name}"
+            if flag in flags:
+                failed_rows = invalid_df.filter(pl.col(flag)).drop(list(flags))
+                if not failed_rows.is_empty():
+                    errors.append(ValidationError(rule.error_message, failed_rows, rule.name))
+
+        return {"is_valid": False, "errors": errors, "data": flagged_df.filter(~is_invalid).drop(list(flags))}
 
-    @staticmethod
-    def _get_duplicated_barcodes(df: pl.DataFrame, column: str) -> pl.DataFrame | None:
-        """Returns if there are duplicated values in the specified column."""
-        if df[column].is_duplicated().any():
-            # return duplicate barcodes
-            return df.filter(df[column].is_duplicated())
-        return None
-
-    @staticmethod
-    def _get_orders_wo_barcodes(df: pl.DataFrame, column: str) -> pl.DataFrame | None:
-        """Returns if there are missing values in the specified column."""
-        if df[column].is_null().any():
-            # return orders without barcodes
-            return df.filter(pl.col(column).is_null())
-        return None
+    def _time_rules(self, df: pl.DataFrame | pl.LazyFrame, flags: dict[str, pl.Expr]) -> None:
+        """Evaluates every rule flag on its own to add up the time spent on each rule."""
+        for flag, expr in flags.items():
+            started = time.perf_counter()
+            counts = df.select(expr.sum())
+            if isinstance(counts, pl.LazyFrame):
+                counts.collect(streaming=True)
+            rule_name = flag.removeprefix("_")
+            self.timings[rule_name] = self.timings.get(rule_name, 0.0) + time.perf_counter() - started
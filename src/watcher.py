@@ -0,0 +1,180 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from fnmatch import fnmatch
+from pathlib import Path
+
+from compression import CSV_PATTERNS
+
+# inotify event masks of linux/inotify.h
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyEvents:
+    """Changed file names of directories, reported by the kernel through inotify.
+
+    Raises:
+        OSError: If inotify is not available on the platform or the directories can not be watched.
+    """
+
+    def __init__(self, directories: list[Path]):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.directories: dict[int, Path] = {}
+        for directory in directories:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                self.close()
+                raise OSError(errno, f"Unable to watch {directory!s}")
+            self.directories[wd] = directory
+
+    def poll(self, timeout: float) -> set[Path]:
+        """Returns the paths changed within the timeout, as soon as there is any."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        buffer = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset < len(buffer):
+            wd, _, _, name_length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = buffer[offset : offset + name_length].rstrip(b"\0")
+            offset += name_length
+            if name and wd in self.directories:
+                changed.add(self.directories[wd] / os.fsdecode(name))
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class PollingEvents:
+    """Changed file names of directories, found by comparing the sizes and modification times of their files."""
+
+    def __init__(self, directories: list[Path], interval: float = 1.0):
+        self.directories = directories
+        self.interval = interval
+        self.file_stats = self._stat_files()
+
+    def _stat_files(self) -> dict[Path, tuple[int, int]]:
+        file_stats = {}
+        for directory in self.directories:
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            stat = entry.stat()
+                            file_stats[Path(entry.path)] = (stat.st_size, stat.st_mtime_ns)
+            except FileNotFoundError:
+                continue
+        return file_stats
+
+    def poll(self, timeout: float) -> set[Path]:
+        """Returns the paths changed within the timeout, checked every interval."""
+        deadline = time.monotonic() + timeout
+        while True:
+            time.sleep(max(0.0, min(self.interval, deadline - time.monotonic())))
+            file_stats = self._stat_files()
+            changed = {
+                file_path
+                for file_path in file_stats.keys() | self.file_stats.keys()
+                if file_stats.get(file_path) != self.file_stats.get(file_path)
+            }
+            self.file_stats = file_stats
+            if changed or time.monotonic() >= deadline:
+                return changed
+
+    def close(self) -> None:
+        pass
+
+
+class DirectoryWatcher:
+    """Waits for input files to be dropped or changed, until they are completely written.
+
+    The directories of the input paths are watched with inotify, or polled when inotify is not available. Input
+    paths may be files, glob patterns or directories of csv files, only changes of matching files are reported.
+    As files are usually written in several steps, changes are only reported once no matching file changed during
+    the debounce delay.
+    """
+
+    def __init__(self, input_paths: list[Path], debounce: float = 1.0, polling: bool = False):
+        """Initializes a DirectoryWatcher on the given input paths.
+
+        Args:
+            input_paths (list[Path]): Input files, glob patterns or directories to watch.
+            debounce (float): Seconds without any change before changes are reported.
+            polling (bool): Poll the directories even if inotify is available.
+        """
+        self.patterns = [
+            pattern
+            for input_path in input_paths
+            for pattern in (
+                [input_path / csv_pattern for csv_pattern in CSV_PATTERNS] if input_path.is_dir() else [input_path]
+            )
+        ]
+        self.debounce = debounce
+        directories = list(dict.fromkeys(pattern.parent for pattern in self.patterns))
+        events: InotifyEvents | PollingEvents | None = None
+        if not polling:
+            try:
+                events = InotifyEvents(directories)
+            except (OSError, AttributeError):
+                # AttributeError: the C library has no inotify functions
+                pass
+        self.events = events or PollingEvents(directories, interval=max(debounce / 2, 0.05))
+        self.method = "inotify" if isinstance(self.events, InotifyEvents) else "polling"
+
+    def _matching(self, file_paths: set[Path]) -> set[Path]:
+        return {
+            file_path
+            for file_path in file_paths
+            if any(
+                file_path.parent == pattern.parent and fnmatch(file_path.name, pattern.name)
+                for pattern in self.patterns
+            )
+        }
+
+    def wait_for_changes(self, timeout: float | None = None) -> list[Path]:
+        """Blocks until matching files changed and settled, returns their sorted paths.
+
+        Args:
+            timeout (float | None): Seconds to wait for a first change, no changes are returned once it is over.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed: set[Path] = set()
+        while not changed:
+            remaining = 1.0 if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            changed = self._matching(self.events.poll(min(remaining, 1.0)))
+
+        # Partial writes keep changing the files, they are only reported after a quiet debounce delay
+        last_changed = time.monotonic()
+        while (quiet_remaining := self.debounce - (time.monotonic() - last_changed)) > 0:
+            more_changed = self._matching(self.events.poll(quiet_remaining))
+            if more_changed:
+                changed |= more_changed
+                last_changed = time.monotonic()
+        return sorted(changed)
+
+    def close(self) -> None:
+        self.events.close()
@@ -0,0 +1,146 @@
+import os
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable
+
+import polars as pl
+
+from models.errors import AppWriterError
+from models.writer import BaseWriter
+
+
+def _fsync(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write(df: pl.DataFrame | pl.LazyFrame, file_path: Path, sink: Callable, write: Callable, fsync: bool) -> None:
+    """Writes a dataframe, streaming lazy frames into the file where the plan allows it.
+
+    The dataframe is written to a temporary file in the same directory, renamed over the file once complete, so a
+    failed or interrupted write never leaves a truncated file behind. With fsync, the file and the rename are
+    flushed to disk before returning.
+    """
+    tmp_path = file_path.with_name(f".{file_path.name}.tmp")
+    try:
+        if not isinstance(df, pl.LazyFrame):
+            write(df, tmp_path)
+        else:
+            try:
+                sink(df, tmp_path)
+            except pl.exceptions.InvalidOperationError:
+                # Not every operation of the plan is supported by the streaming sinks yet, e.g. the grouping of the
+                # barcodes of every order into a list or a joined text
+                write(df.collect(streaming=True), tmp_path)
+
+        if fsync:
+            _fsync(tmp_path)
+        os.replace(tmp_path, file_path)
+        # Directories can not be opened for a sync on windows
+        if fsync and os.name != "nt":
+            _fsync(file_path.parent)
+    except Exception as exc:
+        tmp_path.unlink(missing_ok=True)
+        raise AppWriterError(f"Unable to write file {file_path.name}: {exc!s}") from exc
+
+
+def start_write(writer: BaseWriter, df: pl.DataFrame | pl.LazyFrame, file_path: Path) -> Future:
+    """Starts a write on its own thread, returns the future completed once the file is written.
+
+    Unlike the reads, the thread is not a daemon, so the process does not exit before the file is renamed in place.
+    Frames are written from a shallow copy, so the caller can keep reading the frame while it is written, polars
+    writes borrow their frame mutably.
+    """
+    future: Future = Future()
+    if isinstance(df, pl.DataFrame):
+        df = df.clone()
+
+    def run() -> None:
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(writer.write(df, file_path))
+        except BaseException as exc:
+            future.set_exception(exc)
+
+    threading.Thread(target=run, name=f"write-{file_path.name}").start()
+    return future
+
+
+class CSVWriter:
+    supports_lists = False
+
+    def __init__(self, fsync: bool = False):
+        """Initializes a CSVWriter, flushing the written files to disk with fsync."""
+        self.fsync = fsync
+
+    def write(self, df: pl.DataFrame | pl.LazyFrame, file_path: Path) -> None:
+        """Writes the dataframe as a CSV file."""
+        _write(
+            df,
+            file_path,
+            sink=lambda lazy_df, path: lazy_df.sink_csv(path, separator=","),
+            write=lambda eager_df, path: eager_df.write_csv(path, separator=","),
+            fsync=self.fsync,
+        )
+
+
+class ParquetWriter:
+    supports_lists = True
+
+    def __init__(self, compression: str = "zstd", row_group_size: int | None = None, fsync: bool = False):
+        """Initializes a ParquetWriter with the compression codec and the number of rows per row group, flushing the
+        written files to disk with fsync."""
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.fsync = fsync
+
+    def write(self, df: pl.DataFrame | pl.LazyFrame, file_path: Path) -> None:
+        """Writes the dataframe as a Parquet file."""
+        options = {"compression": self.compression, "row_group_size": self.row_group_size, "statistics": True}
+        _write(
+            df,
+            file_path,
+            sink=lambda lazy_df, path: lazy_df.sink_parquet(path, **options),
+            write=lambda eager_df, path: eager_df.write_parquet(path, **options),
+            fsync=self.fsync,
+        )
+
+
+class IPCWriter:
+    supports_lists = True
+
+    def __init__(self, fsync: bool = False):
+        """Initializes an IPCWriter, flushing the written files to disk with fsync."""
+        self.fsync = fsync
+
+    def write(self, df: pl.DataFrame | pl.LazyFrame, file_path: Path) -> None:
+        """Writes the dataframe as an uncompressed Arrow IPC file, so it can be memory-mapped by the readers."""
+        _write(
+            df,
+            file_path,
+            sink=lambda lazy_df, path: lazy_df.sink_ipc(path, compression=None),
+            write=lambda eager_df, path: eager_df.write_ipc(path, compression="uncompressed"),
+            fsync=self.fsync,
+        )
+
+
+class NDJSONWriter:
+    supports_lists = True
+
+    def __init__(self, fsync: bool = False):
+        """Initializes an NDJSONWriter, flushing the written files to disk with fsync."""
+        self.fsync = fsync
+
+    def write(self, df: pl.DataFrame | pl.LazyFrame, file_path: Path) -> None:
+        """Writes the dataframe as newline delimited JSON."""
+        _write(
+            df,
+            file_path,
+            sink=lambda lazy_df, path: lazy_df.sink_ndjson(path),
+            write=lambda eager_df, path: eager_df.write_ndjson(path),
+            fsync=self.fsync,
+        )
@@ -0,0 +1,106 @@
+import polars as pl
+import pytest
+
+from src.barcode_index import BarcodeIndex, BarcodeLookup, write_barcode_index
+
+BARCODES = {"barcode": [30, 10, 20, 40, 50], "order_id": [2, 1, 1, None, 9]}
+ORDERS = {"order_id": [1, 2, 3], "customer_id": [100, None, 300]}
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    index_path = tmp_path / "index" / "barcodes.bidx"
+    write_barcode_index(
+        pl.DataFrame(BARCODES, schema={"barcode": pl.UInt64, "order_id": pl.UInt32}),
+        pl.DataFrame(ORDERS, schema={"order_id": pl.UInt32, "customer_id": pl.UInt32}).lazy(),
+        index_path,
+    )
+    return index_path
+
+
+@pytest.mark.parametrize(
+    "barcode, expected, test_id",
+    [
+        (10, BarcodeLookup(10, 1, 100), "happy_path_used_barcode"),
+        (30, BarcodeLookup(30, 2, None), "edge_case_order_without_customer"),
+        (40, BarcodeLookup(40, None, None), "edge_case_unused_barcode"),
+        (50, BarcodeLookup(50, 9, None), "edge_case_unknown_order"),
+        (25, None, "edge_case_unknown_barcode"),
+        (99, None, "edge_case_after_last_barcode"),
+    ],
+)
+def test_barcode_index_lookup(index_path, barcode, expected, test_id):
+    # Act
+    with BarcodeIndex(index_path) as index:
+        lookup = index.lookup(barcode)
+
+    # Assert
+    assert lookup == expected, f"Failed test ID: {test_id}"
+    assert lookup is None or lookup.used == (lookup.order_id is not None), f"Failed test ID: {test_id}"
+
+
+def test_barcode_index_lookup_many(index_path):
+    # Arrange
+    barcodes = [99, 20, 40, 5, 20, 30]
+
+    # Act
+    with BarcodeIndex(index_path) as index:
+        lookups = index.lookup_many(barcodes)
+        expected = [index.lookup(barcode) for barcode in barcodes]
+        indexed_count = len(index)
+
+    # Assert
+    assert lookups == expected
+    assert indexed_count == len(BARCODES["barcode"])
+    assert [lookup is not None for lookup in lookups] == [False, True, True, False, True, True]
+    assert not list(index_path.parent.glob("*.tmp"))
+
+
+@pytest.mark.parametrize(
+    "orders, expected_error, test_id",
+    [
+        (
+            pl.DataFrame(
+                {"order_id": [1, 2], "customer_id": ["100", "abc"]}, schema_overrides={"customer_id": pl.Categorical}
+            ),
+            "customer_id values must be integers from 0 to 4294967294, found 'abc'.",
+            "error_non_numeric_customer_id",
+        ),
+        (
+            pl.DataFrame({"order_id": [1, -2], "customer_id": [100, 200]}),
+            "order_id values must be integers from 0 to 4294967294, found -2.",
+            "error_negative_order_id",
+        ),
+    ],
+)
+def test_write_barcode_index_invalid_ids(tmp_path, orders, expected_error, test_id):
+    # Act & Assert
+    with pytest.raises(Exception) as excinfo:
+        write_barcode_index(pl.DataFrame({"barcode": [10], "order_id": [1]}), orders, tmp_path / "barcodes.bidx")
+    assert (
+        str(excinfo.value) == f"Unable to write barcode index barcodes.bidx: {expected_error}"
+    ), f"Failed test ID: {test_id}"
+
+
+def test_write_barcode_index_categorical_ids(tmp_path):
+    # Arrange
+    index_path = tmp_path / "barcodes.bidx"
+    orders = pl.DataFrame({"order_id": [1], "customer_id": ["100"]}, schema_overrides={"customer_id": pl.Categorical})
+
+    # Act
+    write_barcode_index(pl.DataFrame({"barcode": [10], "order_id": [1]}), orders, index_path)
+
+    # Assert
+    with BarcodeIndex(index_path) as index:
+        assert index.lookup(10) == BarcodeLookup(10, 1, 100)
+
+
+def test_barcode_index_invalid_file(tmp_path):
+    # Arrange
+    index_path = tmp_path / "barcodes.bidx"
+    index_path.write_bytes(b"barcode,order_id\n1,10\n" * 2)
+
+    # Act & Assert
+    with pytest.raises(Exception) as excinfo:
+        BarcodeIndex(index_path)
+    assert str(excinfo.value) == "Unable to read barcode index barcodes.bidx: Unsupported file format."
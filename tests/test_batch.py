@@ -0,0 +1,94 @@
+import json
+import logging
+
+import pytest
+
+from src.batch import format_summary, load_manifest, run_batch
+
+
+@pytest.fixture
+def manifest_path(tmp_path):
+    for name in ("a", "b"):
+        (tmp_path / f"barcodes_{name}.csv").write_text("barcode,order_id\n1,10\n2,10\n3,20\n4,\n")
+        (tmp_path / f"orders_{name}.csv").write_text("order_id,customer_id\n10,1\n20,2\n")
+    manifest = {
+        "defaults": {
+            "file_path": str(tmp_path),
+            "cache_folder_path": str(tmp_path / "cache"),
+            "output_folder_path": str(tmp_path / "out"),
+            "top_n": 2,
+        },
+        "pairs": [
+            {"name": "a", "barcodes_file": "barcodes_a.csv", "orders_file": "orders_a.csv", "top_n": 1},
+            {
+                "barcodes_file": "barcodes_b.csv",
+                "orders_file": "orders_b.csv",
+                "output_format": "parquet",
+                "output_folder_path": str(tmp_path / "out_b"),
+            },
+        ],
+    }
+    manifest_path = tmp_path / "manifest.json"
+    manifest_path.write_text(json.dumps(manifest))
+    return manifest_path
+
+
+def test_load_manifest(manifest_path):
+    # Act
+    pair_args = load_manifest(manifest_path)
+
+    # Assert
+    assert list(pair_args) == ["a", "pair_2"]
+    assert [args.top_n for args in pair_args.values()] == [1, 2]
+    assert pair_args["pair_2"].output_file_path.suffix == ".parquet"
+
+
+@pytest.mark.parametrize(
+    "pairs, expected_error, test_id",
+    [
+        (
+            [{"barcodes_file": "barcodes_a.csv", "orders_file": "orders_a.csv", "topn": 1}],
+            "Invalid arguments of manifest pair 'pair_1'",
+            "error_unknown_argument",
+        ),
+        (
+            [{"name": "a", "barcodes_file": "barcodes_a.csv", "orders_file": "orders_a.csv"}] * 2,
+            "Manifest pair name 'a' is used more than once.",
+            "error_duplicate_name",
+        ),
+        (
+            [{"barcodes_file": "barcodes_a.csv", "orders_file": "orders_a.csv"}] * 2,
+            "Manifest pairs 'pair_1' and 'pair_2' write the same output file",
+            "error_same_output_file",
+        ),
+    ],
+)
+def test_load_manifest_invalid_pairs(manifest_path, pairs, expected_error, test_id):
+    # Arrange
+    manifest = json.loads(manifest_path.read_text())
+    manifest["pairs"] = pairs
+    manifest_path.write_text(json.dumps(manifest))
+
+    # Act & Assert
+    with pytest.raises(Exception) as excinfo:
+        load_manifest(manifest_path)
+    assert str(excinfo.value).startswith(expected_error), f"Failed test ID: {test_id}"
+
+
+def test_run_batch(manifest_path):
+    # Arrange
+    pair_args = load_manifest(manifest_path)
+
+    # Act
+    summaries = run_batch(pair_args, logging.getLogger("test"), workers=1, polars_threads=1, is_debug=False)
+    summary = format_summary(summaries, 1.0)
+
+    # Assert
+    assert list(summaries) == ["a", "pair_2"]
+    assert all(summary["is_ok"] for summary in summaries.values())
+    assert summaries["a"]["top_customers"] == [(1, 2)]
+    assert summaries["pair_2"]["top_customers"] == [(1, 2), (2, 1)]
+    assert summaries["pair_2"]["unused_barcodes"] == 1
+    assert pair_args["pair_2"].output_file_path.exists()
+    assert summary.endswith("2 of 2 pairs processed in 1.00s (" + summary.rsplit("(", 1)[1])
+    assert "0 failed." in summary
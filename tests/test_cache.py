@@ -0,0 +1,157 @@
+import os
+
+import polars as pl
+import pytest
+
+from src.cache import ParsedInputCache
+from src.readers import CachedReader, CSVReader, LazyCSVReader
+
+
+@pytest.fixture()
+def tmp_csv(tmp_path):
+    def _tmp_csv(content: str, filename: str = "data"):
+        file_path = tmp_path / f"test_{filename}.csv"
+        file_path.write_text(content)
+        return file_path
+
+    return _tmp_csv
+
+
+class CountingReader:
+    """Counts the files parsed by the wrapped reader."""
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.reads = 0
+
+    def read(self, file_path, schema=None):
+        self.reads += 1
+        return self.reader.read(file_path, schema)
+
+
+def test_cache_get_put(tmp_path, tmp_csv):
+    # Arrange
+    cache = ParsedInputCache(tmp_path / "cache", 1024**2)
+    file_path = tmp_csv("col1,col2\n1,2\n3,4")
+    df = CSVReader.read(file_path)
+
+    # Act
+    miss = cache.get(file_path)
+    entry_path = cache.put(file_path, df)
+
+    # Assert
+    assert miss is None
+    assert cache.get(file_path) == entry_path
+    assert pl.read_ipc(entry_path).equals(df)
+
+
+def test_cache_modified_file(tmp_path, tmp_csv):
+    # Arrange
+    cache = ParsedInputCache(tmp_path / "cache", 1024**2)
+    file_path = tmp_csv("col1,col2\n1,2\n3,4")
+    entry_path = cache.put(file_path, CSVReader.read(file_path))
+
+    # Act
+    file_path.write_text("col1,col2\n1,2\n3,5")
+    miss = cache.get(file_path)
+    cache.put(file_path, CSVReader.read(file_path))
+
+    # Assert
+    assert miss is None
+    assert not entry_path.exists(), "Outdated entry of the same file must be removed"
+    assert len(list((tmp_path / "cache").glob("*.arrow"))) == 1
+
+
+# Test the entries of a file parsed with other options are kept when one of them is replaced
+def test_cache_variants(tmp_path, tmp_csv):
+    # Arrange
+    cache = ParsedInputCache(tmp_path / "cache", 1024**2)
+    file_path = tmp_csv("col1,col2\n1,2\n3,4")
+    typed_entry_path = cache.put(file_path, CSVReader.read(file_path), variant="typed")
+    lazy_entry_path = cache.put(file_path, CSVReader.read(file_path), variant="lazy")
+
+    # Act
+    file_path.write_text("col1,col2\n1,2\n3,5")
+    cache.put(file_path, CSVReader.read(file_path), variant="typed")
+
+    # Assert
+    assert not typed_entry_path.exists(), "Outdated entry of the same variant must be removed"
+    assert lazy_entry_path.exists(), "Entry of another variant must be kept"
+    assert cache.get(file_path, variant="typed") is not None
+    assert len(list((tmp_path / "cache").glob("*.arrow"))) == 2
+
+
+def test_cache_eviction(tmp_path, tmp_csv):
+    # Arrange
+    file_paths = [tmp_csv("col1,col2\n" + "1,2\n" * 100, f"file_{idx}") for idx in range(3)]
+    cache = ParsedInputCache(tmp_path / "cache", 1024**2)
+    entry_paths = [cache.put(file_path, CSVReader.read(file_path)) for file_path in file_paths]
+    for age, entry_path in enumerate(reversed(entry_paths)):
+        os.utime(entry_path, (age, age))
+
+    # Act
+    cache.max_size = sum(entry_path.stat().st_size for entry_path in entry_paths[1:])
+    cache.get(file_paths[0])
+    cache.put(file_paths[2], CSVReader.read(file_paths[2]))
+
+    # Assert
+    assert cache.get(file_paths[0]) is not None, "Recently used entry must be kept"
+    assert cache.get(file_paths[1]) is None, "Least recently used entry must be evicted"
+    assert cache.get(file_paths[2]) is not None
+
+
+def test_cache_oversized_frame(tmp_path, tmp_csv):
+    # Arrange
+    cache = ParsedInputCache(tmp_path / "cache", 1)
+    file_path = tmp_csv("col1,col2\n1,2\n3,4")
+
+    # Act
+    entry_path = cache.put(file_path, CSVReader.read(file_path))
+
+    # Assert
+    assert entry_path is None
+    assert not any((tmp_path / "cache").iterdir())
+
+
+@pytest.mark.parametrize("reader, is_lazy", [(CSVReader(), False), (LazyCSVReader(), True)])
+def test_cached_reader(tmp_path, tmp_csv, reader, is_lazy):
+    # Arrange
+    counting_reader = CountingReader(reader)
+    cached_reader = CachedReader(counting_reader, ParsedInputCache(tmp_path / "cache", 1024**2), is_lazy)
+    file_paths = [tmp_csv("col1,col2\n1,2\n3,4", "shard_0"), tmp_csv("col1,col2\n5,6", "shard_1")]
+
+    # Act
+    first_df = cached_reader.read(file_paths)
+    second_df = cached_reader.read(file_paths)
+
+    # Assert
+    assert isinstance(second_df, pl.LazyFrame if is_lazy else pl.DataFrame)
+    assert counting_reader.reads == 2, "Cached files must not be parsed again"
+    assert first_df.lazy().collect().equals(second_df.lazy().collect())
+    assert second_df.lazy().collect()["col1"].to_list() == [1, 3, 5]
+
+
+def test_cached_reader_error_cases(tmp_path, tmp_csv):
+    # Arrange
+    cached_reader = CachedReader(CSVReader(), ParsedInputCache(tmp_path / "cache", 1024**2))
+
+    # Act & Assert
+    with pytest.raises(Exception) as excinfo:
+        _ = cached_reader.read(tmp_path / "nonexistent.csv")
+    assert str(excinfo.value).startswith("Unable to read file")
+
+
+# Test the entries of the shards of a lazy read stay readable when the later shards evict them
+def test_cached_reader_lazy_eviction(tmp_path, tmp_csv):
+    # Arrange
+    file_paths = [tmp_csv("col1,col2\n" + f"{idx},{idx}\n" * 100, f"shard_{idx}") for idx in range(3)]
+    cache = ParsedInputCache(tmp_path / "cache", 1024**2)
+    cache.max_size = cache.put(file_paths[0], CSVReader.read(file_paths[0])).stat().st_size
+    cached_reader = CachedReader(LazyCSVReader(), cache, lazy=True)
+
+    # Act
+    lazy_df = cached_reader.read(file_paths)
+
+    # Assert
+    assert len(list((tmp_path / "cache").glob("*.arrow"))) == 1, "Entries of earlier shards must be evicted"
+    assert lazy_df.collect()["col1"].to_list() == [0] * 100 + [1] * 100 + [2] * 100
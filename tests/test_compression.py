@@ -0,0 +1,76 @@
+import bz2
+import gzip
+
+import pytest
+
+from src.compression import detect_compression, iter_decompressed_blocks, read_header
+
+CSV_CONTENT = b"barcode,order_id\n" + b"".join(f"{barcode},{barcode % 7}\n".encode() for barcode in range(1000))
+
+
+@pytest.fixture()
+def compressed_csv(tmp_path):
+    def _compressed_csv(codec: str | None, content: bytes = CSV_CONTENT):
+        compress = {"gzip": gzip.compress, "bz2": bz2.compress, None: lambda data: data}[codec]
+        file_path = tmp_path / f"barcodes_{codec}.csv"
+        file_path.write_bytes(compress(content))
+        return file_path
+
+    return _compressed_csv
+
+
+@pytest.mark.parametrize("codec", ["gzip", "bz2", None])
+def test_detect_compression(compressed_csv, codec):
+    # Arrange
+    file_path = compressed_csv(codec)
+
+    # Act & Assert
+    assert detect_compression(file_path) == codec
+    assert read_header(file_path) == b"barcode,order_id\n"
+
+
+@pytest.mark.parametrize("codec", ["gzip", "bz2"])
+@pytest.mark.parametrize("block_size", [10, 1000, 10**6])
+def test_iter_decompressed_blocks(compressed_csv, codec, block_size):
+    # Arrange
+    file_path = compressed_csv(codec)
+
+    # Act
+    blocks = list(iter_decompressed_blocks(file_path, block_size))
+
+    # Assert
+    # Every block is a csv of whole lines on its own
+    assert all(block.startswith(b"barcode,order_id\n") and block.endswith(b"\n") for block in blocks)
+    assert b"barcode,order_id\n" + b"".join(block[len(b"barcode,order_id\n") :] for block in blocks) == CSV_CONTENT
+
+
+@pytest.mark.parametrize(
+    "content, expected_blocks, test_id",
+    [
+        (b"barcode,order_id\n", [b"barcode,order_id\n"], "edge_case_no_rows"),
+        (b"barcode,order_id\n1,2", [b"barcode,order_id\n1,2"], "edge_case_no_trailing_line_break"),
+    ],
+)
+def test_iter_decompressed_blocks_edge_cases(compressed_csv, content, expected_blocks, test_id):
+    # Arrange
+    file_path = compressed_csv("gzip", content)
+
+    # Act & Assert
+    assert list(iter_decompressed_blocks(file_path)) == expected_blocks, f"Failed test ID: {test_id}"
+
+
+@pytest.mark.parametrize(
+    "content, test_id",
+    [
+        (gzip.compress(CSV_CONTENT)[:-100], "error_case_truncated_file"),
+        (b"barcode,order_id\n1,2\n", "error_case_plain_file"),
+    ],
+)
+def test_iter_decompressed_blocks_error_cases(tmp_path, content, test_id):
+    # Arrange
+    file_path = tmp_path / "barcodes.csv.gz"
+    file_path.write_bytes(content)
+
+    # Act & Assert
+    with pytest.raises(Exception):
+        list(iter_decompressed_blocks(file_path, 100))
@@ -0,0 +1,107 @@
+import logging
+
+import polars as pl
+import pytest
+
+from src.app_arguments import AppArguments
+from src.database import SQLiteProcessor, SQLiteStore, get_sources_key
+from src.main import create_app, run_app
+from src.processors import DataProcessor
+
+BARCODES = {"barcode": [1, 2, 3, 4, 5, 6], "order_id": [10, 10, 20, 30, None, 99]}
+ORDERS = {"order_id": [10, 20, 30, 40, 50], "customer_id": [1, 2, 1, 3, None]}
+
+
+# Test the results read in several batches of rows match the polars processing
+@pytest.mark.parametrize("as_list", [False, True])
+def test_sqlite_results_match_polars_processing(tmp_path, monkeypatch, as_list):
+    # Arrange
+    monkeypatch.setattr("src.database.FETCH_BATCH_ROWS", 2)
+    processor = SQLiteProcessor(SQLiteStore(tmp_path / "db" / "data.sqlite"))
+    processor.set_dataframes(
+        pl.DataFrame(BARCODES, schema={"barcode": pl.UInt64, "order_id": pl.UInt32}),
+        pl.DataFrame(ORDERS, schema={"order_id": pl.UInt32, "customer_id": pl.UInt32}),
+    )
+    expected_processor = DataProcessor()
+    expected_processor.set_dataframes(processor.barcodes_df, processor.orders_df)
+    expected_processor.merged_df = expected_processor.merged_df.drop_nulls()
+
+    # Act
+    load_proc = processor.load("key")
+    results = processor.get_results(2, as_list=as_list)["data"]
+
+    # Assert
+    expected = expected_processor.get_results(2, as_list=as_list)["data"]
+    assert load_proc["is_ok"]
+    assert results["aggregated"].sort("order_id").rows() == expected["aggregated"].sort("order_id").rows()
+    assert results["top_customers"].rows() == expected["top_customers"].rows()
+    assert results["unused_barcodes"] == expected["unused_barcodes"] == 1
+    assert processor.get_unused_barcodes_count()["data"] == 1
+    assert processor.get_customer_totals()["data"].sort("customer_id").rows() == [(1, 3), (2, 1)]
+
+
+def test_sqlite_store_is_current(tmp_path):
+    # Arrange
+    file_path = tmp_path / "barcodes.csv"
+    file_path.write_text("barcode,order_id\n1,10\n")
+    store = SQLiteStore(tmp_path / "db" / "data.sqlite")
+    sources_key = get_sources_key([file_path])
+
+    # Act
+    is_current_before_load = store.is_current(sources_key)
+    store.load(pl.DataFrame(BARCODES), pl.DataFrame(ORDERS), sources_key)
+    file_path.write_text("barcode,order_id\n1,10\n2,10\n")
+
+    # Assert
+    assert not is_current_before_load
+    assert store.is_current(sources_key)
+    assert not store.is_current(get_sources_key([file_path]))
+    assert not list((tmp_path / "db").glob("*.tmp"))
+    assert store.query("SELECT COUNT(*) AS barcodes FROM Barcodes").item() == len(BARCODES["barcode"])
+
+
+def _run_app(tmp_path, **options) -> tuple[pl.DataFrame, pl.DataFrame, int]:
+    """Runs the application, returns the output file, the top customers and the unused barcodes."""
+    args = AppArguments(
+        "barcodes.csv",
+        "orders.csv",
+        file_path=str(tmp_path),
+        output_folder_path=str(tmp_path),
+        database_folder_path=str(tmp_path / "db"),
+        no_cache=True,
+        quarantine_format="none",
+        top_n=2,
+        **options,
+    )
+    app = create_app(args, logging.getLogger("test"))
+    results = {}
+    app._log_results = lambda top_customers_df, unused_barcodes: results.update(
+        top_customers=top_customers_df, unused_barcodes=unused_barcodes
+    )
+
+    assert run_app(app, logging.getLogger("test"))
+    return pl.read_csv(args.output_file_path), results["top_customers"], results["unused_barcodes"]
+
+
+# Test the first run loads the database and a run on unchanged files only queries it, both with the polars results
+def test_sqlite_app_reuses_database(tmp_path, caplog):
+    # Arrange
+    pl.DataFrame(BARCODES).write_csv(tmp_path / "barcodes.csv")
+    pl.DataFrame(ORDERS).write_csv(tmp_path / "orders.csv")
+    expected_df, expected_top_df, expected_unused = _run_app(tmp_path)
+
+    # Act
+    with caplog.at_level(logging.DEBUG):
+        loaded_results = _run_app(tmp_path, backend="sqlite")
+        loaded_log = caplog.text
+        caplog.clear()
+        reused_results = _run_app(tmp_path, backend="sqlite")
+
+    # Assert
+    assert "Database orders_barcodes.sqlite loaded." in loaded_log
+    assert "Database orders_barcodes.sqlite is up to date, input files are not read." in caplog.text
+    assert "Database orders_barcodes.sqlite loaded." not in caplog.text
+    for output_df, top_customers_df, unused_barcodes in [loaded_results, reused_results]:
+        assert output_df.sort("order_id").equals(expected_df.sort("order_id"))
+        assert top_customers_df.rows() == expected_top_df.rows()
+        assert unused_barcodes == expected_unused == 1
@@ -0,0 +1,69 @@
+import polars as pl
+import pytest
+
+from benchmarks.generate_data import DataProfile, generate
+
+# Several chunks, with every kind of invalid rows
+PROFILE = DataProfile(
+    rows=50_000,
+    customers=1_000,
+    duplicate_rate=0.02,
+    orphan_rate=0.05,
+    unused_ratio=0.1,
+    zipf_exponent=1.2,
+    chunk_rows=20_000,
+)
+
+
+@pytest.fixture
+def generated(tmp_path):
+    barcode_rows, order_rows = generate(PROFILE, tmp_path / "barcodes.csv", tmp_path / "orders.csv")
+    return (
+        barcode_rows,
+        order_rows,
+        pl.read_csv(tmp_path / "barcodes.csv"),
+        pl.read_csv(tmp_path / "orders.csv"),
+    )
+
+
+def test_generate_shapes(generated):
+    # Arrange
+    barcode_rows, order_rows, barcodes_df, orders_df = generated
+
+    # Assert
+    assert barcodes_df.columns == ["barcode", "order_id"]
+    assert orders_df.columns == ["order_id", "customer_id"]
+    assert barcodes_df.height == barcode_rows == 50_000
+    assert orders_df.height == order_rows
+    assert orders_df["order_id"].is_unique().all()
+    assert orders_df["customer_id"].is_between(1, 1_000).all()
+
+
+def test_generate_rates(generated):
+    # Arrange
+    _, _, barcodes_df, orders_df = generated
+
+    # Act
+    duplicate_rate = barcodes_df["barcode"].is_duplicated().sum() / barcodes_df.height
+    unused_ratio = barcodes_df["order_id"].null_count() / barcodes_df.height
+    orphan_rate = 1 - orders_df["order_id"].is_in(barcodes_df["order_id"].drop_nulls()).mean()
+    top_customer_orders = orders_df["customer_id"].value_counts(sort=True)["count"][0]
+
+    # Assert
+    # Every duplicate row repeats the barcode of another row, so twice as many rows have a duplicated barcode
+    assert duplicate_rate == pytest.approx(0.04, abs=0.01)
+    assert unused_ratio == pytest.approx(0.1, abs=0.01)
+    assert orphan_rate == pytest.approx(0.05, abs=0.01)
+    # The most frequent customer has far more than the uniform share of the orders
+    assert top_customer_orders > 20 * orders_df.height / 1_000
+
+
+def test_generate_is_deterministic(tmp_path, generated):
+    # Arrange
+    _, _, barcodes_df, _ = generated
+
+    # Act
+    generate(PROFILE, tmp_path / "again" / "barcodes.csv", tmp_path / "again" / "orders.csv")
+
+    # Assert
+    assert pl.read_csv(tmp_path / "again" / "barcodes.csv").equals(barcodes_df)
@@ -0,0 +1,221 @@
+import gzip
+import logging
+
+import polars as pl
+import pytest
+
+from src.app_arguments import AppArguments
+from src.incremental import IncrementalProcessor, IncrementalState, read_delta
+from src.main import create_app, run_app
+from src.processors import DataProcessor
+
+# Rows appended in two runs: orders without barcodes, barcodes arriving before their order, unused barcodes
+RUNS = [
+    (
+        {"barcode": [1, 2, 3, 4, 5], "order_id": [10, 10, 20, 40, None]},
+        {"order_id": [10, 20, 30], "customer_id": [1, 2, 3]},
+    ),
+    (
+        {"barcode": [6, 7, 8, 9], "order_id": [30, 20, None, 50]},
+        {"order_id": [40, 50], "customer_id": [3, 1]},
+    ),
+]
+
+
+def _full_results(barcodes: dict, orders: dict, top_n: int) -> dict:
+    processor = DataProcessor()
+    processor.set_dataframes(pl.DataFrame(barcodes), pl.DataFrame(orders))
+    processor.merged_df = processor.merged_df.drop_nulls(subset="barcode")
+    return processor.get_results(top_n)["data"]
+
+
+@pytest.mark.parametrize(
+    "content, offset, expected_rows, test_id",
+    [
+        ("col1,col2\n1,2\n3,4\n", 0, [1, 3], "happy_path_first_read"),
+        ("col1,col2\n1,2\n3,4\n", len("col1,col2\n1,2\n"), [3], "happy_path_delta"),
+        ("col1,col2\n1,2\n3,4\n", len("col1,col2\n1,2\n3,4\n"), [], "edge_case_no_new_rows"),
+    ],
+)
+def test_read_delta(tmp_path, content, offset, expected_rows, test_id):
+    # Arrange
+    file_path = tmp_path / "data.csv"
+    file_path.write_text(content)
+
+    # Act
+    delta_df, new_offset = read_delta(file_path, offset, {"col1": pl.Int64, "col2": pl.Int64})
+
+    # Assert
+    assert delta_df["col1"].to_list() == expected_rows, f"Failed test ID: {test_id}"
+    assert new_offset == len(content), f"Failed test ID: {test_id}"
+
+
+# Test a trailing line still being written is left to the next read
+def test_read_delta_partial_last_line(tmp_path):
+    # Arrange
+    file_path = tmp_path / "data.csv"
+    file_path.write_text("col1,col2\n1,2\n3,")
+    schema = {"col1": pl.Int64, "col2": pl.Int64}
+
+    # Act
+    first_df, first_offset = read_delta(file_path, 0, schema)
+    with open(file_path, "a") as file:
+        file.write("4\n5,6\n")
+    second_df, second_offset = read_delta(file_path, first_offset, schema)
+
+    # Assert
+    assert first_df.rows() == [(1, 2)]
+    assert first_offset == len("col1,col2\n1,2\n")
+    assert second_df.rows() == [(3, 4), (5, 6)]
+    assert second_offset == len("col1,col2\n1,2\n3,4\n5,6\n")
+
+
+def test_read_delta_truncated_file(tmp_path):
+    # Arrange
+    file_path = tmp_path / "data.csv"
+    file_path.write_text("col1,col2\n1,2\n")
+
+    # Act & Assert
+    with pytest.raises(Exception) as excinfo:
+        _ = read_delta(file_path, 100)
+    assert str(excinfo.value).startswith("Unable to read file")
+
+
+def test_read_delta_compressed_file(tmp_path):
+    # Arrange
+    file_path = tmp_path / "data.csv.gz"
+    file_path.write_bytes(gzip.compress(b"col1,col2\n1,2\n"))
+
+    # Act & Assert
+    with pytest.raises(Exception) as excinfo:
+        _ = read_delta(file_path, 0)
+    assert str(excinfo.value) == "Unable to read file data.csv.gz: compressed files can not be read incrementally"
+
+
+@pytest.mark.parametrize("top_n", [1, 3])
+def test_incremental_results_match_full_processing(tmp_path, top_n):
+    # Arrange
+    all_barcodes: dict[str, list] = {"barcode": [], "order_id": []}
+    all_orders: dict[str, list] = {"order_id": [], "customer_id": []}
+
+    for barcodes, orders in RUNS:
+        for column, values in barcodes.items():
+            all_barcodes[column] += values
+        for column, values in orders.items():
+            all_orders[column] += values
+
+        # Act
+        state = IncrementalState(tmp_path / "state")
+        state.load()
+        state.schemas = {"barcodes": {"barcode": pl.Int64, "order_id": pl.Int64}}
+        processor = IncrementalProcessor(state)
+        assert processor.set_dataframes(
+            pl.DataFrame(barcodes, schema={"barcode": pl.Int64, "order_id": pl.Int64}), pl.DataFrame(orders)
+        )["is_ok"]
+        results = processor.get_results(top_n)["data"]
+        processor.save_state({})
+
+        # Assert
+        expected = _full_results(all_barcodes, all_orders, top_n)
+        assert results["aggregated"].sort("order_id").equals(expected["aggregated"].sort("order_id"))
+        assert (
+            results["top_customers"]["total_barcodes"].to_list()
+            == expected["top_customers"]["total_barcodes"].to_list()
+        )
+        assert results["unused_barcodes"] == expected["unused_barcodes"]
+
+
+def test_incremental_state_reload(tmp_path):
+    # Arrange
+    barcodes, orders = RUNS[0]
+    state = IncrementalState(tmp_path / "state")
+    state.schemas = {"barcodes": {"barcode": pl.Int64, "order_id": pl.Int64}}
+    processor = IncrementalProcessor(state)
+    processor.set_dataframes(pl.DataFrame(barcodes), pl.DataFrame(orders))
+    processor.get_results(as_list=True)
+
+    # Act
+    processor.save_state({"data.csv": 42})
+    reloaded_state = IncrementalState(tmp_path / "state")
+    reloaded_state.load()
+
+    # Assert
+    assert reloaded_state.generation == 1
+    assert reloaded_state.offsets == {"data.csv": 42}
+    assert reloaded_state.schemas == state.schemas
+    assert reloaded_state.unused_barcodes == 1
+    assert reloaded_state.orders_df.equals(state.orders_df)
+    assert reloaded_state.scan_barcodes().collect().equals(pl.DataFrame(barcodes))
+
+
+# Test the changes saved on top of a snapshot load into the same frames, and are compacted into a new snapshot
+def test_incremental_state_compaction(tmp_path, monkeypatch):
+    # Arrange
+    monkeypatch.setattr("src.incremental.COMPACTION_GENERATIONS", 2)
+    schema = {"barcode": pl.Int64, "order_id": pl.Int64}
+    runs = RUNS + [({"barcode": [10], "order_id": [10]}, {"order_id": [60], "customer_id": [4]})]
+    saved_files, saved_rows = [], []
+
+    # Act
+    for barcodes, orders in runs:
+        state = IncrementalState(tmp_path / "state")
+        state.load()
+        state.schemas = {"barcodes": schema}
+        processor = IncrementalProcessor(state)
+        processor.set_dataframes(pl.DataFrame(barcodes, schema=schema), pl.DataFrame(orders))
+        processor.get_results(as_list=True)
+        processor.save_state({})
+        saved_files.append(sorted(path.name for path in (tmp_path / "state").glob("orders_*.arrow")))
+        saved_rows.append((pl.read_ipc(tmp_path / "state" / saved_files[-1][-1]).height, state.orders_df.height))
+    reloaded_state = IncrementalState(tmp_path / "state")
+    reloaded_state.load()
+
+    # Assert
+    assert saved_files == [
+        ["orders_000001.arrow"],
+        ["orders_000001.arrow", "orders_000002.arrow"],
+        ["orders_000003.arrow"],
+    ]
+    assert reloaded_state.orders_df.equals(state.orders_df)
+    assert reloaded_state.customers_df.sort("customer_id").equals(state.customers_df.sort("customer_id"))
+    # Only the orders touched by the second run are saved on top of the first snapshot
+    assert saved_rows == [(4, 4), (4, 5), (6, 6)]
+
+
+def _run_app(tmp_path, **options) -> pl.DataFrame:
+    args = AppArguments(
+        "barcodes.csv",
+        "orders.csv",
+        file_path=str(tmp_path),
+        output_folder_path=str(tmp_path),
+        state_folder_path=str(tmp_path / "state"),
+        no_cache=True,
+        quarantine_format="none",
+        **options,
+    )
+    assert run_app(create_app(args, logging.getLogger("test")), logging.getLogger("test"))
+    return pl.read_csv(args.output_file_path)
+
+
+def _append_rows(tmp_path, barcodes: dict, orders: dict) -> None:
+    for file_name, data in [("barcodes.csv", barcodes), ("orders.csv", orders)]:
+        file_path = tmp_path / file_name
+        with open(file_path, "a") as file:
+            file.write(pl.DataFrame(data).write_csv(include_header=not file_path.stat().st_size))
+
+
+# Test a second incremental run only reads the appended rows, and writes the output of a full run of the files
+def test_incremental_app_appended_rows(tmp_path, caplog):
+    # Arrange
+    _append_rows(tmp_path, *RUNS[0])
+
+    # Act
+    _run_app(tmp_path, incremental=True)
+    _append_rows(tmp_path, *RUNS[1])
+    with caplog.at_level(logging.DEBUG):
+        output_df = _run_app(tmp_path, incremental=True)
+    expected_df = _run_app(tmp_path)
+
+    # Assert
+    assert "Incremental state generation 1 loaded. New rows: 4 barcodes, 2 orders." in caplog.text
+    assert output_df.sort("order_id").equals(expected_df.sort("order_id"))
@@ -0,0 +1,132 @@
+import gzip
+import logging
+
+import pytest
+
+from src.app_arguments import AppArguments
+from src.main import select_execution_mode
+from src.memory_planning import (
+    MemoryEstimate,
+    estimate_memory,
+    memory_limit,
+    sample_csv,
+)
+from src.memory_planning import select_execution_mode as select_mode
+
+# Rows getting longer along the file, like increasing ids
+BARCODES_CSV = "barcode,order_id\n" + "".join(f"{barcode},{barcode // 3}\n" for barcode in range(100_000))
+ORDERS_CSV = "order_id,customer_id\n" + "".join(f"{order_id},{order_id % 97}\n" for order_id in range(33_334))
+
+
+@pytest.fixture()
+def inputs(tmp_path):
+    (tmp_path / "barcodes.csv").write_text(BARCODES_CSV)
+    (tmp_path / "orders.csv").write_text(ORDERS_CSV)
+    (tmp_path / "barcodes.csv.gz").write_bytes(gzip.compress(BARCODES_CSV.encode()))
+    return tmp_path
+
+
+@pytest.mark.parametrize(
+    "limits, expected_limit, test_id",
+    [
+        ({"memory.max": "1073741824\n"}, 1024**3, "happy_path_cgroup_v2"),
+        ({"memory/memory.limit_in_bytes": "536870912\n"}, 512 * 1024**2, "happy_path_cgroup_v1"),
+        ({"memory.max": "max\n"}, None, "edge_case_cgroup_v2_unlimited"),
+        ({"memory/memory.limit_in_bytes": "9223372036854771712\n"}, None, "edge_case_cgroup_v1_unlimited"),
+        ({}, None, "edge_case_no_cgroup"),
+    ],
+)
+def test_memory_limit(tmp_path, limits, expected_limit, test_id):
+    # Arrange
+    for file_name, value in limits.items():
+        (tmp_path / file_name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / file_name).write_text(value)
+
+    # Act
+    limit = memory_limit(tmp_path)
+
+    # Assert
+    if expected_limit is None:
+        # Only bounded by the physical memory
+        assert limit is None or limit > 1024**3, f"Failed test ID: {test_id}"
+    else:
+        assert limit == expected_limit, f"Failed test ID: {test_id}"
+
+
+@pytest.mark.parametrize("file_name", ["barcodes.csv", "barcodes.csv.gz"])
+def test_sample_csv(inputs, file_name):
+    # Act
+    rows, columns, row_bytes = sample_csv(inputs / file_name)
+
+    # Assert
+    assert columns == 2
+    assert 5 <= row_bytes <= 13
+    if file_name == "barcodes.csv":
+        assert rows == pytest.approx(100_000, rel=0.1)
+
+
+def test_sample_csv_without_rows(tmp_path):
+    # Arrange
+    (tmp_path / "barcodes.csv").write_text("barcode,order_id\n")
+
+    # Act & Assert
+    assert sample_csv(tmp_path / "barcodes.csv") == (0, 2, 1.0)
+
+
+def test_estimate_memory(inputs):
+    # Act
+    estimate = estimate_memory([inputs / "barcodes.csv"], [inputs / "orders.csv"])
+
+    # Assert
+    assert estimate.barcodes_rows == pytest.approx(100_000, rel=0.1)
+    assert estimate.orders_rows == pytest.approx(33_334, rel=0.1)
+    assert estimate.peak_bytes == estimate.read_bytes + estimate.join_bytes + estimate.aggregation_bytes
+    assert estimate.join_bytes == 24 * estimate.barcodes_rows
+
+
+@pytest.mark.parametrize(
+    "max_memory, expected_mode, expected_budget, test_id",
+    [(1000, "eager", None, "happy_path_fits"), (500, "chunked", 175, "happy_path_exceeds")],
+)
+def test_select_execution_mode(max_memory, expected_mode, expected_budget, test_id):
+    # Arrange
+    estimate = MemoryEstimate(barcodes_rows=10, orders_rows=5, read_bytes=300, join_bytes=200, aggregation_bytes=200)
+
+    # Act & Assert
+    assert select_mode(estimate, max_memory) == (expected_mode, expected_budget), f"Failed test ID: {test_id}"
+
+
+@pytest.mark.parametrize(
+    "options, expected_out_of_core, expected_budget, test_id",
+    [
+        ({"max_memory": 1024}, False, None, "happy_path_in_memory"),
+        ({"max_memory": 8}, True, 2, "happy_path_out_of_core"),
+        ({"max_memory": 8, "memory_budget": 6}, True, 6, "happy_path_given_budget"),
+        ({"max_memory": 100, "out_of_core": True}, True, 35, "happy_path_given_mode_derived_budget"),
+        ({"out_of_core": True}, True, 1024, "edge_case_given_mode_default_budget"),
+        ({"max_memory": 1, "lazy": True}, False, None, "edge_case_given_mode"),
+        ({"max_memory": 1, "barcode_index": True}, False, None, "edge_case_barcode_index"),
+    ],
+)
+def test_main_select_execution_mode(inputs, caplog, options, expected_out_of_core, expected_budget, test_id):
+    # Arrange
+    args = AppArguments("barcodes.csv", "orders.csv", file_path=str(inputs), output_folder_path=str(inputs), **options)
+
+    # Act
+    with caplog.at_level(logging.INFO):
+        select_execution_mode(args, logging.getLogger("test"))
+
+    # Assert
+    assert args.out_of_core == expected_out_of_core, f"Failed test ID: {test_id}"
+    assert args.memory_budget == expected_budget, f"Failed test ID: {test_id}"
+    if not options.get("lazy") and not options.get("out_of_core"):
+        assert "estimated to peak at" in caplog.text, f"Failed test ID: {test_id}"
+
+
+def test_memory_budget_exceeding_max_memory(inputs):
+    # Act & Assert
+    with pytest.raises(Exception) as excinfo:
+        AppArguments(
+            "barcodes.csv", "orders.csv", file_path=str(inputs), out_of_core=True, memory_budget=512, max_memory=256
+        )
+    assert str(excinfo.value) == "The memory budget of 512 MB can not exceed the memory of the run of 256 MB."
@@ -0,0 +1,97 @@
+import json
+import logging
+
+import polars as pl
+import pytest
+
+from src.app_arguments import AppArguments
+from src.main import create_app, run_app
+from src.metrics import MetricsRecorder
+
+
+def test_metrics_recorder_stages():
+    # Arrange
+    metrics = MetricsRecorder()
+    df = pl.DataFrame({"barcode": [1, 2, 3]})
+
+    # Act
+    with metrics.stage("read_data"):
+        with metrics.stage("barcodes") as stage:
+            stage.set_input(df, df)
+            stage.set_output(df.head(2))
+        with metrics.stage("orders") as stage:
+            stage.set_output(df.lazy())
+
+    # Assert
+    assert [stage.name for stage in metrics.stages] == ["read_data", "read_data.barcodes", "read_data.orders"]
+    read_stage, barcodes_stage, orders_stage = metrics.stages
+    assert read_stage.wall_seconds >= barcodes_stage.wall_seconds + orders_stage.wall_seconds
+    assert (barcodes_stage.rows_in, barcodes_stage.rows_out) == (6, 2)
+    assert barcodes_stage.estimated_bytes == df.head(2).estimated_size()
+    assert (orders_stage.rows_out, orders_stage.estimated_bytes) == (None, None)
+    assert all(stage.is_ok and stage.peak_rss_delta_bytes >= 0 for stage in metrics.stages)
+
+
+def test_metrics_recorder_failed_stage():
+    # Arrange
+    metrics = MetricsRecorder()
+
+    # Act
+    with pytest.raises(ValueError):
+        with metrics.stage("process_data"):
+            raise ValueError("failed")
+    with metrics.stage("write_data"):
+        pass
+
+    # Assert
+    assert [(stage.name, stage.is_ok) for stage in metrics.stages] == [("process_data", False), ("write_data", True)]
+
+
+def test_metrics_recorder_write_prometheus(tmp_path):
+    # Arrange
+    metrics = MetricsRecorder()
+    with metrics.stage("read_data") as stage:
+        stage.set_output(pl.DataFrame({"barcode": [1, 2]}))
+    prometheus_path = tmp_path / "textfile" / "tiqets.prom"
+
+    # Act
+    metrics.write_prometheus(prometheus_path, {"dataset": 'orders_"a"'}, is_ok=True)
+    lines = prometheus_path.read_text().splitlines()
+
+    # Assert
+    assert 'tiqets_stage_rows_out{dataset="orders_\\"a\\"",stage="read_data"} 2.0' in lines
+    assert not any(line.startswith("tiqets_stage_rows_in{") for line in lines)
+    assert 'tiqets_run_success{dataset="orders_\\"a\\""} 1.0' in lines
+    assert "# TYPE tiqets_stage_wall_seconds gauge" in lines
+    assert list(prometheus_path.parent.iterdir()) == [prometheus_path]
+
+
+def test_run_app_metrics(tmp_path):
+    # Arrange
+    (tmp_path / "barcodes.csv").write_text("barcode,order_id\n1,10\n2,10\n2,20\n3,\n")
+    (tmp_path / "orders.csv").write_text("order_id,customer_id\n10,1\n20,2\n")
+    args = AppArguments(
+        "barcodes.csv",
+        "orders.csv",
+        file_path=str(tmp_path),
+        output_folder_path=str(tmp_path),
+        no_cache=True,
+        quarantine_format="none",
+        metrics=True,
+        prometheus_file=str(tmp_path / "textfile" / "tiqets.prom"),
+    )
+
+    # Act
+    is_ok = run_app(create_app(args, logging.getLogger("test")), logging.getLogger("test"))
+    metrics = json.loads(args.metrics_file_path.read_text())
+
+    # Assert
+    assert is_ok
+    assert metrics["is_ok"] and metrics["dataset"] == "orders_barcodes"
+    assert metrics["output_file"] == args.output_file_path.name
+    stages = {stage["name"]: stage for stage in metrics["stages"]}
+    assert list(stages)[:3] == ["read_data", "read_data.barcodes", "read_data.orders"]
+    assert {"validate_data.barcodes", "validate_data.set_dataframes", "process_data.results"} <= stages.keys()
+    assert (stages["validate_data.barcodes"]["rows_in"], stages["validate_data.barcodes"]["rows_out"]) == (4, 2)
+    assert stages["process_data.results"]["rows_out"] == 2
+    assert args.prometheus_file_path.exists()
@@ -0,0 +1,149 @@
+import logging
+
+import polars as pl
+import pytest
+
+from src.app_arguments import AppArguments
+from src.main import create_app, run_app
+from src.sketches import TopKSketch
+
+# Orders of the first customers get most barcodes, every other customer only a few
+CUSTOMERS = 500
+HEAVY_CUSTOMERS = 5
+ORDERS = 3000
+BARCODES = 20000
+DUPLICATES = 20
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    order_ids = list(range(ORDERS))
+    customer_ids = [
+        order_id % HEAVY_CUSTOMERS if order_id < 1000 else HEAVY_CUSTOMERS + order_id % (CUSTOMERS - HEAVY_CUSTOMERS)
+        for order_id in order_ids
+    ]
+    pl.DataFrame({"order_id": order_ids, "customer_id": customer_ids}).write_csv(tmp_path / "orders.csv")
+    pl.DataFrame(
+        {
+            # Barcodes duplicated in other orders, which are mostly spilled into other partitions
+            "barcode": [10**10 + idx for idx in range(BARCODES)] + [10**10 + idx for idx in range(DUPLICATES)],
+            "order_id": [idx % 1000 if idx % 2 else idx % ORDERS for idx in range(BARCODES - 10)]
+            + [None] * 10
+            + [(idx * 7 + 1) % ORDERS for idx in range(DUPLICATES)],
+        }
+    ).write_csv(tmp_path / "barcodes.csv")
+    return tmp_path
+
+
+def _run(inputs, **options) -> tuple[pl.DataFrame, pl.DataFrame, int]:
+    """Runs the application on the inputs, returns the output file, the top customers and the unused barcodes."""
+    args = AppArguments(
+        "barcodes.csv",
+        "orders.csv",
+        file_path=str(inputs),
+        output_folder_path=str(inputs / "out"),
+        no_cache=True,
+        quarantine_format="none",
+        **options,
+    )
+    (inputs / "out").mkdir(exist_ok=True)
+    app = create_app(args, logging.getLogger("test"))
+    results = {}
+    app._log_results = lambda top_customers_df, unused_barcodes: results.update(
+        top_customers=top_customers_df, unused_barcodes=unused_barcodes
+    )
+
+    assert run_app(app, logging.getLogger("test"))
+    return pl.read_csv(args.output_file_path), results["top_customers"], results["unused_barcodes"]
+
+
+# Test the sketch of the approximate top customers holds a bounded number of customers across the partitions
+def test_approximate_top_customers_bounded_rows(inputs, monkeypatch):
+    # Arrange
+    counter_rows = []
+
+    def spy_update(sketch, counts_df):
+        TopKSketch.update(sketch, counts_df)
+        counter_rows.append(sketch.counters.height)
+
+    monkeypatch.setattr("sketches.TopKSketch.update", spy_update)
+
+    # Act
+    _, exact_df, _ = _run(inputs, out_of_core=True, memory_budget=1)
+    _, approximate_df, _ = _run(inputs, out_of_core=True, memory_budget=1, top_n_error=0.01)
+
+    # Assert
+    assert len(counter_rows) > 1
+    assert max(counter_rows) <= 100 < CUSTOMERS
+    # The heavy customers are close, only the set of top customers is compared
+    approximate_df, exact_df = approximate_df.sort("customer_id"), exact_df.sort("customer_id")
+    assert approximate_df["customer_id"].to_list() == exact_df["customer_id"].to_list()
+    differences = (approximate_df["total_barcodes"] - exact_df["total_barcodes"]).to_list()
+    assert all(0 <= difference <= max_error for difference, max_error in zip(differences, approximate_df["max_error"]))
+
+
+def test_approximate_top_customers_requires_out_of_core(inputs):
+    # Act & Assert
+    with pytest.raises(Exception) as excinfo:
+        _run(inputs, top_n_error=0.01)
+    assert str(excinfo.value) == "The approximate top customers are only computed by the out-of-core mode."
+
+
+def test_out_of_core_rejects_lazy(inputs):
+    # Act & Assert
+    with pytest.raises(Exception) as excinfo:
+        _run(inputs, out_of_core=True, lazy=True)
+    assert str(excinfo.value) == "The out-of-core mode can not be combined with the incremental or lazy modes."
+
+
+# Test the out-of-core execution over several partitions produces the results of the in-memory execution
+@pytest.mark.parametrize(
+    "memory_budget, expected_log",
+    [(1, "Input files are spilled into 2 partitions."), (1024, "Input files fit in a single partition")],
+    ids=["spilled", "in_memory"],
+)
+def test_partitioned_app_matches_in_memory(inputs, caplog, memory_budget, expected_log):
+    # Act
+    expected_df, expected_top_df, expected_unused = _run(inputs)
+    with caplog.at_level(logging.DEBUG):
+        output_df, top_customers_df, unused_barcodes = _run(inputs, out_of_core=True, memory_budget=memory_budget)
+
+    # Assert
+    assert expected_log in caplog.text
+    assert not list((inputs / "out").glob("spill_*")), "Spill files must be removed"
+    assert f"Duplicate barcodes found ({2 * DUPLICATES} rows)" in caplog.text
+    assert output_df.height == expected_df.height < ORDERS
+    assert output_df.sort("order_id").equals(expected_df.sort("order_id"))
+    # Customers with the same totals may be ranked in any order
+    ranking = [pl.col("total_barcodes"), pl.col("customer_id")]
+    assert top_customers_df.sort(ranking, descending=[True, False]).equals(
+        expected_top_df.sort(ranking, descending=[True, False])
+    )
+    assert unused_barcodes == expected_unused == 10
+
+
+# Test a failing spill is reported and leaves no spill files behind
+def test_partitioned_app_spill_error(inputs, caplog, monkeypatch):
+    # Arrange
+    def failing_spill(*args, **kwargs):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr("partitioned_app.spill_partitions", failing_spill)
+    args = AppArguments(
+        "barcodes.csv",
+        "orders.csv",
+        file_path=str(inputs),
+        output_folder_path=str(inputs),
+        no_cache=True,
+        quarantine_format="none",
+        out_of_core=True,
+        memory_budget=1,
+    )
+
+    # Act
+    is_ok = run_app(create_app(args, logging.getLogger("test")), logging.getLogger("test"))
+
+    # Assert
+    assert not is_ok
+    assert "Unable to spill the input files: No space left on device" in caplog.text
+    assert not list(inputs.glob("spill_*"))
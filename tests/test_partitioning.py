@@ -0,0 +1,63 @@
+import gzip
+
+import polars as pl
+import pytest
+
+from src.partitioning import get_partition_count, scan_partition, spill_partitions
+
+
+@pytest.fixture()
+def barcodes_csv(tmp_path):
+    file_path = tmp_path / "barcodes.csv"
+    pl.DataFrame(
+        {
+            "barcode": list(range(100, 140)) + [100, 101],
+            "order_id": [idx % 7 for idx in range(40)] + [None, 3],
+        }
+    ).write_csv(file_path)
+    return file_path
+
+
+# Test get_partition_count method
+@pytest.mark.parametrize(
+    "memory_budget, expected_partitions, test_id",
+    [
+        (10**9, 1, "happy_path_fits_in_memory"),
+        (1, None, "edge_case_tiny_budget"),
+    ],
+)
+def test_get_partition_count(barcodes_csv, memory_budget, expected_partitions, test_id):
+    # Act
+    actual_partitions = get_partition_count([barcodes_csv], memory_budget)
+
+    # Assert
+    if expected_partitions is None:
+        expected_partitions = barcodes_csv.stat().st_size * 4
+    assert actual_partitions == expected_partitions, f"Failed test ID: {test_id}"
+
+
+# Test spill_partitions method
+@pytest.mark.parametrize("partitions", [1, 3, 8])
+@pytest.mark.parametrize("is_compressed", [False, True])
+def test_spill_partitions(tmp_path, barcodes_csv, partitions, is_compressed):
+    # Arrange
+    schema = {"barcode": pl.Int64, "order_id": pl.Int64}
+    source_df = pl.read_csv(barcodes_csv, dtypes=schema)
+    if is_compressed:
+        # Compressed files are spilled in blocks of whole lines, the tiny budget splits them into many blocks
+        barcodes_csv = barcodes_csv.with_suffix(".csv.gz")
+        barcodes_csv.write_bytes(gzip.compress(source_df.write_csv().encode()))
+
+    # Act
+    partition_paths = spill_partitions(
+        [barcodes_csv], tmp_path / "spill", "barcodes", ["order_id", "barcode"], partitions, 1024, schema
+    )
+
+    # Assert
+    for key in ["order_id", "barcode"]:
+        assert len(partition_paths[key]) == partitions
+        part_dfs = [scan_partition(path, schema).collect() for path in partition_paths[key]]
+        # Every row is spilled exactly once and a key value never spans two partitions
+        assert pl.concat(part_dfs).sort(["barcode", "order_id"]).equals(source_df.sort(["barcode", "order_id"]))
+        key_sets = [set(part_df[key].to_list()) for part_df in part_dfs]
+        assert sum(len(keys) for keys in key_sets) == len(set().union(*key_sets))
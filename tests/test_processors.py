@@ -73,3 +73,112 @@ def test_set_invalid_dataframes(barcodes, orders, test_id):
     # Assert
     assert actual_result["is_ok"] is False, f"Failed test ID: {test_id}"
     assert "error" in actual_result, f"Failed test ID: {test_id}"
+
+
+def test_lazy_dataframes_build_lazy_results():
+    # Arrange
+    processor = DataProcessor()
+    barcodes = pl.DataFrame({"barcode": [1, 2, 3, 4], "order_id": [10, 10, 20, None]})
+    orders = pl.DataFrame({"order_id": [10, 20], "customer_id": [1, 2]})
+
+    # Act
+    actual_result = processor.set_dataframes(barcodes.lazy(), orders.lazy())
+    top_customers = processor.get_top_n_customers(1)
+    unused_barcodes = processor.get_unused_barcodes_count()
+
+    # Assert
+    assert actual_result["is_ok"]
+    assert isinstance(processor.merged_df, pl.LazyFrame)
+    assert isinstance(top_customers["data"], pl.LazyFrame)
+    assert top_customers["data"].collect().rows() == [(1, 2)]
+    assert unused_barcodes["data"] == 1
+
+
+# Test get_aggregated_data renders barcodes exactly like the python list text
+@pytest.mark.parametrize(
+    "barcodes, expected_barcodes, test_id",
+    [
+        ({"barcode": [11, 12, 13], "order_id": [10, 10, 20]}, ["[11, 12]", "[13]", "[None]"], "happy_path_int"),
+        (
+            {"barcode": ["A1", "B2", "C3"], "order_id": [10, 10, 20]},
+            ["['A1', 'B2']", "['C3']", "[None]"],
+            "happy_path_str",
+        ),
+        ({"barcode": [11, None, 13], "order_id": [10, 10, 20]}, ["[11, None]", "[13]", "[None]"], "edge_case_null"),
+    ],
+)
+@pytest.mark.parametrize("is_lazy", [False, True])
+def test_get_aggregated_data(barcodes, expected_barcodes, test_id, is_lazy):
+    # Arrange
+    processor = DataProcessor()
+    barcodes_df = pl.DataFrame(barcodes)
+    orders_df = pl.DataFrame({"order_id": [10, 20, 30], "customer_id": [1, 2, 3]})
+    if is_lazy:
+        barcodes_df, orders_df = barcodes_df.lazy(), orders_df.lazy()
+    processor.set_dataframes(barcodes_df, orders_df)
+
+    # Act
+    actual_result = processor.get_aggregated_data()
+    list_result = processor.get_aggregated_data(as_list=True)
+
+    # Assert
+    assert actual_result["is_ok"], f"Failed test ID: {test_id}"
+    aggregated_df = actual_result["data"].lazy().collect().sort("order_id")
+    assert aggregated_df["barcodes"].to_list() == expected_barcodes, f"Failed test ID: {test_id}"
+    list_df = list_result["data"].lazy().collect().sort("order_id")
+    assert list_df["barcodes"].dtype == pl.List(barcodes_df.schema["barcode"]), f"Failed test ID: {test_id}"
+
+
+# Test get_results computes the same results as the separate methods, and hands the aggregate over once computed
+@pytest.mark.parametrize("is_lazy", [False, True])
+def test_get_results(is_lazy):
+    # Arrange
+    processor = DataProcessor()
+    barcodes_df = pl.DataFrame({"barcode": [11, 12, 13, 14, 15], "order_id": [10, 10, 20, 30, None]})
+    orders_df = pl.DataFrame({"order_id": [10, 20, 30], "customer_id": [1, 2, 1]})
+    if is_lazy:
+        barcodes_df, orders_df = barcodes_df.lazy(), orders_df.lazy()
+    processor.set_dataframes(barcodes_df, orders_df)
+    aggregated_frames = []
+
+    # Act
+    actual_result = processor.get_results(top_n=1, on_aggregated=aggregated_frames.append)
+
+    # Assert
+    assert actual_result["is_ok"]
+    results = actual_result["data"]
+    expected_aggregated = processor.get_aggregated_data()["data"].lazy().collect()
+    assert results["aggregated"].sort("order_id").equals(expected_aggregated.sort("order_id"))
+    assert results["top_customers"].rows() == [(1, 3)]
+    assert results["unused_barcodes"] == 1
+    assert len(aggregated_frames) == 1 and aggregated_frames[0] is results["aggregated"]
+
+
+def test_get_results_without_dataframes():
+    # Act
+    actual_result = DataProcessor().get_results()
+
+    # Assert
+    assert actual_result["is_ok"] is False
+    assert actual_result["error"].startswith("Unable to process data")
+
+
+@pytest.mark.parametrize("is_lazy", [False, True])
+def test_get_top_n_customers(is_lazy):
+    # Arrange
+    processor = DataProcessor()
+    barcodes_df = pl.DataFrame({"barcode": [11, 12, 13, 14, 15, 16], "order_id": [10, 10, 20, 30, 30, 30]})
+    orders_df = pl.DataFrame({"order_id": [10, 20, 30], "customer_id": [1, 2, 3]})
+    if is_lazy:
+        barcodes_df, orders_df = barcodes_df.lazy(), orders_df.lazy()
+    processor.set_dataframes(barcodes_df, orders_df)
+
+    # Act
+    top_result = processor.get_top_n_customers(top_n=2)
+    results = processor.get_results(top_n=2)["data"]
+
+    # Assert
+    assert top_result["is_ok"]
+    top_df = top_result["data"].lazy().collect()
+    assert top_df.select("customer_id", "total_barcodes").rows() == [(3, 3), (1, 2)]
+    assert results["top_customers"].select("customer_id", "total_barcodes").rows() == [(3, 3), (1, 2)]
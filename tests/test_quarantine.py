@@ -0,0 +1,45 @@
+import polars as pl
+import pytest
+
+from src.models.validator import ValidationError
+from src.quarantine import QuarantineSink
+from src.writers import CSVWriter, ParquetWriter
+
+
+# Test QuarantineSink writes the rejected rows of all rules tagged with their rule
+@pytest.mark.parametrize(
+    "writer, read, test_id",
+    [
+        (ParquetWriter(), pl.read_parquet, "happy_path_parquet"),
+        (CSVWriter(), pl.read_csv, "happy_path_csv"),
+    ],
+)
+def test_quarantine_sink_write(tmp_path, writer, read, test_id):
+    # Arrange
+    sink = QuarantineSink(writer, tmp_path / "quarantine" / "output_quarantine")
+    sink.add(ValidationError("Duplicate barcodes found", pl.DataFrame({"barcode": [1, 1], "order_id": [10, 20]}), "a"))
+    sink.add(ValidationError("Duplicate order ids found", pl.DataFrame({"order_id": [30], "customer_id": [3]}), "b"))
+    sink.add(ValidationError("Error occurred during validation"))
+
+    # Act
+    quarantine_path = sink.write()
+
+    # Assert
+    assert sink.rejected_count == 3, f"Failed test ID: {test_id}"
+    assert read(quarantine_path).to_dicts() == [
+        {"rule": "a", "barcode": 1, "order_id": 10, "customer_id": None},
+        {"rule": "a", "barcode": 1, "order_id": 20, "customer_id": None},
+        {"rule": "b", "barcode": None, "order_id": 30, "customer_id": 3},
+    ], f"Failed test ID: {test_id}"
+
+
+def test_quarantine_sink_nothing_rejected(tmp_path):
+    # Arrange
+    sink = QuarantineSink(CSVWriter(), tmp_path / "output_quarantine.csv")
+
+    # Act
+    quarantine_path = sink.write()
+
+    # Assert
+    assert quarantine_path is None
+    assert not (tmp_path / "output_quarantine.csv").exists()
@@ -0,0 +1,76 @@
+import polars as pl
+import pytest
+
+from src.processors import DataProcessor
+from src.query_profile import QueryProfiler
+from src.validators import DataValidator
+
+BARCODES = {"barcode": [1, 2, 2, 3], "order_id": [10, 10, 20, None]}
+ORDERS = {"order_id": [10, 20, 30], "customer_id": [1, 2, 2]}
+
+
+@pytest.mark.parametrize(
+    "explain, profile, test_id",
+    [
+        (False, False, "disabled"),
+        (True, False, "explain"),
+        (False, True, "profile"),
+        (True, True, "explain_and_profile"),
+    ],
+)
+def test_query_profiler_collect(explain, profile, test_id):
+    # Arrange
+    profiler = QueryProfiler(explain, profile)
+    lf = pl.DataFrame(ORDERS).lazy().group_by("customer_id").agg(pl.count())
+
+    # Act
+    df = profiler.collect("totals", lf)
+    profiler.collect("totals", lf)
+
+    # Assert
+    assert df.sort("customer_id").rows() == [(1, 1), (2, 2)], f"Failed test ID: {test_id}"
+    assert list(profiler.plans) == (["totals", "totals_2"] if explain else []), f"Failed test ID: {test_id}"
+    assert all("AGGREGATE" in plan for plan in profiler.plans.values()), f"Failed test ID: {test_id}"
+    assert len(profiler.node_timings) == (2 if profile else 0), f"Failed test ID: {test_id}"
+
+
+def test_query_profiler_processing_stages(tmp_path):
+    # Arrange
+    profiler = QueryProfiler(explain=True, profile=True)
+    validator = DataValidator(profiler=profiler)
+    processor = DataProcessor(profiler)
+    expected_results = DataProcessor()
+    expected_results.set_dataframes(pl.DataFrame(BARCODES), pl.DataFrame(ORDERS))
+
+    # Act
+    barcodes_validation = validator.validate_barcodes(pl.DataFrame(BARCODES), "barcode")
+    processor.set_dataframes(pl.DataFrame(BARCODES), pl.DataFrame(ORDERS))
+    results = processor.get_results(top_n=1)["data"]
+    written_paths = profiler.write(tmp_path / "out" / "plans.txt", tmp_path / "out" / "profile.csv")
+    node_timings_df = pl.read_csv(tmp_path / "out" / "profile.csv")
+
+    # Assert
+    assert barcodes_validation["data"]["barcode"].to_list() == [1, 3]
+    assert results["aggregated"].equals(expected_results.get_results(top_n=1)["data"]["aggregated"])
+    assert results["top_customers"].rows() == [(1, 2)]
+    assert results["unused_barcodes"] == 1
+    stages = ["validate_barcodes", "join", "group_orders", "aggregate", "unused_barcodes", "top_customers"]
+    assert list(profiler.plans) == stages
+    assert written_paths == [tmp_path / "out" / "plans.txt", tmp_path / "out" / "profile.csv"]
+    assert node_timings_df.columns == ["stage", "node", "start_us", "end_us", "duration_us"]
+    assert node_timings_df["stage"].unique(maintain_order=True).to_list() == stages
+    assert "== join ==" in (tmp_path / "out" / "plans.txt").read_text()
+    assert profiler.slowest_nodes(2).height == 2
+
+
+def test_query_profiler_write_error(tmp_path):
+    # Arrange
+    profiler = QueryProfiler(explain=True)
+    profiler.collect("totals", pl.DataFrame(ORDERS).lazy())
+    plans_path = tmp_path / "plans.txt"
+    plans_path.mkdir()
+
+    # Act & Assert
+    with pytest.raises(Exception) as excinfo:
+        profiler.write(plans_path, tmp_path / "profile.csv")
+    assert str(excinfo.value).startswith("Unable to write query profile:")
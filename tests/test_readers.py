@@ -1,8 +1,12 @@
+import bz2
+import gzip
 from pathlib import Path
 
+import polars as pl
 import pytest
 
-from src.readers import CSVReader
+from src.cache import ParsedInputCache
+from src.readers import CachedReader, CSVReader, LazyCSVReader
 
 
 # Define a fixture for creating a temporary CSV file
@@ -95,3 +99,161 @@ def test_read_csv_error_cases(file_path, test_id):
     with pytest.raises(Exception) as excinfo:
         _ = CSVReader.read(file_path)
     assert str(excinfo.value).startswith("Unable to read file"), f"Failed test ID: {test_id}"
+
+
+# Lazy reader tests
+@pytest.mark.csv
+@pytest.mark.parametrize(
+    "file_content, expected_shape, test_id",
+    [
+        ("col1,col2\n1,2\n3,4", (2, 2), "happy_path_2col_2row"),
+        ("col1,col2", (0, 2), "edge_case_no_data"),
+    ],
+)
+def test_lazy_read_csv(tmp_csv, file_content, expected_shape, test_id):
+    # Arrange
+    file_path = tmp_csv(file_content, test_id)
+
+    # Act
+    result_lf = LazyCSVReader.read(file_path)
+
+    # Assert
+    assert isinstance(result_lf, pl.LazyFrame), f"Failed test ID: {test_id}"
+    assert result_lf.collect().shape == expected_shape, f"Failed test ID: {test_id}"
+
+
+@pytest.mark.csv
+@pytest.mark.parametrize(
+    "file_content, test_id",
+    [("", "empty_file_simple")],
+)
+def test_lazy_read_csv_empty_files(tmp_csv, file_content, test_id):
+    # Arrange
+    file_path = tmp_csv(file_content, test_id)
+
+    # Act & Assert
+    with pytest.raises(Exception) as excinfo:
+        _ = LazyCSVReader.read(file_path)
+    assert str(excinfo.value).startswith("Unable to read file"), f"Failed test ID: {test_id}"
+
+
+@pytest.mark.csv
+def test_lazy_read_csv_nonexistent_file():
+    # Act & Assert
+    with pytest.raises(Exception) as excinfo:
+        _ = LazyCSVReader.read(Path("/path/to/nonexistent/test_file.csv"))
+    assert str(excinfo.value).startswith("Unable to read file")
+
+
+# Sharded input tests
+@pytest.mark.csv
+@pytest.mark.parametrize("reader", [CSVReader, LazyCSVReader])
+@pytest.mark.parametrize(
+    "shard_contents, expected_shape, test_id",
+    [
+        (["col1,col2\n1,2\n3,4"], (2, 2), "happy_path_single_shard"),
+        (["col1,col2\n1,2\n3,4", "col1,col2\n5,6", "col1,col2\n7,"], (4, 2), "happy_path_many_shards"),
+        (["col1,col2\n1,2", "col1,col2"], (1, 2), "edge_case_shard_without_rows"),
+    ],
+)
+def test_read_csv_shards(tmp_csv, reader, shard_contents, expected_shape, test_id):
+    # Arrange
+    file_paths = [tmp_csv(content, f"{test_id}_{idx}") for idx, content in enumerate(shard_contents)]
+
+    # Act
+    result_df = reader.read(file_paths).lazy().collect()
+
+    # Assert
+    assert result_df.shape == expected_shape, f"Failed test ID: {test_id}"
+    assert result_df["col1"].to_list() == sorted(result_df["col1"].to_list()), f"Failed test ID: {test_id}"
+
+
+@pytest.mark.csv
+@pytest.mark.parametrize("reader", [CSVReader, LazyCSVReader])
+def test_read_csv_shards_error_cases(tmp_csv, reader):
+    # Arrange
+    file_paths = [tmp_csv("col1,col2\n1,2", "valid"), Path("/path/to/nonexistent/test_file.csv")]
+
+    # Act & Assert
+    with pytest.raises(Exception) as excinfo:
+        _ = reader.read(file_paths)
+    assert str(excinfo.value).startswith("Unable to read file")
+
+
+# Declared schema tests
+@pytest.mark.csv
+@pytest.mark.parametrize("is_lazy", [False, True])
+@pytest.mark.parametrize(
+    "file_content, expected_dtypes, test_id",
+    [
+        ("barcode,order_id,extra\n1,10,a\n2,,b", [pl.UInt64, pl.UInt32, pl.Utf8], "happy_path_declared_types"),
+        ("barcode,order_id,extra\n1,10,a\nabc,20,b", [pl.Utf8, pl.UInt32, pl.Utf8], "error_case_invalid_column"),
+        ("barcode,order_id,extra\n1,10,a\nabc,-1,b", [pl.Utf8, pl.Utf8, pl.Utf8], "error_case_invalid_columns"),
+    ],
+)
+def test_read_csv_schema(tmp_path, tmp_csv, is_lazy, file_content, expected_dtypes, test_id):
+    # Arrange
+    file_path = tmp_csv(file_content, test_id)
+    # Scans are only parsed by the put of the cache
+    reader = (
+        CachedReader(LazyCSVReader(), ParsedInputCache(tmp_path / "cache", 1024**2), lazy=True)
+        if is_lazy
+        else CSVReader()
+    )
+
+    # Act
+    result_df = reader.read(file_path, {"barcode": pl.UInt64, "order_id": pl.UInt32}).lazy().collect()
+
+    # Assert
+    # Only the columns with values not fitting their declared type are read as strings
+    assert result_df.height == 2, f"Failed test ID: {test_id}"
+    assert result_df.dtypes == expected_dtypes, f"Failed test ID: {test_id}"
+
+
+# Test the values of a scan are only parsed by its collect, which fails on values not fitting their type
+@pytest.mark.csv
+def test_lazy_read_csv_schema_invalid_value(tmp_csv):
+    # Arrange
+    file_path = tmp_csv("barcode,order_id\n1,10\nabc,20", "invalid_value")
+
+    # Act
+    result_lf = LazyCSVReader.read(file_path, {"barcode": pl.UInt64, "order_id": pl.UInt32})
+
+    # Assert
+    assert result_lf.schema == {"barcode": pl.UInt64, "order_id": pl.UInt32}
+    with pytest.raises(Exception, match="could not parse `abc` as dtype `u64` at column 'barcode'"):
+        result_lf.collect()
+
+
+# Compressed input tests
+@pytest.mark.csv
+@pytest.mark.parametrize("reader", [CSVReader, LazyCSVReader])
+@pytest.mark.parametrize(
+    "compress, file_name, test_id",
+    [(gzip.compress, "test.csv.gz", "happy_path_gzip"), (bz2.compress, "test.csv.bz2", "happy_path_bz2")],
+)
+def test_read_compressed_csv(tmp_path, reader, compress, file_name, test_id):
+    # Arrange
+    file_path = tmp_path / file_name
+    file_path.write_bytes(compress(b"barcode,order_id\n1,10\n2,\n3,20\n"))
+
+    # Act
+    result_df = reader.read([file_path], {"barcode": pl.UInt64, "order_id": pl.UInt32}).lazy().collect()
+
+    # Assert
+    assert result_df["barcode"].cast(pl.UInt64).to_list() == [1, 2, 3], f"Failed test ID: {test_id}"
+    assert result_df["order_id"].cast(pl.UInt32).to_list() == [10, None, 20], f"Failed test ID: {test_id}"
+    if reader is CSVReader:
+        assert result_df.dtypes == [pl.UInt64, pl.UInt32], f"Failed test ID: {test_id}"
+
+
+@pytest.mark.csv
+def test_read_compressed_csv_error_cases(tmp_path):
+    # Arrange
+    file_path = tmp_path / "test.csv.gz"
+    file_path.write_bytes(gzip.compress(b"barcode,order_id\n1,10\n")[:-4])
+
+    # Act & Assert
+    with pytest.raises(Exception) as excinfo:
+        _ = CSVReader.read(file_path, {"barcode": pl.UInt64, "order_id": pl.UInt32})
+    assert str(excinfo.value).startswith("Unable to read file test.csv.gz")
@@ -0,0 +1,117 @@
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import polars as pl
+import pytest
+
+from src.server import DatasetSnapshot, SnapshotServer
+
+AGGREGATED = {"customer_id": [2, 1, 1], "order_id": [30, 10, 20], "barcodes": [[5], [1, 2], [3]]}
+TOTALS = {"customer_id": [1, 2], "total_barcodes": [3, 1]}
+
+
+def _snapshot(unused_barcodes: int = 1) -> DatasetSnapshot:
+    return DatasetSnapshot(pl.DataFrame(AGGREGATED), pl.DataFrame(TOTALS), unused_barcodes)
+
+
+def _get(server: SnapshotServer, path: str) -> tuple[int, dict]:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}{path}") as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.load(exc)
+
+
+@pytest.fixture
+def server(tmp_path):
+    file_path = tmp_path / "barcodes.csv"
+    file_path.write_text("barcode,order_id\n")
+    unused_barcodes = iter(range(1, 100))
+    server = SnapshotServer(
+        ("127.0.0.1", 0),
+        lambda: _snapshot(next(unused_barcodes)),
+        [file_path],
+        logging.getLogger("test"),
+        reload_interval=0.05,
+    )
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize(
+    "order_id, expected, test_id",
+    [
+        ("10", {"customer_id": 1, "order_id": 10, "barcodes": [1, 2]}, "happy_path_first_order"),
+        ("30", {"customer_id": 2, "order_id": 30, "barcodes": [5]}, "happy_path_last_order"),
+        ("15", None, "edge_case_unknown_order"),
+        ("99", None, "edge_case_after_last_order"),
+    ],
+)
+def test_snapshot_get_order(order_id, expected, test_id):
+    # Act
+    order = _snapshot().get_order(order_id)
+
+    # Assert
+    assert order == expected, f"Failed test ID: {test_id}"
+
+
+def test_snapshot_lookups():
+    # Arrange
+    snapshot = _snapshot()
+
+    # Act & Assert
+    assert snapshot.get_customer_orders("1") == {"customer_id": 1, "orders": [10, 20]}
+    assert snapshot.get_customer_orders("3") == {"customer_id": 3, "orders": []}
+    assert snapshot.get_top_customers(1) == [{"customer_id": 1, "total_barcodes": 3}]
+    with pytest.raises(ValueError):
+        snapshot.get_order("abc")
+
+
+@pytest.mark.parametrize(
+    "path, expected_status, expected_body, test_id",
+    [
+        ("/orders/20/barcodes", 200, {"customer_id": 1, "order_id": 20, "barcodes": [3]}, "happy_path_order"),
+        ("/customers/2/orders", 200, {"customer_id": 2, "orders": [30]}, "happy_path_customer"),
+        ("/top_customers?n=1", 200, {"top_customers": [{"customer_id": 1, "total_barcodes": 3}]}, "happy_path_top"),
+        ("/orders/15/barcodes", 404, {"error": "Order 15 not found"}, "error_unknown_order"),
+        ("/orders/abc/barcodes", 400, None, "error_malformed_order_id"),
+        ("/unknown", 404, {"error": "Unknown path /unknown"}, "error_unknown_path"),
+    ],
+)
+def test_server_routes(server, path, expected_status, expected_body, test_id):
+    # Act
+    status, body = _get(server, path)
+
+    # Assert
+    assert status == expected_status, f"Failed test ID: {test_id}"
+    if expected_body is not None:
+        assert body == expected_body, f"Failed test ID: {test_id}"
+
+
+def test_server_reloads_changed_files(server):
+    # Arrange
+    _, before = _get(server, "/unused_barcodes")
+
+    # Act
+    server.file_paths[0].write_text("barcode,order_id\n1,10\n")
+    deadline = time.monotonic() + 5
+    while _get(server, "/unused_barcodes")[1] == before and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    # Assert
+    assert before == {"unused_barcodes": 1}
+    assert _get(server, "/unused_barcodes")[1] == {"unused_barcodes": 2}
+
+
+def test_server_fails_without_first_snapshot(tmp_path):
+    # Act & Assert
+    with pytest.raises(Exception) as excinfo:
+        SnapshotServer(("127.0.0.1", 0), lambda: None, [tmp_path / "barcodes.csv"], None)
+    assert str(excinfo.value) == "Unable to load the dataset to serve."
@@ -0,0 +1,68 @@
+import polars as pl
+import pytest
+
+from src.sketches import TopKSketch
+
+
+def _zipf_keys(distinct_keys: int) -> pl.Series:
+    """Returns a skewed stream where key k occurs distinct_keys // k times, in a shuffled order."""
+    keys = [key for key in range(1, distinct_keys + 1) for _ in range(distinct_keys // key)]
+    return pl.Series("customer_id", keys).shuffle(seed=42)
+
+
+def _counts(keys: pl.Series) -> pl.DataFrame:
+    """Returns a (key, count) batch with a count of one for every key occurrence."""
+    return keys.drop_nulls().to_frame().with_columns(pl.lit(1).alias("total_barcodes"))
+
+
+def test_sketch_exact_below_capacity():
+    # Arrange
+    sketch = TopKSketch(capacity=10)
+
+    # Act
+    sketch.update(_counts(pl.Series("customer_id", [1, 2, 2, 3, 3, 3])))
+    sketch.update(_counts(pl.Series("customer_id", [1, 1, 3, None])))
+
+    # Assert
+    assert sketch.top(2).rows() == [(3, 4, 0), (1, 3, 0)]
+    assert sketch.total == 9
+    assert sketch.error_bound == 0
+
+
+@pytest.mark.parametrize("batch_rows", [100, 1_000])
+def test_sketch_error_bounds(batch_rows):
+    # Arrange
+    keys = _zipf_keys(1_000)
+    true_counts = dict(keys.value_counts().rows())
+    sketch = TopKSketch.from_error(0.01, top_n=5)
+
+    # Act
+    for offset in range(0, len(keys), batch_rows):
+        sketch.update(_counts(keys.slice(offset, batch_rows)))
+    top_df = sketch.top(5)
+
+    # Assert
+    assert sketch.counters.height <= sketch.capacity
+    assert sketch.error_bound <= sketch.total / sketch.capacity
+    assert top_df["customer_id"].to_list() == [1, 2, 3, 4, 5]
+    for key, estimate, max_error in top_df.rows():
+        assert estimate - max_error <= true_counts[key] <= estimate
+
+
+def test_sketch_update_counts():
+    # Arrange
+    sketch = TopKSketch(capacity=2)
+
+    # Act
+    sketch.update(pl.DataFrame({"customer_id": [1, 2, 3], "total_barcodes": [5, 1, 3]}))
+    sketch.update(pl.DataFrame({"customer_id": [4], "total_barcodes": [1]}))
+
+    # Assert
+    assert sketch.top(2).rows() == [(1, 5, 0), (4, 4, 3)]
+
+
+@pytest.mark.parametrize("error", [0, 1, -0.5])
+def test_sketch_invalid_error(error):
+    # Act & Assert
+    with pytest.raises(ValueError):
+        _ = TopKSketch.from_error(error)
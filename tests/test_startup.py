@@ -0,0 +1,49 @@
+import subprocess
+import sys
+import time
+
+import pytest
+
+# Seconds the help may take, from starting the interpreter to exiting. The imports are checked module by module
+# below, the budget catches any other slow startup work.
+STARTUP_BUDGET = 0.3
+
+# Runs the command line in a fresh interpreter and prints whether polars was imported
+PROBE = """
+import runpy, sys
+sys.argv = ["main.py", *sys.argv[1:]]
+sys.path.insert(0, "src")
+try:
+    runpy.run_path("src/main.py", run_name="__main__")
+except SystemExit:
+    pass
+print("polars" in sys.modules)
+"""
+
+
+@pytest.mark.parametrize(
+    "cli_args, test_id",
+    [
+        (["-h"], "help"),
+        (["missing_barcodes.csv", "orders.csv"], "error_missing_file"),
+        (["barcodes.csv", "orders.csv", "--top_n", "many"], "error_invalid_value"),
+    ],
+)
+def test_command_line_does_not_import_polars(cli_args, test_id):
+    # Act
+    result = subprocess.run([sys.executable, "-c", PROBE, *cli_args], capture_output=True, text=True, check=True)
+
+    # Assert
+    assert result.stdout.splitlines()[-1] == "False", f"Failed test ID: {test_id}"
+
+
+def test_help_startup_budget():
+    # Act, the fastest of a few runs is compared, so a busy machine does not fail the budget
+    durations = []
+    for _ in range(3):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "src/main.py", "-h"], capture_output=True, check=True)
+        durations.append(time.perf_counter() - started)
+
+    # Assert
+    assert min(durations) < STARTUP_BUDGET, f"Help took {min(durations):.3f}s, the budget is {STARTUP_BUDGET}s"
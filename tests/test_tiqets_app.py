@@ -0,0 +1,153 @@
+import logging
+import time
+
+import polars as pl
+import pytest
+
+from src.app_arguments import AppArguments
+from src.main import create_app, run_app
+from src.models.errors import AppReaderError
+from src.processors import DataProcessor
+from src.tiqets_app import TiqetsApp
+from src.validators import DataValidator
+from src.writers import CSVWriter
+
+# Seconds a read of the slow reader takes, like large files on network-attached storage
+READ_LATENCY = 0.5
+
+
+class SlowReader:
+    """Returns the given frame of every input after its latency, or raises the given error."""
+
+    def __init__(self, results: dict[str, pl.DataFrame | Exception], latencies: dict[str, float]):
+        self.results = results
+        self.latencies = latencies
+        self.finished: list[str] = []
+
+    def read(self, file_path, schema=None):
+        name = "barcodes" if file_path[0].name.startswith("barcodes") else "orders"
+        time.sleep(self.latencies[name])
+        self.finished.append(name)
+        if isinstance(self.results[name], Exception):
+            raise self.results[name]
+        return self.results[name]
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    (tmp_path / "barcodes.csv").write_text("barcode,order_id\n")
+    (tmp_path / "orders.csv").write_text("order_id,customer_id\n")
+    args = AppArguments("barcodes.csv", "orders.csv", file_path=str(tmp_path), output_folder_path=str(tmp_path))
+
+    def make_app(reader: SlowReader) -> TiqetsApp:
+        return TiqetsApp(args, logging.getLogger("test"), reader, DataValidator(), DataProcessor(), CSVWriter())
+
+    return make_app
+
+
+BARCODES_DF = pl.DataFrame({"barcode": [1, 2], "order_id": [10, None]})
+ORDERS_DF = pl.DataFrame({"order_id": [10], "customer_id": [1]})
+EMPTY_DF = pl.DataFrame(schema={"barcode": pl.Int64, "order_id": pl.Int64})
+
+
+def test_read_data_concurrently(make_app):
+    # Arrange
+    reader = SlowReader(
+        {"barcodes": BARCODES_DF, "orders": ORDERS_DF}, {"barcodes": READ_LATENCY, "orders": READ_LATENCY}
+    )
+    app = make_app(reader)
+
+    # Act
+    started = time.perf_counter()
+    is_ok = app.read_data()
+    elapsed = time.perf_counter() - started
+
+    # Assert
+    assert is_ok
+    assert app.barcodes_df.equals(BARCODES_DF) and app.orders_df.equals(ORDERS_DF)
+    # Both reads waited at the same time
+    assert elapsed < 1.8 * READ_LATENCY
+    assert {stage.name for stage in app.metrics.stages} == {"barcodes", "orders"}
+
+
+@pytest.mark.parametrize(
+    "failed_result, test_id",
+    [
+        (EMPTY_DF, "edge_case_empty_barcodes"),
+        (AppReaderError("Unable to read file barcodes.csv"), "error_case_unreadable_barcodes"),
+    ],
+)
+def test_read_data_stops_at_first_failure(make_app, failed_result, test_id):
+    # Arrange
+    reader = SlowReader({"barcodes": failed_result, "orders": ORDERS_DF}, {"barcodes": 0.0, "orders": 4 * READ_LATENCY})
+    app = make_app(reader)
+
+    # Act
+    started = time.perf_counter()
+    if isinstance(failed_result, Exception):
+        with pytest.raises(Exception, match="Unable to read file barcodes.csv"):
+            app.read_data()
+    else:
+        assert not app.read_data(), f"Failed test ID: {test_id}"
+    elapsed = time.perf_counter() - started
+
+    # Assert
+    # The read of the orders is not waited for
+    assert elapsed < READ_LATENCY, f"Failed test ID: {test_id}"
+    assert reader.finished == ["barcodes"], f"Failed test ID: {test_id}"
+
+
+@pytest.mark.parametrize("is_writable, test_id", [(True, "happy_path"), (False, "error_case_missing_output_folder")])
+def test_process_data_writes_output_atomically(make_app, tmp_path, is_writable, test_id):
+    # Arrange
+    reader = SlowReader({"barcodes": BARCODES_DF, "orders": ORDERS_DF}, {"barcodes": 0.0, "orders": 0.0})
+    app = make_app(reader)
+    app.read_data()
+    app.validate_data()
+    if not is_writable:
+        app.args.output_file_path = tmp_path / "missing" / app.args.output_file_path.name
+
+    # Act
+    is_ok = app.process_data()
+
+    # Assert
+    assert is_ok == is_writable, f"Failed test ID: {test_id}"
+    assert app.args.output_file_path.exists() == is_writable, f"Failed test ID: {test_id}"
+    assert not list(tmp_path.rglob("*.tmp")), f"Failed test ID: {test_id}"
+
+
+# Test lazy runs reject the values not fitting their types like eager runs when the cache parses the files, and fail
+# with a logged error when the scans are only parsed by the validation
+@pytest.mark.parametrize(
+    "options, is_ok, test_id",
+    [
+        ({"no_cache": True}, True, "happy_path_eager"),
+        ({"lazy": True}, True, "happy_path_lazy_cached"),
+        ({"lazy": True, "no_cache": True}, False, "error_case_lazy_scanned"),
+    ],
+)
+def test_run_invalid_values(tmp_path, caplog, options, is_ok, test_id):
+    # Arrange
+    (tmp_path / "barcodes.csv").write_text("barcode,order_id\n1,10\nabc,10\n3,20\n")
+    (tmp_path / "orders.csv").write_text("order_id,customer_id\n10,1\n20,2\n")
+    args = AppArguments(
+        "barcodes.csv",
+        "orders.csv",
+        file_path=str(tmp_path),
+        output_folder_path=str(tmp_path),
+        cache_folder_path=str(tmp_path / "cache"),
+        quarantine_format="none",
+        **options,
+    )
+
+    # Act
+    with caplog.at_level(logging.WARNING):
+        actual_ok = run_app(create_app(args, logging.getLogger("test")), logging.getLogger("test"))
+
+    # Assert
+    assert actual_ok == is_ok, f"Failed test ID: {test_id}"
+    if is_ok:
+        assert "Invalid barcode values found, expected UInt64 (1 rows)" in caplog.text, f"Failed test ID: {test_id}"
+        assert pl.read_csv(args.output_file_path).sort("order_id")["barcodes"].to_list() == ["[1]", "[3]"]
+    else:
+        assert "Unable to read the input files: could not parse `abc`" in caplog.text, f"Failed test ID: {test_id}"
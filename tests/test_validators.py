@@ -1,8 +1,9 @@
 import polars as pl
 import pytest
 
+from src.app_arguments import VALIDATION_RULE_DEFAULTS
 from src.models.validator import ValidationError
-from src.validators import DataValidator
+from src.validators import VALIDATION_RULES, DataValidator
 
 
 # Test DataValidator.validate_barcodes method valid results
@@ -216,3 +217,190 @@ def test_validate_invalid_orders(input_data, expected_result, test_id):
 
     assert "data" in expected_result
     assert actual_result["data"].equals(pl.DataFrame(expected_result["data"])), f"Failed test ID: {test_id}"
+
+
+# Test DataValidator methods with lazy frames
+def test_validate_lazy_frames():
+    # Arrange
+    validator = DataValidator()
+    barcodes = pl.LazyFrame({"barcode": ["A1", "A1", "B2"], "order": [10, 11, 20]})
+    merged = pl.LazyFrame({"barcode": [1000, None], "order": [10, 20]})
+
+    # Act
+    barcode_result = validator.validate_barcodes(barcodes, "barcode")
+    order_result = validator.validate_orders(merged, "barcode")
+
+    # Assert
+    assert barcode_result["errors"][0].failed_rows == [{"barcode": "A1", "order": 10}, {"barcode": "A1", "order": 11}]
+    assert isinstance(barcode_result["data"], pl.LazyFrame)
+    assert barcode_result["data"].collect().equals(pl.DataFrame({"barcode": ["B2"], "order": [20]}))
+    assert order_result["errors"][0].failed_rows == [{"barcode": None, "order": 20}]
+    assert isinstance(order_result["data"], pl.LazyFrame)
+    assert order_result["data"].collect().equals(pl.DataFrame({"barcode": [1000], "order": [10]}))
+
+
+# Test DataValidator.validate_schema method
+SCHEMA = {"barcode": pl.UInt64, "order_id": pl.UInt32}
+
+
+@pytest.mark.parametrize("is_lazy", [False, True])
+@pytest.mark.parametrize(
+    "input_data, expected_errors, expected_data, test_id",
+    [
+        (
+            {"barcode": ["1", "2"], "order_id": ["10", None]},
+            [],
+            {"barcode": [1, 2], "order_id": [10, None]},
+            "happy_path_cast",
+        ),
+        (
+            {"barcode": ["1", "abc", "3"], "order_id": ["10", "20", "-1"]},
+            [
+                ValidationError("Invalid barcode values found", [{"barcode": "abc", "order_id": "20"}]),
+                ValidationError("Invalid order_id values found", [{"barcode": "3", "order_id": "-1"}]),
+            ],
+            {"barcode": [1], "order_id": [10]},
+            "error_case_invalid_values",
+        ),
+    ],
+)
+def test_validate_schema(input_data, expected_errors, expected_data, test_id, is_lazy):
+    # Arrange
+    validator = DataValidator()
+    df = pl.DataFrame(input_data)
+
+    # Act
+    actual_result = validator.validate_schema(df.lazy() if is_lazy else df, SCHEMA)
+
+    # Assert
+    assert actual_result["is_valid"] == (not expected_errors), f"Failed test ID: {test_id}"
+    for actual_error, expected_error in zip(actual_result["errors"], expected_errors, strict=True):
+        assert actual_error.error_message.startswith(expected_error.error_message), f"Failed test ID: {test_id}"
+        assert actual_error.failed_rows == expected_error.failed_rows, f"Failed test ID: {test_id}"
+    expected_df = pl.DataFrame(expected_data, schema=SCHEMA)
+    assert actual_result["data"].lazy().collect().equals(expected_df), f"Failed test ID: {test_id}"
+
+
+def test_validate_schema_matching_types():
+    # Act
+    actual_result = DataValidator().validate_schema(
+        pl.DataFrame({"barcode": [1]}, schema={"barcode": pl.UInt64}), SCHEMA
+    )
+
+    # Assert
+    assert actual_result == {"is_valid": True}
+
+
+# Test DataValidator rules registered on top of the duplicate barcodes and orders without barcodes
+@pytest.mark.parametrize("is_lazy", [False, True])
+@pytest.mark.parametrize(
+    "method, input_data, extra_args, expected_errors, expected_data, test_id",
+    [
+        (
+            "validate_barcodes",
+            {"barcode": [1, 2], "order_id": [10, 99]},
+            (pl.Series([10]),),
+            [ValidationError("Barcodes of unknown orders found", [{"barcode": 2, "order_id": 99}])],
+            {"barcode": [1], "order_id": [10]},
+            "error_case_unknown_orders",
+        ),
+        (
+            "validate_order_ids",
+            {"order_id": [10, 20, 10], "customer_id": [1, 2, 3]},
+            (),
+            [
+                ValidationError(
+                    "Duplicate order ids found",
+                    [{"order_id": 10, "customer_id": 1}, {"order_id": 10, "customer_id": 3}],
+                )
+            ],
+            {"order_id": [20], "customer_id": [2]},
+            "error_case_duplicate_order_ids",
+        ),
+        (
+            "validate_orders",
+            {"order_id": [10, 20, 30], "customer_id": [1, None, 3], "barcode": [1, 2, None]},
+            (),
+            [
+                ValidationError("Orders without barcodes found", [{"order_id": 30, "customer_id": 3, "barcode": None}]),
+                ValidationError(
+                    "Orders without customers found", [{"order_id": 20, "customer_id": None, "barcode": 2}]
+                ),
+            ],
+            {"order_id": [10], "customer_id": [1], "barcode": [1]},
+            "error_case_orders_without_barcodes_and_customers",
+        ),
+    ],
+)
+def test_validate_rules(method, input_data, extra_args, expected_errors, expected_data, test_id, is_lazy):
+    # Arrange
+    validator = DataValidator()
+    df = pl.DataFrame(input_data)
+    column = "order_id" if method == "validate_order_ids" else "barcode"
+
+    # Act
+    actual_result = getattr(validator, method)(df.lazy() if is_lazy else df, column, *extra_args)
+
+    # Assert
+    assert actual_result["is_valid"] is False, f"Failed test ID: {test_id}"
+    for actual_error, expected_error in zip(actual_result["errors"], expected_errors, strict=True):
+        assert actual_error.error_message == expected_error.error_message, f"Failed test ID: {test_id}"
+        assert actual_error.failed_rows == expected_error.failed_rows, f"Failed test ID: {test_id}"
+    assert actual_result["data"].lazy().collect().equals(pl.DataFrame(expected_data)), f"Failed test ID: {test_id}"
+
+
+@pytest.mark.parametrize(
+    "enabled_rules, disabled_rules, expected_messages, test_id",
+    [
+        ((), (), ["Duplicate barcodes found"], "happy_path_default_rules"),
+        (
+            ("barcode_format",),
+            (),
+            ["Duplicate barcodes found", "Barcodes with an invalid GS1 check digit found"],
+            "happy_path_enabled_rule",
+        ),
+        (("barcode_format",), ("duplicate_barcodes",), ["Barcodes with an invalid GS1 check digit found"], "disabled"),
+    ],
+)
+def test_validation_rules_toggles(enabled_rules, disabled_rules, expected_messages, test_id):
+    # Arrange
+    validator = DataValidator(enabled_rules, disabled_rules, timed=True)
+    # Valid EAN-13 and EAN-8 check digits, then a wrong one
+    df = pl.DataFrame({"barcode": [4006381333931, 73513537, 4006381333932, 4006381333932]})
+
+    # Act
+    actual_result = validator.validate_barcodes(df, "barcode")
+
+    # Assert
+    assert [error.error_message for error in actual_result["errors"]] == expected_messages, f"Failed test ID: {test_id}"
+    assert actual_result["data"]["barcode"].to_list()[:2] == [4006381333931, 73513537], f"Failed test ID: {test_id}"
+    assert set(validator.timings) == {rule.name for rule in validator.rules if rule.dataset == "barcodes"} - {
+        "unknown_orders"
+    }, f"Failed test ID: {test_id}"
+
+
+def test_validation_rules_unknown_name():
+    # Act & Assert
+    with pytest.raises(Exception) as excinfo:
+        _ = DataValidator(enabled_rules=["no_such_rule"])
+    assert str(excinfo.value) == "Unknown validation rules: no_such_rule."
+
+
+def test_validation_rule_defaults_match_registry():
+    # Assert, the command line lists the rules without importing the registry
+    assert VALIDATION_RULE_DEFAULTS == {name: rule.enabled for name, rule in VALIDATION_RULES.items()}
+
+
+# Test ValidationError only renders a sample of many failed rows
+def test_validation_error_sample():
+    # Arrange
+    error = ValidationError("Duplicate barcodes found", pl.DataFrame({"barcode": range(25)}), "duplicate_barcodes")
+
+    # Act
+    error_text = str(error)
+
+    # Assert
+    assert error.failed_count == 25
+    assert error_text.startswith("Duplicate barcodes found (25 rows) \n")
+    assert error_text.count('"barcode"') == 10
+    assert error_text.endswith("... 15 more rows")
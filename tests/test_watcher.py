@@ -0,0 +1,44 @@
+import threading
+
+import pytest
+
+from src.watcher import DirectoryWatcher
+
+
+def _write_later(file_path, content, delay=0.1):
+    timer = threading.Timer(delay, file_path.write_text, [content])
+    timer.start()
+    return timer
+
+
+@pytest.mark.parametrize("polling", [False, True])
+def test_watcher_reports_dropped_files(tmp_path, polling):
+    # Arrange
+    watcher = DirectoryWatcher([tmp_path / "barcodes_*.csv", tmp_path / "orders.csv"], debounce=0.2, polling=polling)
+    _write_later(tmp_path / "notes.txt", "not an input")
+    _write_later(tmp_path / "barcodes_1.csv", "barcode,order_id\n").join()
+    _write_later(tmp_path / "barcodes_1.csv", "barcode,order_id\n1,10\n", delay=0.05)
+
+    # Act
+    changed_files = watcher.wait_for_changes(timeout=5)
+    watcher.close()
+
+    # Assert
+    assert changed_files == [tmp_path / "barcodes_1.csv"]
+
+
+@pytest.mark.parametrize("polling", [False, True])
+def test_watcher_timeout_without_changes(tmp_path, polling):
+    # Arrange
+    input_path = tmp_path / "orders"
+    input_path.mkdir()
+    (tmp_path / "orders.csv").write_text("order_id,customer_id\n")
+    watcher = DirectoryWatcher([input_path], debounce=0.1, polling=polling)
+
+    # Act
+    changed_files = watcher.wait_for_changes(timeout=0.3)
+    watcher.close()
+
+    # Assert
+    assert changed_files == []
+    assert watcher.method == ("polling" if polling else "inotify")
@@ -0,0 +1,125 @@
+import polars as pl
+import pytest
+
+from src.writers import CSVWriter, IPCWriter, NDJSONWriter, ParquetWriter, start_write
+
+AGGREGATED_DATA = {"customer_id": [1, 2], "order_id": [10, 20], "barcodes": [[11, 12], [13]]}
+
+
+# Test writers round trip native list columns
+@pytest.mark.parametrize(
+    "writer, read, test_id",
+    [
+        (ParquetWriter(), pl.read_parquet, "happy_path_parquet"),
+        (ParquetWriter("snappy", row_group_size=1), pl.read_parquet, "happy_path_parquet_options"),
+        (ParquetWriter(fsync=True), pl.read_parquet, "happy_path_parquet_fsync"),
+        (IPCWriter(), pl.read_ipc, "happy_path_ipc"),
+        (NDJSONWriter(), pl.read_ndjson, "happy_path_ndjson"),
+    ],
+)
+@pytest.mark.parametrize("is_lazy", [False, True])
+def test_write_lists(tmp_path, writer, read, test_id, is_lazy):
+    # Arrange
+    df = pl.DataFrame(AGGREGATED_DATA)
+    file_path = tmp_path / "output"
+
+    # Act
+    writer.write(df.lazy() if is_lazy else df, file_path)
+
+    # Assert
+    assert writer.supports_lists, f"Failed test ID: {test_id}"
+    assert read(file_path).equals(df), f"Failed test ID: {test_id}"
+
+
+@pytest.mark.parametrize("is_lazy", [False, True])
+def test_write_csv(tmp_path, is_lazy):
+    # Arrange
+    df = pl.DataFrame(AGGREGATED_DATA).with_columns(pl.Series("barcodes", ["[11, 12]", "[13]"]))
+    file_path = tmp_path / "output.csv"
+
+    # Act
+    CSVWriter().write(df.lazy() if is_lazy else df, file_path)
+
+    # Assert
+    assert not CSVWriter.supports_lists
+    assert file_path.read_text() == 'customer_id,order_id,barcodes\n1,10,"[11, 12]"\n2,20,[13]\n'
+    assert [path.name for path in tmp_path.iterdir()] == ["output.csv"]
+
+
+# Test lazy frames are streamed into the file by the sink when the plan allows it, and collected otherwise
+@pytest.mark.parametrize(
+    "plan, is_sunk, test_id",
+    [
+        (lambda lf: lf.filter(pl.col("order_id").is_not_null()), True, "happy_path_scan"),
+        (
+            lambda lf: lf.group_by("order_id").agg(pl.col("barcode").cast(pl.Utf8).str.concat(", ")),
+            False,
+            "happy_path_barcodes_grouping",
+        ),
+    ],
+)
+def test_write_lazy(tmp_path, monkeypatch, plan, is_sunk, test_id):
+    # Arrange
+    input_path = tmp_path / "barcodes.csv"
+    pl.DataFrame({"barcode": [11, 12, 13], "order_id": [10, 10, None]}).write_csv(input_path)
+    expected_df = plan(pl.scan_csv(input_path)).collect()
+    collect = pl.LazyFrame.collect
+    collected = []
+
+    def spy_collect(lf, *args, **kwargs):
+        collected.append(lf)
+        return collect(lf, *args, **kwargs)
+
+    monkeypatch.setattr(pl.LazyFrame, "collect", spy_collect)
+    file_path = tmp_path / "output.csv"
+
+    # Act
+    CSVWriter().write(plan(pl.scan_csv(input_path)), file_path)
+
+    # Assert
+    assert (not collected) == is_sunk, f"Failed test ID: {test_id}"
+    assert pl.read_csv(file_path).sort("order_id").equals(expected_df.sort("order_id")), f"Failed test ID: {test_id}"
+
+
+def test_start_write(tmp_path):
+    # Arrange
+    df = pl.DataFrame(AGGREGATED_DATA)
+    file_path = tmp_path / "output.parquet"
+
+    # Act
+    write_future = start_write(ParquetWriter(fsync=True), df.lazy(), file_path)
+
+    # Assert
+    assert write_future.result(timeout=10) is None
+    assert pl.read_parquet(file_path).equals(df)
+
+
+def test_failed_write_keeps_previous_file(tmp_path):
+    # Arrange
+    file_path = tmp_path / "output.csv"
+    file_path.write_text("customer_id,order_id,barcodes\n")
+
+    # Act
+    write_future = start_write(CSVWriter(), pl.DataFrame(AGGREGATED_DATA), file_path)
+
+    # Assert
+    with pytest.raises(Exception, match="Unable to write file output.csv"):
+        write_future.result(timeout=10)
+    # Neither a truncated output file nor the temporary file are left behind
+    assert file_path.read_text() == "customer_id,order_id,barcodes\n"
+    assert [path.name for path in tmp_path.iterdir()] == ["output.csv"]
+
+
+# Error cases
+@pytest.mark.parametrize(
+    "df, file_name, test_id",
+    [
+        (pl.DataFrame(AGGREGATED_DATA), "output.csv", "error_case_csv_list_column"),
+        (pl.DataFrame(AGGREGATED_DATA), "nonexistent/output.csv", "error_case_nonexistent_folder"),
+    ],
+)
+def test_write_error_cases(tmp_path, df, file_name, test_id):
+    # Act & Assert
+    with pytest.raises(Exception) as excinfo:
+        CSVWriter().write(df, tmp_path / file_name)
+    assert str(excinfo.value).startswith("Unable to write file"), f"Failed test ID: {test_id}"